@@ -2,4 +2,9 @@ from ._version import version
 
 __version__ = version
 
-from APODORA.networks import (BBN_net,write_AoTnetwork)
\ No newline at end of file
+from APODORA.networks import (BBN_net,write_AoTnetwork,SparseNetwork)
+from APODORA.background import (Background,BackgroundTable,cached_background)
+from APODORA.ensemble import (integrate_ensemble,EnsembleResult)
+from APODORA.equilibrium import equilibrium_initial_state
+from APODORA.profiling import SolverProfile
+from APODORA.uncertainty import (RateUncertainties,monte_carlo,MonteCarloResult)
@@ -0,0 +1,292 @@
+"""Background cosmology of fastbbn.py: photons, e+- pairs and decoupled neutrinos.
+
+Natural units (c=hbar=k=1) with energies in MeV and times in hbar/MeV, as in
+fastbbn.py.  All functions work on numpy arrays, so the backgrounds of many
+cosmologies are evaluated at once.
+
+T(t) and a(t) do not depend on the nuclei, so they can be solved once and
+interpolated instead of being integrated with every network, see
+BackgroundTable.  cached_background keeps the tables on disk.
+"""
+
+import hashlib
+import os
+
+import numba
+import numpy as np
+from scipy import integrate, special
+
+from APODORA.networks.rate_table import interpolate_log_rates
+
+
+timeunit =1.519*10**21  #MeV/hbar in unit of 1/second
+Q=1.293                 #neutron proton mass difference in MeV
+M_u=931.494102          #atomic mass unit in MeV
+G=6.709e-45             #gravatational constant in units of c=hbar=MeV=1
+TMeV2T9=11.60451812     #conversion factor from MeV to 10^9K
+gcm3=232012             #conversion factor for g/cm^3
+e_mass=0.51099895       #electron mass in MeV
+
+#above z = e_mass/T the e+- pairs are left out, their density is then below
+#exp(-z_cutoff) of the photon density
+z_cutoff=300.0
+
+
+#Special functions and their derivatives
+def L(z):
+    return special.kn(2,z)/z
+
+def M(z):
+    return (3/4*special.kn(3,z)+1/4*special.kn(1,z))/z
+
+def dMdz(z):
+    return -3/z**2*special.kn(3,z) -special.kn(2,z)/z
+
+
+@numba.njit()
+def electron_eq(T, rtol, max_terms):
+    '''rho_e, P_e and drho_e/dT of the e+- pairs at temperature T (in MeV)
+
+    The chemical potential is 0, so they are the alternating series over n of
+    M(n z), L(n z) and dMdz(n z) of Kawano, with z = e_mass/T.  The series is
+    summed until the terms of all three fall below rtol of the sums.  The
+    Bessel functions come from K_nu(x) = int_0^inf exp(-x cosh t) cosh(nu t) dt
+    with the trapezoidal rule, which converges exponentially.  The nodes are
+    shared by K_1, K_2, K_3 and every n, exp(-n z cosh t) is the n-th power of
+    exp(-z cosh t)'''
+
+    z=e_mass/T
+    if z>z_cutoff:
+        return 0.0, 0.0, 0.0
+
+    #the step resolves the peak of width 1/sqrt(z) at t=0, the nodes reach
+    #exp(-z (cosh t - 1)) < exp(-60)
+    h=min(0.25, 0.7/np.sqrt(z))
+    nodes=int(np.arccosh(1+60/z)/h)+2
+    E=np.empty(nodes)
+    c1=np.empty(nodes)
+    c2=np.empty(nodes)
+    c3=np.empty(nodes)
+    for j in range(nodes):
+        t=j*h
+        w=0.5*h if j==0 else h
+        E[j]=np.exp(-z*np.cosh(t))
+        c1[j]=w*np.cosh(t)
+        c2[j]=w*np.cosh(2*t)
+        c3[j]=w*np.cosh(3*t)
+
+    power=E.copy()
+    rho=0.0
+    P=0.0
+    drho=0.0
+    sign=1.0
+    for n in range(1, max_terms+1):
+        K1=0.0
+        K2=0.0
+        K3=0.0
+        for j in range(nodes):
+            K1+=power[j]*c1[j]
+            K2+=power[j]*c2[j]
+            K3+=power[j]*c3[j]
+        x=n*z
+        term_rho=sign*(0.75*K3+0.25*K1)/x                   #M(x)
+        term_P=sign*K2/x**2                                 #L(x)/x
+        term_drho=sign*n*z/T*(3/x**2*K3+K2/x)               #-dMdz(x)
+        rho+=term_rho
+        P+=term_P
+        drho+=term_drho
+        if (abs(term_rho)<=rtol*abs(rho) and abs(term_P)<=rtol*abs(P)
+                and abs(term_drho)<=rtol*abs(drho)):
+            break
+        for j in range(nodes):
+            power[j]*=E[j]
+        sign=-sign
+
+    C=2/np.pi**2*e_mass**4
+    return C*rho, C*P, C*drho
+
+
+@numba.njit()
+def electron_batch_eq(T, rtol, max_terms):
+    rho=np.empty_like(T)
+    P=np.empty_like(T)
+    drho=np.empty_like(T)
+    for i in range(T.shape[0]):
+        rho[i], P[i], drho[i]=electron_eq(T[i], rtol, max_terms)
+    return rho, P, drho
+
+
+def electron_thermodynamics(T, rtol=1e-12, max_terms=2000):
+    '''rho_e, P_e and drho_e/dT at the temperatures T (in MeV), scalar or array'''
+    T=np.asarray(T, dtype=np.float64)
+    rho, P, drho=electron_batch_eq(np.ravel(T), rtol, max_terms)
+    return rho.reshape(T.shape), P.reshape(T.shape), drho.reshape(T.shape)
+
+def rho_e(T): #electron/positron density, chemical potential assumed to be 0 so cosh(phi*n)=1
+    return electron_thermodynamics(T)[0]
+
+def drho_e(T): #derivative of rho_e with respect to temperature
+    return electron_thermodynamics(T)[2]
+
+def P_e(T): #electron/positron pressure
+    return electron_thermodynamics(T)[1]
+
+def rho_gamma(T):   #photon energy density
+    return (np.pi**2)/15*T**4
+
+def drho_gamma(T):  #derivative
+    return 4*(np.pi**2)/15*T**3
+
+def P_gamma(T):     #photon pressure
+    return rho_gamma(T)/3
+
+
+class Background:
+    '''temperature and scale factor of the universe for baryon-to-photon
+    ratio eta and n_nu neutrino families, starting at T_ini (in MeV) with a=1
+
+    eta and n_nu may be arrays, giving one background for every element.
+    The state of a background is (T, a), derivatives gives its time
+    derivative in units of MeV/hbar like dbackground in fastbbn.py.
+    '''
+
+    def __init__(self, eta=6.1e-10, n_nu=3.046, T_ini=27/TMeV2T9):
+        self.eta=np.asarray(eta, dtype=np.float64)
+        self.n_nu=np.asarray(n_nu, dtype=np.float64)
+        self.T_ini=T_ini
+
+        self.t_ini=1.226*10**21/T_ini**2 #initial time in hbar/MeV
+        self.n_gamma_ini=rho_gamma(T_ini)/(2.701*T_ini) #initial number density of photons based mean photon energy
+        rho_e_ini, P_e_ini, _=electron_thermodynamics(T_ini)
+        self.eta_ini=self.eta*(1+(rho_e_ini+P_e_ini)/(rho_gamma(T_ini)+P_gamma(T_ini))) #entropi bevarelse
+        self.rho_nu_ini=self.n_nu*7/8*(np.pi**2)/15*T_ini**4 #initial neutrino density
+
+    def rho_nu(self, a): #neutrino energy density
+        return self.rho_nu_ini/a**4
+
+    def H(self, T, a):   #Hubble parameter as given by Friedmann eq, ignoring cosmological constant
+        return np.sqrt(8*np.pi/3*G*(rho_e(T)+rho_gamma(T)+self.rho_nu(a)))
+
+    def derivatives(self, T, a):
+        '''dT/dt from Kawano D.18 and da/dt from the definition of H'''
+        rho, P, drho=electron_thermodynamics(T)
+        rho_set=rho+rho_gamma(T) #density of the components coupled to the photons
+        H=np.sqrt(8*np.pi/3*G*(rho_set+self.rho_nu(a)))
+        dTdt=-3*H/((drho+drho_gamma(T))/(rho_set+P+P_gamma(T)))
+        return dTdt, a*H
+
+    def rho_b_cgs(self, Y, a, masses):
+        '''baryon density in g/cm^3 for abundances Y of nuclei with masses in MeV'''
+        return np.sum(masses*Y, axis=-1)*self.eta_ini*self.n_gamma_ini/a**3*gcm3
+
+
+#version of the BackgroundTable files, part of the cache key
+table_version=2
+
+
+class BackgroundTable:
+    '''T(t) and a(t) of the background for n_nu neutrino families, solved
+    once from T_ini (in MeV) to t_end (in s) and interpolated
+
+    ln T and ln a are tabulated on a grid uniform in ln t, with t in seconds
+    counted like in fastbbn.py, together with their exact derivatives
+    d/d ln t from Background.derivatives, and interpolated by cubic Hermite
+    splines.  error is the largest relative error of T and a at the midpoints
+    of the grid.  The baryons are not part of the expansion, so the table is
+    the same for every eta.
+    '''
+
+    def __init__(self, n_nu=3.046, T_ini=27/TMeV2T9, t_end=2e5, rtol=1e-11, points_per_decade=64):
+        self.n_nu=float(n_nu)
+        self.T_ini=float(T_ini)
+        background=Background(n_nu=n_nu, T_ini=T_ini)
+        t_ini=background.t_ini/timeunit
+
+        derivatives=lambda t, y: np.array(background.derivatives(*y))*timeunit
+        solution=integrate.solve_ivp(derivatives, (t_ini, t_end), [T_ini, 1.0], method='DOP853',
+                                     rtol=rtol, atol=1e-300, dense_output=True)
+        if not solution.success:
+            raise RuntimeError(f'background failed: {solution.message}')
+
+        npoints=int(points_per_decade*np.log10(t_end/t_ini)) + 1
+        self.lnt=np.linspace(np.log(t_ini), np.log(t_end), npoints)
+        self.dlnt=self.lnt[1]-self.lnt[0]
+        self._tabulate(solution.sol(np.exp(self.lnt)), background)
+
+        midpoints=np.exp(0.5*(self.lnt[1:]+self.lnt[:-1]))
+        exact=solution.sol(midpoints)
+        self.error=np.max(np.abs(np.array(self(midpoints))/exact - 1))
+
+    def _tabulate(self, y, background):
+        T, a=y
+        dTdt, dadt=background.derivatives(T, a)
+        t=np.exp(self.lnt)
+        self.table=np.log(y).T.copy()
+        self.slopes=(np.array([dTdt/T, dadt/a])*timeunit*t).T.copy()
+
+    def arrays(self):
+        '''the table in the form taken by background_eq'''
+        return (self.lnt[0], self.dlnt, self.table, self.slopes)
+
+    def __call__(self, t):
+        '''T (in MeV) and a at the times t (in s)'''
+        t=np.asarray(t, dtype=np.float64)
+        T, a=background_batch_eq(t.ravel(), *self.arrays())
+        return T.reshape(t.shape), a.reshape(t.shape)
+
+    def save(self, filename):
+        np.savez(filename, version=table_version, n_nu=self.n_nu, T_ini=self.T_ini, lnt=self.lnt,
+                 table=self.table, slopes=self.slopes, error=self.error)
+
+    @classmethod
+    def load(cls, filename):
+        data=np.load(filename)
+        if data['version']!=table_version:
+            raise ValueError(f'{filename} is a BackgroundTable of version {data["version"]}')
+        table=cls.__new__(cls)
+        table.n_nu=float(data['n_nu'])
+        table.T_ini=float(data['T_ini'])
+        table.lnt=data['lnt']
+        table.dlnt=table.lnt[1]-table.lnt[0]
+        table.table=data['table']
+        table.slopes=data['slopes']
+        table.error=float(data['error'])
+        return table
+
+
+@numba.njit()
+def background_eq(t, lnt_min, dlnt, table, slopes):
+    '''T (in MeV) and a at time t (in s) from the arrays of a BackgroundTable'''
+    lny=interpolate_log_rates(np.log(t), lnt_min, dlnt, table, slopes, True)
+    return np.exp(lny[0]), np.exp(lny[1])
+
+
+@numba.njit()
+def background_batch_eq(t, lnt_min, dlnt, table, slopes):
+    T=np.empty_like(t)
+    a=np.empty_like(t)
+    for i in range(t.shape[0]):
+        T[i], a[i]=background_eq(t[i], lnt_min, dlnt, table, slopes)
+    return T, a
+
+
+def cache_directory():
+    '''directory of the files cached by APODORA, $APODORA_CACHE or ~/.cache/APODORA'''
+    return os.environ.get('APODORA_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'APODORA'))
+
+
+def cached_background(n_nu=3.046, T_ini=27/TMeV2T9, directory=None, **options):
+    '''the BackgroundTable for n_nu and T_ini, read from directory (by
+    default cache_directory()) if it was solved before with the same
+    options, otherwise solved and written there'''
+    key=repr((table_version, float(n_nu), float(T_ini), sorted(options.items())))
+    directory=os.path.join(cache_directory() if directory is None else directory, 'background')
+    filename=os.path.join(directory, hashlib.sha1(key.encode()).hexdigest()[:16]+'.npz')
+    if os.path.exists(filename):
+        return BackgroundTable.load(filename)
+
+    table=BackgroundTable(n_nu, T_ini, **options)
+    os.makedirs(directory, exist_ok=True)
+    table.save(filename+'.tmp.npz')
+    os.replace(filename+'.tmp.npz', filename)
+    return table
@@ -0,0 +1,281 @@
+"""Lockstep integration of BBN for many cosmologies at once.
+
+fastbbn.py integrates one cosmology per process.  integrate_ensemble takes
+arrays of (eta, n_nu, tau_n) and advances all of them together: every member
+has the state (T, a, Y) of fastbbn.py, its own time and its own step size, and
+every iteration attempts one step for all unfinished members.
+
+The steps are taken with RODAS4 of Hairer and Wanner, a stiffly accurate
+fourth order Rosenbrock method with an embedded third order solution, which
+needs one factorization and six linear solves per step.  The Newton matrices
+I/(gamma*h) - J of the members are the blocks of one block-diagonal system and
+are factorized and solved member by member, in parallel with numba.
+"""
+
+import contextlib
+import copy
+import time
+import weakref
+
+import numba
+import numpy as np
+
+from APODORA.background import Background, TMeV2T9, timeunit
+from APODORA.networks.sparse import sparse_network, rhs_from_rates, jacobian_from_rates
+from APODORA.nuclear import lifetime_scale, masses, observables, tau_n_rates, thermal_abundances
+
+
+#coefficients of RODAS4 (Hairer and Wanner, Solving Ordinary Differential
+#Equations II) in the form of KPP: stage i solves
+#(I/(gamma*h) - J) K_i = f(y + sum_j A_ij K_j) + sum_j C_ij K_j/h,
+#y_new = y + sum_i M_i K_i and the error estimate is K_6
+_gamma = 0.25
+_A = np.zeros((6, 6))
+_C = np.zeros((6, 6))
+_A[np.tril_indices(6, -1)] = [
+    1.544, 0.9466785280815826, 0.2557011698983284, 3.314825187068521, 2.896124015972201,
+    0.9986419139977817, 1.221224509226641, 6.019134481288629, 12.53708332932087,
+    -0.687886036105895, 1.221224509226641, 6.019134481288629, 12.53708332932087,
+    -0.687886036105895, 1.0]
+_C[np.tril_indices(6, -1)] = [
+    -5.6688, -2.430093356833875, -0.2063599157091915, -0.1073529058151375, -9.594562251023355,
+    -20.47028614809616, 7.496443313967647, -10.24680431464352, -33.99990352819905,
+    11.7089089320616, 8.083246795921522, -7.981132988064893, -31.52159432874371,
+    16.31930543123136, -6.058818238834054]
+_M = np.append(_A[5, :4], [1.0, 1.0])
+
+
+class EnsembleResult:
+    '''final state of every member of an ensemble
+
+    Y has shape (N, nnuc) and holds the abundances at t_end (in s), T the
+    final temperatures in MeV.  steps and rejected count the steps of every
+    member, success tells which members reached t_end.'''
+
+    def __init__(self, names, eta, n_nu, tau_n, t, T, a, Y, steps, rejected, failed, iterations, wall_time):
+        self.names = names
+        self.eta = eta
+        self.n_nu = n_nu
+        self.tau_n = tau_n
+        self.t = t
+        self.T = T
+        self.a = a
+        self.Y = Y
+        self.steps = steps
+        self.rejected = rejected
+        self.failed = failed
+        self.iterations = iterations
+        self.wall_time = wall_time
+
+    @property
+    def success(self):
+        return np.isfinite(self.Y).all(axis=1) & ~self.failed
+
+    @property
+    def throughput(self):
+        '''cosmologies per second of wall time'''
+        return len(self.eta)/self.wall_time
+
+    def observables(self):
+        return observables(self.names, self.Y)
+
+
+def _subset(background, index):
+    # the background of the members index, without recomputing the constants
+    subset = copy.copy(background)
+    for name in ('eta', 'n_nu', 'eta_ini', 'rho_nu_ini'):
+        setattr(subset, name, getattr(background, name)[index])
+    return subset
+
+
+#compiled batch functions of every SparseNetwork, so repeated runs are not
+#recompiled
+_kernels = weakref.WeakKeyDictionary()
+
+
+def _compile(network):
+    rates_eq = network.rates_eq
+    if network in _kernels and _kernels[network][0] is rates_eq:
+        return _kernels[network][1:]
+    topology = network.topology()
+    pattern = network.jacobian_pattern()
+
+    @numba.njit(parallel=True)
+    def rhs_batch(Y, rho, T, scale):
+        dYdt = np.empty_like(Y)
+        for m in numba.prange(Y.shape[0]):
+            dYdt[m] = rhs_from_rates(Y[m], rho[m], rates_eq(T[m])*scale[m], *topology)
+        return dYdt
+
+    @numba.njit(parallel=True)
+    def jacobian_batch(Y, rho, T, scale):
+        jac = np.empty((Y.shape[0], Y.shape[1], Y.shape[1]))
+        for m in numba.prange(Y.shape[0]):
+            jac[m] = jacobian_from_rates(Y[m], rho[m], rates_eq(T[m])*scale[m], *topology, *pattern)
+        return jac
+
+    _kernels[network] = (rates_eq, rhs_batch, jacobian_batch)
+    return rhs_batch, jacobian_batch
+
+
+@numba.njit(parallel=True)
+def lu_factor_batch(W):
+    '''LU factorization with partial pivoting of every matrix W[m], in place'''
+    N, n = W.shape[0], W.shape[1]
+    pivots = np.empty((N, n), dtype=np.int64)
+    for m in numba.prange(N):
+        A = W[m]
+        for k in range(n):
+            p = k + np.argmax(np.abs(A[k:, k]))
+            pivots[m, k] = p
+            if p != k:
+                for j in range(n):
+                    A[k, j], A[p, j] = A[p, j], A[k, j]
+            if A[k, k] == 0.0:
+                continue
+            for i in range(k+1, n):
+                A[i, k] /= A[k, k]
+                for j in range(k+1, n):
+                    A[i, j] -= A[i, k]*A[k, j]
+    return pivots
+
+
+@numba.njit(parallel=True)
+def lu_solve_batch(LU, pivots, b):
+    '''solve LU[m] x[m] = b[m] for every m, with LU and pivots from lu_factor_batch'''
+    N, n = b.shape
+    x = b.copy()
+    for m in numba.prange(N):
+        for k in range(n):
+            p = pivots[m, k]
+            x[m, k], x[m, p] = x[m, p], x[m, k]
+        for i in range(n):
+            for j in range(i):
+                x[m, i] -= LU[m, i, j]*x[m, j]
+        for i in range(n-1, -1, -1):
+            for j in range(i+1, n):
+                x[m, i] -= LU[m, i, j]*x[m, j]
+            x[m, i] /= LU[m, i, i]
+    return x
+
+
+def integrate_ensemble(network, eta, n_nu=3.046, tau_n=tau_n_rates, t_end=1e5, rtol=1e-6, atol=1e-20,
+                       T_ini=27/TMeV2T9, first_step=None, max_steps=100000, profile=None):
+    '''integrate BBN for every combination of eta, n_nu and tau_n (in s)
+
+    eta, n_nu and tau_n are broadcast against each other, every element is one
+    member of the ensemble.  network is a generated network module or a
+    SparseNetwork and is used for the whole run, starting from thermal
+    equilibrium at T_ini (in MeV) up to t_end (in s).  With a SolverProfile
+    profile the calls of the derivatives, jacobian and LU factorizations
+    are recorded at the median temperature of the members, together with
+    the steps, under the stage 'ensemble'.  Returns an EnsembleResult.'''
+
+    network = sparse_network(network)
+    eta, n_nu, tau_n = (np.ravel(x).astype(np.float64) for x in np.broadcast_arrays(eta, n_nu, tau_n))
+    N, nnuc = len(eta), network.nnuc
+
+    background_all = Background(eta, n_nu, T_ini)
+    m_nucs = masses(network.names, network.A)
+    rhs_batch, jacobian_batch = _compile(network)
+
+    #the weak rates of the network are scaled to the neutron lifetime of every member
+    scale = lifetime_scale(network.rate_names, tau_n)
+
+    def derivatives(y, members):
+        background = _subset(background_all, members)
+        T, a, Y = y[:, 0], y[:, 1], np.ascontiguousarray(y[:, 2:])
+        F = np.empty_like(y)
+        dTdt, dadt = background.derivatives(T, a)
+        F[:, 0] = dTdt*timeunit
+        F[:, 1] = dadt*timeunit
+        F[:, 2:] = rhs_batch(Y, background.rho_b_cgs(Y, a, m_nucs), T*TMeV2T9*1e9, scale[members])
+        return F
+
+    def jacobian(y, F, members):
+        #the network block is exact, its dependence on T and on the density
+        #and the background rows are taken by finite differences
+        background = _subset(background_all, members)
+        T, a, Y = y[:, 0], y[:, 1], np.ascontiguousarray(y[:, 2:])
+        T9 = T*TMeV2T9*1e9
+        rho = background.rho_b_cgs(Y, a, m_nucs)
+        J = np.empty((len(members), nnuc + 2, nnuc + 2))
+        J[:, 2:, 2:] = jacobian_batch(Y, rho, T9, scale[members])
+
+        dT = 1e-7*T
+        J[:, 2:, 0] = (rhs_batch(Y, rho, T9*(1 + 1e-7), scale[members]) - F[:, 2:])/dT[:, None]
+        drho = (rhs_batch(Y, rho*(1 + 1e-7), T9, scale[members]) - F[:, 2:])/(1e-7*rho)[:, None]
+        J[:, 2:, 1] = drho*(-3*rho/a)[:, None]
+        J[:, 2:, 2:] += drho[:, :, None]*(rho/np.sum(m_nucs*Y, axis=1))[:, None, None]*m_nucs
+
+        da = 1e-7*a
+        J[:, :2, 2:] = 0.0
+        J[:, :2, 0] = (np.array(background.derivatives(T + dT, a)).T*timeunit - F[:, :2])/dT[:, None]
+        J[:, :2, 1] = (np.array(background.derivatives(T, a + da)).T*timeunit - F[:, :2])/da[:, None]
+        return J
+
+    factor_batch, solve_batch = lu_factor_batch, lu_solve_batch
+    if profile is not None:
+        temperature = lambda y, *args: float(np.median(y[:, 0]))
+        derivatives = profile.timed('rhs', derivatives, temperature)
+        jacobian = profile.timed('jacobian', jacobian, temperature)
+        factor_batch = profile.timed('lu', lu_factor_batch)
+        solve_batch = profile.timed('solve', lu_solve_batch)
+
+    y = np.empty((N, nnuc + 2))
+    y[:, 0] = T_ini
+    y[:, 1] = 1.0
+    y[:, 2:] = thermal_abundances(network.names, network.A, network.Z, T_ini, background_all.eta_ini)
+    t = np.full(N, background_all.t_ini/timeunit)
+    h = np.full(N, 1e-6*t[0] if first_step is None else first_step)
+    steps = np.zeros(N, dtype=np.int64)
+    rejected = np.zeros(N, dtype=np.int64)
+    failed = np.zeros(N, dtype=np.bool_)
+    F = derivatives(y, np.arange(N))
+
+    start = time.perf_counter()
+    iterations = 0
+    active = np.arange(N)
+    stage = profile.stage('ensemble') if profile is not None else contextlib.nullcontext()
+    with stage:
+        while len(active):
+            iterations += 1
+            ya, Fa = y[active], F[active]
+            ha = np.minimum(h[active], t_end - t[active])
+            hc = ha[:, None]
+
+            #one Rosenbrock step for every active member
+            W = np.eye(nnuc + 2)/(_gamma*ha)[:, None, None] - jacobian(ya, Fa, active)
+            pivots = factor_batch(W)
+            K = np.empty((6,) + ya.shape)
+            for i in range(6):
+                Fi = Fa if i == 0 else derivatives(ya + np.tensordot(_A[i, :i], K[:i], 1), active)
+                K[i] = solve_batch(W, pivots, Fi + np.tensordot(_C[i, :i], K[:i], 1)/hc)
+            y_new = ya + np.tensordot(_M, K, 1)
+            error = K[5]
+
+            scale_y = atol + rtol*np.maximum(np.abs(ya), np.abs(y_new))
+            with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+                norm = np.max(np.abs(error)/scale_y, axis=1)
+                accepted = norm <= 1.0
+                factor = np.clip(0.9*norm**(-1/4), 0.2, np.where(accepted, 6.0, 0.9))
+            factor[~np.isfinite(norm)] = 0.2
+
+            done = active[accepted]
+            y[done] = y_new[accepted]
+            t[done] += ha[accepted]
+            steps[done] += 1
+            rejected[active[~accepted]] += 1
+            if profile is not None:
+                profile.count_steps(np.sum(accepted), np.sum(~accepted))
+            h[active] = ha*factor
+
+            finished = (t[active] >= t_end) | (steps[active] + rejected[active] >= max_steps)
+            failed[active[finished & (t[active] < t_end)]] = True
+            active = active[~finished]
+            update = active[np.isin(active, done)]
+            if len(update):
+                F[update] = derivatives(y[update], update)
+
+    return EnsembleResult(network.names, eta, n_nu, tau_n, t, y[:, 0], y[:, 1], y[:, 2:],
+                          steps, rejected, failed, iterations, time.perf_counter() - start)
@@ -0,0 +1,98 @@
+"""Abundances in equilibrium with the network, for the start of a BBN run.
+
+At the start of a run the nuclei are far faster than the expansion, so their
+abundances sit where the network leaves them unchanged.  The thermal
+abundances of nuclear.thermal_abundances are close to this, but not close
+enough for the stiff solvers, which would otherwise spend their first steps
+relaxing them.  equilibrium_initial_state solves dY/dt = 0 for the nuclides
+that are not held fixed.  When none are, the network conserves baryon number
+and the equation of the most abundant nuclide is replaced by sum(A*Y) = 1,
+which also puts n and p in equilibrium under the weak rates.
+"""
+
+import numpy as np
+import scipy.linalg as la
+
+from APODORA.networks import sparse_network
+
+#abundances are kept above this, so ln(Y) exists
+abundance_floor = 1e-300
+
+
+def equilibrium_initial_state(network, T, rho, Y_guess, fixed=('n', 'h1'), scale=None,
+                              rtol=1e-10, max_iterations=100, tabulated=None):
+    '''abundances Y with dY/dt = 0 for every nuclide of network not in fixed,
+    at temperature T (in K) and density rho (in g/cm^3), starting from Y_guess
+
+    With fixed=() every nuclide is solved for, under baryon number
+    conservation.  The equations are solved for ln(Y) with a damped Newton method, in the
+    form of Levenberg and Marquardt: the step solves (J - lambda I) dlnY = -r
+    with one LU factorization, and lambda is raised until the step lowers
+    |r|, and lowered again after every accepted step.  r_i is the log of the
+    ratio of production to destruction of nuclide i, so the solve stops when
+    every imbalance is below rtol of the destruction rate.
+    scale multiplies the rates of the network (see nuclear.lifetime_scale),
+    after the TabulatedRates tabulated replaced theirs (see
+    networks/overrides.py).
+    Raises RuntimeError if it does not converge in max_iterations.'''
+
+    network = sparse_network(network)
+    rates = network.rates(T)
+    if tabulated is not None:
+        rates = tabulated(T, rates)
+    if scale is not None:
+        rates = rates*scale
+    free = np.array([name not in fixed for name in network.names])
+
+    Y = np.array(Y_guess, dtype=np.float64)
+    Y[free] = np.maximum(Y[free], abundance_floor)
+    #the nuclide whose equation is replaced by baryon number conservation
+    conserved = np.argmax(Y) if np.all(free) else None
+
+    def residual(Y):
+        #ln(production/destruction) and dY/dt relative to the destruction
+        dYdt = network.rhs_rates_eq(Y, rho, rates)[free]
+        destruction = np.maximum(-np.diag(network.jacobian_rates_eq(Y, rho, rates))[free],
+                                 np.finfo(np.float64).tiny)
+        x = np.maximum(dYdt/(Y[free]*destruction), np.finfo(np.float64).eps - 1)
+        r = np.log1p(x)
+        if conserved is not None:
+            r[conserved] = np.sum(network.A*Y) - 1
+        return r, x, destruction
+
+    #the damping has the sign of the diagonal of the jacobian, which is
+    #negative for the rate equations and positive for conservation
+    damping = -np.ones(np.sum(free))
+    if conserved is not None:
+        damping[conserved] = 1.0
+
+    r, x, destruction = residual(Y)
+    lam = 0.0
+    for iteration in range(max_iterations):
+        if np.max(np.abs(r)) < rtol:
+            return Y
+
+        #d r_i/d ln(Y_j), holding the destruction rates constant
+        jac = network.jacobian_rates_eq(Y, rho, rates)[np.ix_(free, free)]
+        jac = (jac*Y[free]/(Y[free]*destruction)[:, None] - np.diag(x))/(1 + x)[:, None]
+        if conserved is not None:
+            jac[conserved] = network.A*Y
+
+        norm = np.sum(r**2)
+        while True:
+            dlnY = la.lu_solve(la.lu_factor(jac + lam*np.diag(damping)), -r)
+            #steps beyond a factor e**10 are not trusted to the linearization
+            dlnY *= min(1.0, 10/np.max(np.abs(dlnY)))
+            trial = Y.copy()
+            trial[free] = np.maximum(Y[free]*np.exp(dlnY), abundance_floor)
+            r_trial, x_trial, destruction_trial = residual(trial)
+            if np.all(np.isfinite(r_trial)) and np.sum(r_trial**2) < norm:
+                break
+            lam = max(10*lam, 1e-3)
+            if lam > 1e12:
+                raise RuntimeError(f'equilibrium not found, |r| = {np.max(np.abs(r)):.2e}')
+        Y, r, x, destruction = trial, r_trial, x_trial, destruction_trial
+        lam = lam/10 if lam > 1e-6 else 0.0
+
+    raise RuntimeError(f'equilibrium not reached in {max_iterations} iterations, '
+                       f'|r| = {np.max(np.abs(r)):.2e}')
@@ -1,2 +1,8 @@
 
-from .create_net import (BBN_net,write_AoTnetwork)
\ No newline at end of file
+from .create_net import (BBN_net,write_AoTnetwork)
+from .transforms import (share_rates,batch_rates,log_abundances)
+from .sparse import (SparseNetwork,sparse_network)
+from .rate_table import RateTable
+from .reduction import FluxPruning
+from .weak_rates import WeakRateTable
+from .overrides import RateOverrides
@@ -0,0 +1,163 @@
+"""Ahead-of-time builds of the generated networks as extension modules.
+
+A build exports the functions of a network module without screening, with
+the signatures the modules have in python:
+
+    nnuc()                              number of nuclides
+    rhs(t, Y, rho, T)                   dY/dt
+    jacobian(t, Y, rho, T)              d(dY/dt)/dY
+    rhs_and_jacobian(t, Y, rho, T)      both from one evaluation of the rates
+
+The extension is the C source of c_kernel.py (which exports the rates as
+well), compiled by setuptools with the C compiler of the interpreter; the
+numba.pycc that compiled the numba functions of the module before is
+deprecated.  It is written into cache_directory()/aot under a name holding the
+hash of the network source, of the modules writing the C source and of the
+versions it is compiled with, and the suffix of the interpreter, so a build is
+made again exactly when one of them changed.  The networks whose hand-edited
+rates can not be translated to C have no build.  load() takes the build of the
+running interpreter, or the jit compiled functions of the network module if
+there is none:
+
+    python -m APODORA.networks.aot [--force] full_size_net [network ...]
+"""
+
+import glob
+import hashlib
+import importlib
+import importlib.util
+import os
+import sys
+import sysconfig
+import tempfile
+
+import numpy as np
+
+from ..background import cache_directory
+from .cache import network_hash
+
+#written into the key of a build, change it with the exports
+build_version = 2
+#the modules writing the C source of a build
+_generators = ('c_kernel.py', 'sparse.py', 'weak_rates.py')
+
+
+def _module(network):
+    return importlib.import_module(network) if isinstance(network, str) else network
+
+
+def build_key(network):
+    '''hexadecimal SHA-256 of the source of the network module, of the
+    modules writing its C source and of the versions of the build'''
+    generators = []
+    for name in _generators:
+        with open(os.path.join(os.path.dirname(__file__), name), 'rb') as f:
+            generators.append(hashlib.sha256(f.read()).hexdigest())
+    versions = (network_hash(_module(network)), *generators, build_version, np.__version__)
+    return hashlib.sha256(repr(versions).encode()).hexdigest()
+
+
+def build_filename(network, directory=None):
+    '''the file of the build of network for the running interpreter'''
+    network = _module(network)
+    directory = os.path.join(cache_directory(), 'aot') if directory is None else directory
+    stem = f'{network.__name__}_{build_key(network)[:16]}'
+    return os.path.join(directory, stem + sysconfig.get_config_var('EXT_SUFFIX'))
+
+
+def compile_extension(source, stem, directory, verbose=False):
+    '''compile the C source of the extension module stem with setuptools
+    and the C compiler of the interpreter into directory'''
+    from setuptools import Distribution, Extension
+    from setuptools.command.build_ext import build_ext
+
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.TemporaryDirectory() as temporary:
+        c_file = os.path.join(temporary, stem + '.c')
+        with open(c_file, 'w') as f:
+            f.write(source)
+        #keep the order of the operations, as numba does without fastmath
+        arguments = [] if sys.platform == 'win32' else ['-O2', '-ffp-contract=off']
+        extension = Extension(stem, [c_file], include_dirs=[np.get_include()], extra_compile_args=arguments)
+        command = build_ext(Distribution({'ext_modules': [extension]}))
+        command.build_lib, command.build_temp = directory, temporary
+        command.verbose = verbose
+        command.ensure_finalized()
+        command.run()
+    return os.path.join(directory, stem + sysconfig.get_config_var('EXT_SUFFIX'))
+
+
+def build(network, directory=None, force=False, verbose=False):
+    '''compile network (a module or its name) ahead of time, unless it was
+    built already for its current source, and return the file of the
+    build.  The builds of earlier sources are removed'''
+    from .c_kernel import extension_source
+
+    network = _module(network)
+    filename = build_filename(network, directory)
+    if os.path.exists(filename) and not force:
+        return filename
+
+    directory = os.path.dirname(filename)
+    stem = os.path.basename(filename)[:-len(sysconfig.get_config_var('EXT_SUFFIX'))]
+    compile_extension(extension_source(network, stem), stem, directory, verbose)
+
+    for old in glob.glob(os.path.join(directory, f'{network.__name__}_' + '?'*16 + '.*')):
+        if old != filename and old.endswith(sysconfig.get_config_var('EXT_SUFFIX')):
+            os.remove(old)
+    return filename
+
+
+class CompiledNetwork:
+    '''nnuc, rhs, jacobian and rhs_and_jacobian of a network, from its
+    ahead-of-time build if compiled is True and from the network module
+    otherwise.  filename is the file of the build'''
+
+    def __init__(self, network, extension=None, filename=None):
+        self.name = network.__name__
+        self.compiled = extension is not None
+        self.filename = filename
+        source = extension if self.compiled else network
+        self.nnuc = int(extension.nnuc()) if self.compiled else network.nnuc
+        self.rhs = source.rhs
+        self.jacobian = source.jacobian
+        if self.compiled or hasattr(network, 'rhs_and_jacobian'):
+            self.rhs_and_jacobian = source.rhs_and_jacobian
+        else:
+            self.rhs_and_jacobian = lambda t, Y, rho, T: (network.rhs(t, Y, rho, T), network.jacobian(t, Y, rho, T))
+
+    def __repr__(self):
+        return f'CompiledNetwork({self.name}, compiled={self.compiled})'
+
+
+def load(network, directory=None, build_missing=False):
+    '''the CompiledNetwork of network (a module or its name), from the build
+    for its current source and the running interpreter if there is one,
+    which is made first if build_missing is True, and from the jit
+    compiled functions of the network otherwise'''
+    network = _module(network)
+    filename = build(network, directory) if build_missing else build_filename(network, directory)
+    if not os.path.exists(filename):
+        return CompiledNetwork(network)
+
+    stem = os.path.basename(filename).split('.')[0]
+    name = f'_apodora_aot.{stem}'
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(stem, filename)
+        try:
+            extension = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(extension)
+        except ImportError:
+            return CompiledNetwork(network)
+        sys.modules[name] = extension
+    return CompiledNetwork(network, sys.modules[name], filename)
+
+
+def main(arguments):
+    force = '--force' in arguments
+    for name in (a for a in arguments if a != '--force'):
+        print(f'{name}: {build(name, force=force)}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,522 @@
+"""C kernels of the networks, built as CPython extensions.
+
+The C source is written from the SparseNetwork of a network module: the
+ReacLib rates from their coefficients, the hand-edited rates (the weak n <-> p
+rates of weak_rates.py and the rates edited in the modules) translated from their
+python source, and dY/dt and the jacobian from the topology, with the
+products and sums carried out in the order of the kernels of sparse.py.  The
+extension exports the functions of aot.py and the rates:
+
+    nnuc()                              number of nuclides
+    rates(T)                            all rates at temperature T (in K)
+    rhs(t, Y, rho, T)                   dY/dt
+    jacobian(t, Y, rho, T)              d(dY/dt)/dY
+    rhs_and_jacobian(t, Y, rho, T)      both from one evaluation of the rates
+
+It is compiled with the C compiler of the interpreter into cache_directory()/c
+under the hash of the source, and load() returns it as an aot.CompiledNetwork.
+The builds of aot.py are the same extensions, keyed on the network module:
+
+    python -m APODORA.networks.c_kernel full_size_net [network ...]
+"""
+
+import ast
+import hashlib
+import importlib
+import importlib.util
+import inspect
+import math
+import os
+import sys
+import sysconfig
+import textwrap
+
+import numpy as np
+
+from ..background import cache_directory
+from ..nuclear import tau_n_rates
+from .aot import CompiledNetwork, compile_extension
+from .sparse import SparseNetwork, sparse_network
+from .weak_rates import n__p_coefficients, p__n_coefficients, p__n_T9_min, qnp, qpn, z_T9
+
+_functions = {'exp': 'exp', 'log': 'log', 'log10': 'log10', 'sqrt': 'sqrt', 'cbrt': 'cbrt',
+              'power': 'pow', 'pow': 'pow', 'abs': 'fabs', 'fabs': 'fabs', 'minimum': 'fmin',
+              'maximum': 'fmax', 'min': 'fmin', 'max': 'fmax', 'tanh': 'tanh'}
+_operators = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/'}
+_comparisons = {ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=', ast.Eq: '==', ast.NotEq: '!='}
+_tfactors = ('T9', 'T9i', 'T913i', 'T913', 'T953', 'lnT9')
+#the kernels of weak_rates.py called by the rates, written in C by _weak_source
+_weak = ('n__p_rate', 'p__n_rate')
+
+
+def _number(value):
+    if math.isnan(value):
+        return 'NAN'
+    if math.isinf(value):
+        return 'INFINITY' if value > 0 else '(-INFINITY)'
+    return repr(float(value))
+
+
+class _RateTranslator:
+    '''C body of a hand-edited rate function rate(rate_eval, tf), with the
+    constants of its module inlined'''
+
+    def __init__(self, function, constants):
+        self.function = getattr(function, 'py_func', function)
+        self.constants = constants
+        self.loops = set()
+        self.arrays = set()
+        self.assigned = set()
+        self.tables = {}
+
+    def error(self, node, message='is not supported'):
+        raise ValueError(f'{self.function.__name__}: {ast.unparse(node)} {message} in C')
+
+    def translate(self):
+        tree = ast.parse(textwrap.dedent(inspect.getsource(self.function)))
+        definition = tree.body[0]
+        self.rate_eval, self.tf = (a.arg for a in definition.args.args)
+        for node in ast.walk(definition):
+            if isinstance(node, ast.For) and isinstance(node.target, ast.Name):
+                self.loops.add(node.target.id)
+            elif isinstance(node, ast.Assign) and isinstance(node.value, ast.List):
+                self.arrays.update(n.id for n in node.targets if isinstance(n, ast.Name))
+            elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                self.assigned.add(node.id)
+        scalars = sorted(self.assigned - self.loops - self.arrays)
+        lines = [f'double v_{name} = 0.0;' for name in scalars]
+        lines += [f'int v_{name};' for name in sorted(self.loops)]
+        lines += ['double result = NAN;']
+        body = self.block(definition.body)
+        tables = [f'static const double t_{name}[{len(values)}] = {{{", ".join(map(_number, values))}}};'
+                  for name, values in self.tables.items()]
+        return tables + lines + body + ['return result;']
+
+    def table(self, node):
+        '''the C name of the module level array node'''
+        values = self.constants.get(node.id) if isinstance(node, ast.Name) else None
+        if not isinstance(values, np.ndarray) or values.ndim != 1 or node.id in self.assigned:
+            self.error(node, 'is not an array of the module')
+        self.tables[node.id] = values.astype(np.float64)
+        return f't_{node.id}'
+
+    def block(self, statements):
+        lines = []
+        for statement in statements:
+            lines += self.statement(statement)
+        return lines
+
+    def statement(self, node):
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            return []
+        if isinstance(node, ast.Pass):
+            return []
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+            if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name) \
+                    and target.value.id == self.rate_eval:
+                return [f'result = {self.expression(node.value)};']
+            if isinstance(target, ast.Name) and isinstance(node.value, ast.List):
+                values = ', '.join(self.expression(v) for v in node.value.elts)
+                return [f'double v_{target.id}[{len(node.value.elts)}] = {{{values}}};']
+            if isinstance(target, ast.Name):
+                return [f'v_{target.id} = {self.expression(node.value)};']
+        if isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name):
+            name, value = f'v_{node.target.id}', self.expression(node.value)
+            if isinstance(node.op, ast.Pow):
+                return [f'{name} = pow({name}, {value});']
+            if type(node.op) in _operators:
+                return [f'{name} {_operators[type(node.op)]}= {value};']
+        if isinstance(node, ast.If):
+            lines = [f'if ({self.expression(node.test)}) {{'] + self.indent(self.block(node.body))
+            if node.orelse:
+                lines += ['} else {'] + self.indent(self.block(node.orelse))
+            return lines + ['}']
+        if isinstance(node, ast.For) and isinstance(node.iter, ast.Call) and not node.orelse \
+                and isinstance(node.iter.func, ast.Name) and node.iter.func.id == 'range':
+            bounds = [f'(int)({self.expression(a)})' for a in node.iter.args]
+            if len(bounds) == 3:
+                step = node.iter.args[2]
+                if not (isinstance(step, ast.Constant) and isinstance(step.value, int) and step.value > 0):
+                    self.error(node.iter, 'with a step that is not a positive constant')
+            start, stop, step = (['0'] + bounds + ['1'])[-3:] if len(bounds) < 3 else bounds
+            name = f'v_{node.target.id}'
+            return ([f'for ({name} = {start}; {name} < {stop}; {name} += {step}) {{']
+                    + self.indent(self.block(node.body)) + ['}'])
+        self.error(node)
+
+    @staticmethod
+    def indent(lines):
+        return ['    ' + line for line in lines]
+
+    def expression(self, node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool):
+            return _number(node.value)
+        if isinstance(node, ast.Name):
+            if node.id in self.loops | self.arrays | self.assigned:
+                return f'v_{node.id}'
+            if isinstance(self.constants.get(node.id), (int, float, np.number)):
+                return _number(float(self.constants[node.id]))
+            if isinstance(self.constants.get(node.id), np.ndarray):
+                return self.table(node)
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            if node.value.id == self.tf and node.attr in _tfactors:
+                return f'tf->{node.attr}'
+            if node.value.id in ('np', 'numpy', 'math') and node.attr in ('pi', 'e'):
+                return _number(getattr(math, node.attr))
+        if isinstance(node, ast.BinOp):
+            left, right = self.expression(node.left), self.expression(node.right)
+            if isinstance(node.op, ast.Pow):
+                return f'pow({left}, {right})'
+            if type(node.op) in _operators:
+                return f'({left} {_operators[type(node.op)]} {right})'
+        if isinstance(node, ast.UnaryOp):
+            operand = self.expression(node.operand)
+            if isinstance(node.op, ast.USub):
+                return f'(-{operand})'
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            if isinstance(node.op, ast.Not):
+                return f'(!{operand})'
+        if isinstance(node, ast.Compare):
+            terms = [node.left] + node.comparators
+            if all(type(op) in _comparisons for op in node.ops):
+                return '(' + ' && '.join(f'{self.expression(a)} {_comparisons[type(op)]} {self.expression(b)}'
+                                         for a, op, b in zip(terms, node.ops, terms[1:])) + ')'
+        if isinstance(node, ast.BoolOp):
+            operator = ' && ' if isinstance(node.op, ast.And) else ' || '
+            return '(' + operator.join(self.expression(v) for v in node.values) + ')'
+        if isinstance(node, ast.IfExp):
+            return (f'({self.expression(node.test)} ? {self.expression(node.body)} '
+                    f': {self.expression(node.orelse)})')
+        if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name):
+            return f'{self.expression(node.value)}[(int)({self.expression(node.slice)})]'
+        if isinstance(node, ast.Call) and not node.keywords:
+            name = node.func.attr if isinstance(node.func, ast.Attribute) else getattr(node.func, 'id', None)
+            if name == 'interp' and len(node.args) == 3:
+                x, xp, fp = node.args
+                if len(self.constants.get(getattr(xp, 'id', None), ())) != len(self.constants.get(getattr(fp, 'id', None), ())):
+                    self.error(node, 'with tables of different length')
+                return (f'interp({self.expression(x)}, {self.table(xp)}, {self.table(fp)}, '
+                        f'{len(self.tables[xp.id])})')
+            if name in _weak and isinstance(node.func, ast.Name) and len(node.args) == 1:
+                return f'{name}({self.expression(node.args[0])})'
+            if name in _functions:
+                return f'{_functions[name]}({", ".join(self.expression(a) for a in node.args)})'
+        self.error(node)
+
+
+def _horner(coefficients, x):
+    # the products and sums of weak_rates.horner
+    value = '0.0'
+    for c in coefficients[::-1]:
+        value = f'({value}*{x} + {_number(c)})'
+    return value
+
+
+def _weak_source():
+    # n__p_rate(T9) and p__n_rate(T9) of weak_rates.py
+    return ['static inline double n__p_rate(double T9)', '{',
+            f'    double x = T9/{_number(z_T9)};',
+            f'    return {_horner(n__p_coefficients, "x")}*exp(-{_number(qnp)}*x)/{_number(tau_n_rates)};',
+            '}', '',
+            'static inline double p__n_rate(double T9)', '{',
+            f'    if (T9 <= {_number(p__n_T9_min)}) return 0.0;',
+            f'    double x = T9/{_number(z_T9)};',
+            f'    return {_horner(p__n_coefficients, "x")}*exp(-{_number(qpn)}*{_number(z_T9)}/T9)'
+            f'/{_number(tau_n_rates)};',
+            '}', '']
+
+
+def _rates_source(network, module):
+    # rates(T, rates): the ReacLib sets unrolled, then the hand-edited rates
+    lines = _weak_source()
+    for k in network.custom_rates:
+        name = network.rate_names[k]
+        body = _RateTranslator(getattr(module, name), vars(module)).translate()
+        lines += [f'static double rate_{name}(const struct tfactors *tf)', '{']
+        lines += ['    ' + line for line in body] + ['}', '']
+
+    lines += ['static void evaluate_rates(double T, double *rates)', '{',
+              '    struct tfactors factors = get_tfactors(T);',
+              '    const struct tfactors *tf = &factors;',
+              '    for (int k = 0; k < NRATES; k++) rates[k] = 0.0;']
+    names = ['1.0', 'tf->T9i', 'tf->T913i', 'tf->T913', 'tf->T9', 'tf->T953', 'tf->lnT9']
+    for a, k in zip(network.coefficients, network.set_rate):
+        exponent = _number(a[0]) + ''.join(f' + {_number(c)}*{t}' for c, t in zip(a[1:], names[1:]) if c != 0.0)
+        lines.append(f'    rates[{k}] += exp({exponent});')
+    for k in network.custom_rates:
+        lines.append(f'    rates[{k}] = rate_{network.rate_names[k]}(tf);')
+    return lines + ['}', '']
+
+
+def _front(network, k, coefficient=None):
+    front = _number(network.prefactor[k]) + f'*rho_pow[{network.rho_power[k]}]'
+    if coefficient is not None:
+        front = f'{_number(coefficient)}*{_number(network.prefactor[k])}*ipow(rho, {network.rho_power[k]})'
+    return f'({front})*ye' if network.ye_power[k] == 1 else front
+
+
+def _reactants(network, k):
+    return range(network.reactant_ptr[k], network.reactant_ptr[k+1])
+
+
+def _flow(network, k, front):
+    factors = ''.join(f'*ipow(Y[{network.reactant_species[m]}], {network.reactant_power[m]})'
+                      for m in _reactants(network, k))
+    return f'{front}{factors}*rates[{k}]'
+
+
+def _kernels_source(network):
+    # rhs and jacobian from the rates, as rhs_from_rates and jacobian_from_rates
+    prologue = ['    double rho_pow[%d];' % (np.max(network.rho_power) + 1),
+                '    for (int p = 0; p <= %d; p++) rho_pow[p] = ipow(rho, p);' % np.max(network.rho_power)]
+    if np.any(network.ye_power == 1):
+        prologue.append('    double ye = get_ye(Y);')
+
+    lines = ['static void evaluate_rhs(const double *Y, double rho, const double *rates, double *dYdt)', '{']
+    lines += prologue + ['    double flows[NRATES > 0 ? NRATES : 1];']
+    lines += [f'    flows[{k}] = {_flow(network, k, _front(network, k))};' for k in range(network.nrates)]
+    lines += ['    for (int j = 0; j < NNUC; j++) dYdt[j] = 0.0;']
+    for j, k, c, folded in zip(network.stoich_species, network.stoich_rate,
+                               network.stoich_coeff, network.stoich_folded):
+        if folded:
+            lines.append(f'    dYdt[{j}] += {_flow(network, k, _front(network, k, c))};')
+        else:
+            lines.append(f'    dYdt[{j}] += {_number(c)}*flows[{k}];')
+    lines += ['}', '']
+
+    lines += ['static void evaluate_jacobian(const double *Y, double rho, const double *rates, double *jac)', '{']
+    lines += prologue + [f'    double dflows[{max(len(network.reactant_species), 1)}];']
+    for k in range(network.nrates):
+        for m in _reactants(network, k):
+            factors = ''
+            for n in _reactants(network, k):
+                s, p = network.reactant_species[n], network.reactant_power[n]
+                factors += f'*({_number(p)}*ipow(Y[{s}], {p - 1}))' if n == m else f'*ipow(Y[{s}], {p})'
+            lines.append(f'    dflows[{m}] = {_front(network, k)}{factors}*rates[{k}];')
+    lines += ['    for (int e = 0; e < NNUC*NNUC; e++) jac[e] = 0.0;']
+    for position, stoich, reactant in zip(network.jac_position, network.jac_stoich, network.jac_reactant):
+        e = network.jac_row[position]*network.nnuc + network.jac_indices[position]
+        lines.append(f'    jac[{e}] += {_number(network.stoich_coeff[stoich])}*dflows[{reactant}];')
+    return lines + ['}', '']
+
+
+_header = '''\
+/* {name}: C kernels written by APODORA.networks.c_kernel */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#define NPY_NO_DEPRECATED_API NPY_1_7_API_VERSION
+#include <numpy/arrayobject.h>
+#include <math.h>
+
+#define NNUC {nnuc}
+#define NRATES {nrates}
+
+static const double A[NNUC] = {{{A}}};
+static const double Z[NNUC] = {{{Z}}};
+
+struct tfactors {{ double T9, T9i, T913i, T913, T953, lnT9; }};
+
+static struct tfactors get_tfactors(double T)
+{{
+    struct tfactors tf;
+    tf.T9 = T/1.e9;
+    tf.T9i = 1.0/tf.T9;
+    tf.T913i = pow(tf.T9i, 1./3.);
+    tf.T913 = pow(tf.T9, 1./3.);
+    tf.T953 = pow(tf.T9, 5./3.);
+    tf.lnT9 = log(tf.T9);
+    return tf;
+}}
+
+/* the same sequence of products as _ipow of sparse.py */
+static inline double ipow(double y, int p)
+{{
+    double result = 1.0;
+    while (p) {{
+        if (p & 1) result *= y;
+        y *= y;
+        p >>= 1;
+    }}
+    return result;
+}}
+
+/* np.interp of x in the table xp, fp of n points */
+static inline double interp(double x, const double *xp, const double *fp, int n)
+{{
+    if (x <= xp[0]) return fp[0];
+    if (x >= xp[n-1]) return fp[n-1];
+    int low = 0, high = n - 1;
+    while (high - low > 1) {{
+        int middle = (low + high)/2;
+        if (xp[middle] <= x) low = middle; else high = middle;
+    }}
+    double slope = (fp[high] - fp[low])/(xp[high] - xp[low]);
+    return slope*(x - xp[low]) + fp[low];
+}}
+
+static inline double get_ye(const double *Y)
+{{
+    double z = 0.0, a = 0.0;
+    for (int j = 0; j < NNUC; j++) {{
+        z += Z[j]*Y[j];
+        a += A[j]*Y[j];
+    }}
+    return z/a;
+}}
+
+'''
+
+_module = '''\
+/* the rates of the last temperature, shared by rhs and jacobian */
+static double last_T = NAN;
+static double last_rates[NRATES > 0 ? NRATES : 1];
+
+static const double *rates_at(double T)
+{{
+    if (T != last_T) {{
+        evaluate_rates(T, last_rates);
+        last_T = T;
+    }}
+    return last_rates;
+}}
+
+static PyArrayObject *abundances(PyObject *object)
+{{
+    PyArrayObject *Y = (PyArrayObject *)PyArray_FROMANY(object, NPY_DOUBLE, 1, 1, NPY_ARRAY_IN_ARRAY);
+    if (Y != NULL && PyArray_DIM(Y, 0) != NNUC) {{
+        PyErr_Format(PyExc_ValueError, "Y has %zd entries, the network %d nuclides",
+                     (Py_ssize_t)PyArray_DIM(Y, 0), NNUC);
+        Py_DECREF(Y);
+        return NULL;
+    }}
+    return Y;
+}}
+
+static PyObject *py_nnuc(PyObject *self, PyObject *args)
+{{
+    return PyLong_FromLong(NNUC);
+}}
+
+static PyObject *py_rates(PyObject *self, PyObject *args)
+{{
+    double T;
+    if (!PyArg_ParseTuple(args, "d", &T)) return NULL;
+    npy_intp dims[1] = {{NRATES}};
+    PyObject *rates = PyArray_SimpleNew(1, dims, NPY_DOUBLE);
+    if (rates == NULL) return NULL;
+    evaluate_rates(T, (double *)PyArray_DATA((PyArrayObject *)rates));
+    return rates;
+}}
+
+static PyObject *call(PyObject *args, int want_rhs, int want_jacobian)
+{{
+    double t, rho, T;
+    PyObject *object;
+    if (!PyArg_ParseTuple(args, "dOdd", &t, &object, &rho, &T)) return NULL;
+    PyArrayObject *Y = abundances(object);
+    if (Y == NULL) return NULL;
+    const double *rates = rates_at(T);
+    npy_intp dims[2] = {{NNUC, NNUC}};
+    PyObject *dYdt = NULL, *jac = NULL;
+    if (want_rhs && (dYdt = PyArray_SimpleNew(1, dims, NPY_DOUBLE)) != NULL)
+        evaluate_rhs((const double *)PyArray_DATA(Y), rho, rates, (double *)PyArray_DATA((PyArrayObject *)dYdt));
+    if (want_jacobian && (jac = PyArray_SimpleNew(2, dims, NPY_DOUBLE)) != NULL)
+        evaluate_jacobian((const double *)PyArray_DATA(Y), rho, rates, (double *)PyArray_DATA((PyArrayObject *)jac));
+    Py_DECREF(Y);
+    if ((want_rhs && dYdt == NULL) || (want_jacobian && jac == NULL)) {{
+        Py_XDECREF(dYdt);
+        Py_XDECREF(jac);
+        return NULL;
+    }}
+    if (want_rhs && want_jacobian) {{
+        PyObject *both = PyTuple_Pack(2, dYdt, jac);
+        Py_DECREF(dYdt);
+        Py_DECREF(jac);
+        return both;
+    }}
+    return want_rhs ? dYdt : jac;
+}}
+
+static PyObject *py_rhs(PyObject *self, PyObject *args) {{ return call(args, 1, 0); }}
+static PyObject *py_jacobian(PyObject *self, PyObject *args) {{ return call(args, 0, 1); }}
+static PyObject *py_rhs_and_jacobian(PyObject *self, PyObject *args) {{ return call(args, 1, 1); }}
+
+static PyMethodDef methods[] = {{
+    {{"nnuc", py_nnuc, METH_NOARGS, "number of nuclides"}},
+    {{"rates", py_rates, METH_VARARGS, "rates(T), all rates at temperature T (in K)"}},
+    {{"rhs", py_rhs, METH_VARARGS, "rhs(t, Y, rho, T), dY/dt"}},
+    {{"jacobian", py_jacobian, METH_VARARGS, "jacobian(t, Y, rho, T), d(dY/dt)/dY"}},
+    {{"rhs_and_jacobian", py_rhs_and_jacobian, METH_VARARGS,
+     "rhs_and_jacobian(t, Y, rho, T), both from one evaluation of the rates"}},
+    {{NULL, NULL, 0, NULL}}
+}};
+
+static struct PyModuleDef definition = {{PyModuleDef_HEAD_INIT, "{stem}", NULL, -1, methods}};
+
+PyMODINIT_FUNC PyInit_{stem}(void)
+{{
+    import_array();
+    return PyModule_Create(&definition);
+}}
+'''
+
+
+def _network(network):
+    if isinstance(network, str):
+        network = importlib.import_module(network)
+    return network if isinstance(network, SparseNetwork) else sparse_network(network)
+
+
+def kernel_source(network):
+    '''the C source of the kernels of network (a module, its name or its
+    SparseNetwork), without the python module'''
+    network = _network(network)
+    lines = [_header.format(name=network.module.__name__, nnuc=network.nnuc, nrates=network.nrates,
+                            A=', '.join(map(_number, network.A)), Z=', '.join(map(_number, network.Z)))]
+    lines += _rates_source(network, network.module)
+    lines += _kernels_source(network)
+    return '\n'.join(lines)
+
+
+def extension_source(network, stem):
+    '''the C source of the extension module stem of the kernels of network
+    (a module, its name or its SparseNetwork)'''
+    return kernel_source(network) + '\n' + _module.format(stem=stem)
+
+
+def build(network, directory=None, force=False, verbose=False):
+    '''compile the C kernels of network (a module, its name or its
+    SparseNetwork) into an extension, unless it was built already from the
+    same source, and return its file'''
+    network = _network(network)
+    source = kernel_source(network)
+    key = hashlib.sha256((source + _module).encode()).hexdigest()
+    stem = f'{network.module.__name__}_{key[:16]}'
+    directory = os.path.join(cache_directory(), 'c') if directory is None else directory
+    filename = os.path.join(directory, stem + sysconfig.get_config_var('EXT_SUFFIX'))
+    if os.path.exists(filename) and not force:
+        return filename
+    return compile_extension(source + '\n' + _module.format(stem=stem), stem, directory, verbose)
+
+
+def load(network, directory=None):
+    '''the CompiledNetwork of the C kernels of network (a module, its name or
+    its SparseNetwork), built first if there is no build of its source'''
+    network = _network(network)
+    filename = build(network, directory)
+    stem = os.path.basename(filename).split('.')[0]
+    name = f'_apodora_c.{stem}'
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(stem, filename)
+        extension = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(extension)
+        sys.modules[name] = extension
+    return CompiledNetwork(network.module, sys.modules[name], filename)
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:]:
+        print(f'{name}: {build(name, verbose=True)}')
@@ -0,0 +1,148 @@
+"""On-disk compilation cache of the SparseNetworks of the generated networks.
+
+The functions of the generated modules take the RateEval and Tfactors
+jitclasses, whose numba types differ from one process to the next, so numba
+cannot reuse them from its cache and every fresh process compiles them again
+(minutes for full_size_net).  A SparseNetwork only passes arrays and is
+compiled with cache=True instead:
+
+  - the kernels of sparse.py are cached like any numba function
+  - the kernels compiled for a network are closures over its arrays, numba
+    keys them on the contents of the arrays
+  - the hand-edited rates of a network are evaluated by a module written to
+    cache_directory()/networks, named by the hash of the network source, so
+    it is compiled again exactly when the network changes
+
+warm_up compiles all of them for the networks, by default the network
+modules shipped next to fastbbn.py (among them those of its default_stages)
+and those of the registry (see registry.py), so the processes started later
+(e.g. by multiprocessing) load them from the disk:
+
+    python -m APODORA.networks.cache [network ...]
+
+See benchmarks/bench_startup.py for the time it saves.
+"""
+
+import collections
+import hashlib
+import importlib
+import importlib.util
+import os
+import re
+import sys
+
+import numba
+import numpy as np
+
+from ..background import cache_directory
+
+#the directory of fastbbn.py and of the network modules shipped with it
+shipped_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+#the temperature factors of pynucastro.rates.Tfactors, as a tuple numba can cache
+Tfactors = collections.namedtuple('Tfactors', ['T9', 'T9i', 'T913i', 'T913', 'T953', 'lnT9'])
+
+
+@numba.njit(cache=True)
+def tfactors(T):
+    '''the Tfactors at temperature T (in K)'''
+    T9 = T/1.e9
+    T9i = 1.0/T9
+    return Tfactors(T9, T9i, T9i**(1./3.), T9**(1./3.), T9**(5./3.), np.log(T9))
+
+
+def network_hash(module):
+    '''hexadecimal SHA-256 of the source of the network module'''
+    with open(module.__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _custom_source(module, names):
+    # a module evaluating the rates names of module into a numpy record, which
+    # numba can cache unlike the RateEval jitclass
+    lines = ['"""the hand-edited rates of {}, written by APODORA.networks.cache"""'.format(module.__name__),
+             '',
+             'import numba',
+             'import numpy as np',
+             '',
+             'from APODORA.networks.cache import tfactors',
+             f'from {module.__name__} import {", ".join(names)}',
+             '',
+             'rate_dtype = np.dtype([{}])'.format(', '.join(f'({name!r}, np.float64)' for name in names)),
+             '',
+             '',
+             '@numba.njit(cache=True)',
+             'def evaluate_custom(T):',
+             '    tf = tfactors(T)',
+             '    #buffer[0] is a view, the array is kept alive by indexing it at every use',
+             '    buffer = np.zeros(1, dtype=rate_dtype)']
+    lines += [f'    {name}(buffer[0], tf)' for name in names]
+    lines += [f'    rates = np.empty({len(names)}, dtype=np.float64)']
+    lines += [f'    rates[{k}] = buffer[0].{name}' for k, name in enumerate(names)]
+    lines += ['    return rates', '']
+    return '\n'.join(lines)
+
+
+def custom_evaluator(module, names):
+    '''evaluate_custom(T), the rates names of the network module at
+    temperature T (in K), from the module written for the current source of
+    the network'''
+    stem = f'{module.__name__}_{network_hash(module)[:16]}'
+    directory = os.path.join(cache_directory(), 'networks')
+    filename = os.path.join(directory, stem + '.py')
+    source = _custom_source(module, names)
+    if not os.path.exists(filename) or open(filename).read() != source:
+        os.makedirs(directory, exist_ok=True)
+        with open(filename + '.tmp', 'w') as f:
+            f.write(source)
+        os.replace(filename + '.tmp', filename)
+
+    name = f'_apodora_custom_rates.{stem}'
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, filename)
+        evaluator = importlib.util.module_from_spec(spec)
+        sys.modules[name] = evaluator
+        spec.loader.exec_module(evaluator)
+    return sys.modules[name].evaluate_custom
+
+
+def shipped_networks(directory=shipped_directory):
+    '''the names of the generated network modules in directory, those
+    defining the RateEval jitclass'''
+    names = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.py'):
+            with open(os.path.join(directory, filename)) as f:
+                if re.search(r'^class RateEval\b', f.read(), re.M):
+                    names.append(filename[:-len('.py')])
+    return names
+
+
+def warm_up(names=None, verbose=False):
+    '''compile and cache the SparseNetworks of the network modules names, by
+    default the shipped_networks and those registered by registry.py, with
+    their rates, rhs and jacobian of Y and of ln(Y)'''
+    from .sparse import sparse_network
+
+    if names is None:
+        from .registry import registered_modules
+        if shipped_directory not in sys.path:
+            sys.path.append(shipped_directory)
+        modules = {name: importlib.import_module(name) for name in shipped_networks()}
+        modules.update(registered_modules())
+    else:
+        modules = {name: importlib.import_module(name) for name in names}
+    for name, module in modules.items():
+        network = sparse_network(module)
+        Y = np.full(network.nnuc, 1e-10)
+        rates = network.rates(1e9)
+        network.rhs_rates_eq(Y, 1e-5, rates)
+        network.jacobian_rates_eq(Y, 1e-5, rates)
+        network.rhs_log_rates_eq(np.log(Y), 1e-5, rates)
+        network.jacobian_log_rates_eq(np.log(Y), 1e-5, rates)
+        if verbose:
+            print(f'{name}: {network.nnuc} nuclides, {network.nrates} rates')
+
+
+if __name__ == '__main__':
+    warm_up(sys.argv[1:] or None, verbose=True)
@@ -1,53 +1,51 @@
 import pynucastro as pyna
 from APODORA.networks.rates import p__n, n__p
+from APODORA.networks.transforms import share_rates, batch_rates, log_abundances
+from APODORA.networks import aot
+import functools
 import os
 
 
 
-def BBN_net(nuclei):
-    '''create pynucastro network with modified rates for n__p and p__n'''
-    
-    reaclibrary = pyna.ReacLibLibrary()
-    bbn_library = reaclibrary.linking_nuclei(nuclei)
-
-    bbn_library += pyna.Library(rates=[p__n,n__p])
-    bbn_library.remove_rate(bbn_library.get_rate('n__p__weak__wc12'))
-    return pyna.networks.PythonNetwork(libraries=bbn_library)
+@functools.lru_cache(maxsize=None)
+def reaclib_library():
+    '''the ReacLib library of pynucastro, read once'''
+    return pyna.ReacLibLibrary()
 
 
-def write_AoTnetwork(net,networkname):
-    net.write_network(networkname)
+def BBN_net(nuclei, overrides=(p__n, n__p)):
+    '''create pynucastro network with the custom rates overrides, by default
+    the modified rates for n__p and p__n, in place of the ReacLib rates of
+    the same reactions'''
 
-    file=open(networkname, 'a')
-    file.write('''
-    #For AoT compilation of the network
-    def AoT(networkname):
-               
-        """function to compile the network Ahead of Time"""
-               
-        from numba.pycc import CC
-
-        cc = CC(networkname)
-        # Uncomment the following line to print out the compilation steps
-        #cc.verbose = True
+    bbn_library = reaclib_library().linking_nuclei(nuclei)
+    for rate in overrides:
+        for old in bbn_library.get_rates():
+            if sorted(old.reactants) == sorted(rate.reactants) and sorted(old.products) == sorted(rate.products):
+                bbn_library.remove_rate(old)
+    bbn_library += pyna.Library(rates=list(overrides))
+    return pyna.networks.PythonNetwork(libraries=bbn_library)
 
-        #
-        @cc.export('nnuc','i4()')
-        def nNuc():
-            return nnuc
 
-        @cc.export('rhs', 'f8[:](f8, f8[:], f8, f8)')
-        def rhsCC(t, Y, rho, T):
-            return rhs_eq(t, Y, rho, T, None)
+def write_network(net, filename):
+    '''write the network to filename with the rewrites of transforms.py'''
+    net.write_network(filename)
 
-        @cc.export('jacobian', '(f8, f8[:], f8, f8)')
-        def jacobian(t, Y, rho, T):
-            return jacobian_eq(t, Y, rho, T, None)
+    #evaluate the rates once for both rhs and jacobian, and add the batched
+    #and log-abundance versions
+    with open(filename) as file:
+        source = file.read()
+    with open(filename, 'w') as file:
+        file.write(log_abundances(batch_rates(share_rates(source))))
 
 
-        cc.compile()
-    ''') # Write some text
-    file.close() # Close the file
+def write_AoTnetwork(net,networkname,build=False):
+    '''write the network to the file networkname with the rewrites of
+    transforms.py, and compile it ahead of time if build is True (see
+    aot.py, the network has to be importable by its name)'''
+    write_network(net, networkname)
 
     current_directory = os.getcwd()
     print(f'Network saved in {current_directory}')
+    if build:
+        print(f'Network compiled to {aot.build(os.path.splitext(os.path.basename(networkname))[0])}')
@@ -0,0 +1,145 @@
+"""Rates of the networks changed at run time, without touching their source.
+
+Changing a rate used to mean editing the generated module (see the
+#alterrate line of bbn2_test_integrate) or generating it again.  A
+RateOverrides holds, by rate name, multipliers and tables of rates against
+T9 that replace the rate of the network inside the range of the table:
+
+    overrides = RateOverrides({'p_d__he3': 1.1}, {'n__p': (T9, rate)})
+    result = run_bbn(overrides=overrides)
+
+For a network it is bound to the arrays of a TabulatedRates and a
+multiplier vector (multipliers), which are applied to the rate vector taken
+by the *_rates_eq kernels.  The tables are interpolated linearly in ln(rate)
+against ln(T9) by a kernel compiled once, which takes them as arguments, so
+a new RateOverrides, e.g. every sample of a Monte Carlo over the rates, is
+applied without compiling anything again.
+
+The weak n <-> p rates of a WeakRateTable, e.g. read from a table computed
+with the full radiative corrections, replace those of the fit by
+
+    overrides = RateOverrides.from_weak_table(WeakRateTable.from_file('weak_rates.txt'))
+
+which interpolates them by the cubic kernel of the table itself.
+
+Only the paths that take the rate vector apply them: run_bbn, which runs
+every stage on the kernels of its SparseNetwork, equilibrium_initial_state
+and FluxPruning.  The rhs and jacobian of the generated modules, the AoT
+builds of aot.py and the C kernels of c_kernel.py evaluate their rates
+inside and know nothing of them; run_bbn does not take those as stages.
+"""
+
+import numba
+import numpy as np
+
+from .rate_table import rate_floor
+
+
+class TabulatedRates:
+    '''tables of the rates rate_index of a network, replacing them inside
+    their ranges of T9.  The tables of rates m are lnT9[ptr[m]:ptr[m+1]] and
+    lnrate[ptr[m]:ptr[m+1]].  rate_tables are pairs of a RateTable and the
+    indices of its rates in the network (-1 for those it does not have),
+    whose rates replace those of the network inside the table'''
+
+    def __init__(self, rate_index, ptr, lnT9, lnrate, rate_tables=()):
+        self.rate_index = rate_index
+        self.ptr = ptr
+        self.lnT9 = lnT9
+        self.lnrate = lnrate
+        self.rate_tables = rate_tables
+
+    def arrays(self):
+        '''the tables in the form taken by tabulated_rates'''
+        return self.rate_index, self.ptr, self.lnT9, self.lnrate
+
+    def __call__(self, T, rates):
+        '''rates at temperature T (in K) with the tabulated rates replaced,
+        as a new array'''
+        rates = tabulated_rates(T, rates, *self.arrays())
+        for table, index in self.rate_tables:
+            if table.covers(T):
+                rates[index[index >= 0]] = table(T)[index >= 0]
+        return rates
+
+
+class RateOverrides:
+    '''multipliers of the rates and tables replacing them, by rate name
+
+    multipliers maps rate names to factors.  tables maps rate names to pairs
+    of arrays (T9, rate) with T9 increasing, in 1e9 K, and the rate in the
+    units of the network; outside [T9[0], T9[-1]] the rate of the network is
+    kept.  rate_tables are RateTables with the names of their rates, such as
+    a WeakRateTable, which replace them inside their range of T9.  A
+    multiplier also applies to the table of its rate.  Rates that a network
+    does not have are left out when it is bound.'''
+
+    def __init__(self, multipliers=None, tables=None, rate_tables=()):
+        self.factors = {name: float(f) for name, f in (multipliers or {}).items()}
+        self.rate_tables = list(rate_tables)
+        self.tables = {}
+        for name, (T9, rate) in (tables or {}).items():
+            T9 = np.asarray(T9, dtype=np.float64)
+            rate = np.asarray(rate, dtype=np.float64)
+            if T9.ndim != 1 or T9.shape != rate.shape or len(T9) < 2:
+                raise ValueError(f'the table of {name} needs T9 and rate of the same length, at least 2')
+            if np.any(T9 <= 0) or np.any(np.diff(T9) <= 0):
+                raise ValueError(f'the T9 of the table of {name} must be positive and increasing')
+            if np.any(rate < 0):
+                raise ValueError(f'the table of {name} has negative rates')
+            self.tables[name] = (T9, rate)
+        tabulated = [name for table in self.rate_tables for name in table.names]
+        if len(set(tabulated)) < len(tabulated) or set(tabulated) & set(self.tables):
+            raise ValueError('a rate is replaced by more than one table')
+
+    @classmethod
+    def from_weak_table(cls, table, multipliers=None):
+        '''the overrides of n__p and p__n by the WeakRateTable table (see
+        weak_rates.py), with the multipliers'''
+        return cls(multipliers, rate_tables=[table])
+
+    @property
+    def names(self):
+        '''the names of all overridden rates'''
+        return set(self.factors) | set(self.tables) | {name for table in self.rate_tables for name in table.names}
+
+    def multipliers(self, rate_names):
+        '''the multipliers of the rates rate_names, 1 for those not
+        overridden'''
+        return np.array([self.factors.get(name, 1.0) for name in rate_names])
+
+    def tabulated(self, rate_names):
+        '''the TabulatedRates of the tables of the rates rate_names, None if
+        there are none'''
+        index = [k for k, name in enumerate(rate_names) if name in self.tables]
+        rate_tables = [(table, np.array([rate_names.index(name) if name in rate_names else -1
+                                         for name in table.names]))
+                       for table in self.rate_tables if set(table.names) & set(rate_names)]
+        if not index and not rate_tables:
+            return None
+        tables = [self.tables[rate_names[k]] for k in index]
+        ptr = np.cumsum([0] + [len(T9) for T9, _ in tables]).astype(np.int32)
+        lnT9 = np.log(np.concatenate([np.ones(0)] + [T9 for T9, _ in tables]))
+        lnrate = np.log(np.maximum(np.concatenate([np.ones(0)] + [rate for _, rate in tables]), rate_floor))
+        return TabulatedRates(np.array(index, dtype=np.int32), ptr, lnT9, lnrate, rate_tables)
+
+    def __repr__(self):
+        rate_tables = sorted(name for table in self.rate_tables for name in table.names)
+        return f'RateOverrides(multipliers={self.factors}, tables={sorted(self.tables)}, rate_tables={rate_tables})'
+
+
+@numba.njit(cache=True)
+def tabulated_rates(T, rates, rate_index, ptr, lnT9, lnrate):
+    '''a copy of rates at temperature T (in K) with the rates rate_index
+    interpolated in their tables, where T is inside them'''
+    x = np.log(T/1.e9)
+    result = rates.copy()
+    for m in range(rate_index.shape[0]):
+        first = ptr[m]
+        last = ptr[m+1] - 1
+        if x < lnT9[first] or x > lnT9[last]:
+            continue
+        i = min(first + np.searchsorted(lnT9[first:last+1], x, side='right') - 1, last - 1)
+        s = (x - lnT9[i])/(lnT9[i+1] - lnT9[i])
+        result[rate_index[m]] = np.exp(lnrate[i] + s*(lnrate[i+1] - lnrate[i]))
+    return result
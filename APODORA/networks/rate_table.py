@@ -0,0 +1,149 @@
+"""Rates of a network tabulated once on a log T9 grid.
+
+The rates only depend on temperature, so instead of evaluating every ReacLib
+fit at each call, ln(rate) is tabulated against ln(T9) and interpolated,
+either linearly or with a monotone cubic Hermite spline.  The grid is refined
+until the interpolation error, estimated at the midpoints of the grid, is below
+rtol for every rate larger than atol, or until refining stops helping.  Rates
+that do not reach it (the custom p__n rate switches off at T9=1.16) are left to
+be evaluated exactly.
+"""
+
+import numba
+import numpy as np
+
+#smallest rate kept in the table, ln(0) is not
+rate_floor = 1e-300
+
+
+class RateTable:
+    '''rates(T) of a network tabulated on a grid uniform in ln T9
+
+    rates is a function returning all rates at temperature T (in K).
+    table has shape (npoints, nrates) and holds ln(rate), slopes the
+    derivatives d ln(rate)/d ln(T9) used by the cubic interpolation.
+    exact are the indices of the rates that did not reach rtol and must be
+    evaluated directly, error the estimated relative error of every rate.
+    '''
+
+    def __init__(self, rates, T9_min=1e-3, T9_max=30.0, rtol=1e-6, atol=1e-30,
+                 method='cubic', points_per_decade=16, max_points=2**12):
+        if method not in ('linear', 'cubic'):
+            raise ValueError(f'unknown interpolation method {method}')
+
+        self.method = method
+        self.rtol = rtol
+        self.atol = atol
+        self.lnT9_min = np.log(T9_min)
+        self.lnT9_max = np.log(T9_max)
+
+        npoints = int(points_per_decade*np.log10(T9_max/T9_min)) + 1
+        previous = np.full(len(rates(1e9*T9_min)), np.inf)
+        while True:
+            self._tabulate(rates, npoints)
+            self.error = self._midpoint_error(rates)
+            #refining only helps the rates that are still converging
+            failing = self.error > rtol
+            converging = failing & (self.error < 0.5*previous)
+            if not np.any(converging) or 2*npoints - 1 > max_points:
+                break
+            previous = self.error
+            npoints = 2*npoints - 1
+
+        self.exact = np.nonzero(self.error > rtol)[0].astype(np.int32)
+
+    def _tabulate(self, rates, npoints):
+        self.lnT9 = np.linspace(self.lnT9_min, self.lnT9_max, npoints)
+        self.dlnT9 = self.lnT9[1] - self.lnT9[0]
+        values = np.array([rates(1e9*np.exp(x)) for x in self.lnT9])
+        self.table = np.log(np.maximum(values, rate_floor))
+        self.slopes = monotone_slopes(self.table, self.dlnT9)
+
+    def _midpoint_error(self, rates):
+        error = np.zeros(self.table.shape[1])
+        for x in 0.5*(self.lnT9[1:] + self.lnT9[:-1]):
+            exact = rates(1e9*np.exp(x))
+            interpolated = np.exp(self.interpolate_log(x))
+            error = np.maximum(error, np.abs(interpolated - exact)/np.maximum(exact, self.atol))
+        return error
+
+    def arrays(self):
+        '''the table in the form taken by the interpolation kernels'''
+        return (self.lnT9_min, self.dlnT9, self.table, self.slopes,
+                self.method == 'cubic')
+
+    def interpolate_log(self, lnT9):
+        return interpolate_log_rates(lnT9, *self.arrays())
+
+    def __call__(self, T):
+        '''interpolated rates at temperature T (in K), the rates in exact are
+        returned as well but are not accurate to rtol'''
+        return np.exp(self.interpolate_log(np.log(T/1e9)))
+
+    def covers(self, T):
+        return self.lnT9_min <= np.log(T/1e9) <= self.lnT9_max
+
+
+def monotone_slopes(table, dx):
+    '''slopes for a cubic Hermite spline through every column of table
+
+    Fourth order centred differences are used where the data is smooth, and
+    limited as by Fritsch and Carlson so the spline stays monotone between
+    the grid points (the floor of the table and the switch of p__n)'''
+
+    n = table.shape[0]
+    slopes = np.empty_like(table)
+    slopes[0] = (table[1] - table[0])/dx
+    slopes[-1] = (table[-1] - table[-2])/dx
+    slopes[1:-1] = (table[2:] - table[:-2])/(2*dx)
+    if n > 4:
+        slopes[2:-2] = (-table[4:] + 8*table[3:-1] - 8*table[1:-3] + table[:-4])/(12*dx)
+        #one sided differences of the same order at the ends
+        slopes[0] = (-25*table[0] + 48*table[1] - 36*table[2] + 16*table[3] - 3*table[4])/(12*dx)
+        slopes[1] = (-3*table[0] - 10*table[1] + 18*table[2] - 6*table[3] + table[4])/(12*dx)
+        slopes[-1] = (25*table[-1] - 48*table[-2] + 36*table[-3] - 16*table[-4] + 3*table[-5])/(12*dx)
+        slopes[-2] = (3*table[-1] + 10*table[-2] - 18*table[-3] + 6*table[-4] - table[-5])/(12*dx)
+
+    delta = np.diff(table, axis=0)/dx
+    for i in range(n - 1):
+        flat = delta[i] == 0
+        slopes[i, flat] = 0.0
+        slopes[i+1, flat] = 0.0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            alpha = np.where(flat, 0.0, slopes[i]/delta[i])
+            beta = np.where(flat, 0.0, slopes[i+1]/delta[i])
+        slopes[i, alpha < 0] = 0.0
+        slopes[i+1, beta < 0] = 0.0
+        alpha = np.maximum(alpha, 0.0)
+        beta = np.maximum(beta, 0.0)
+
+        radius = alpha**2 + beta**2
+        steep = radius > 9
+        tau = 3/np.sqrt(np.where(steep, radius, 9.0))
+        slopes[i, steep] = tau[steep]*alpha[steep]*delta[i, steep]
+        slopes[i+1, steep] = tau[steep]*beta[steep]*delta[i, steep]
+    return slopes
+
+
+@numba.njit(cache=True)
+def interpolate_log_rates(lnT9, lnT9_min, dlnT9, table, slopes, cubic):
+
+    npoints = table.shape[0]
+    x = (lnT9 - lnT9_min)/dlnT9
+    i = min(max(int(x), 0), npoints - 2)
+    s = x - i
+
+    lnrates = np.empty(table.shape[1], dtype=np.float64)
+    if cubic:
+        h00 = (1 + 2*s)*(1 - s)**2
+        h10 = s*(1 - s)**2*dlnT9
+        h01 = s**2*(3 - 2*s)
+        h11 = s**2*(s - 1)*dlnT9
+        for k in range(table.shape[1]):
+            lnrates[k] = (h00*table[i, k] + h10*slopes[i, k]
+                          + h01*table[i+1, k] + h11*slopes[i+1, k])
+    else:
+        for k in range(table.shape[1]):
+            lnrates[k] = table[i, k] + s*(table[i+1, k] - table[i, k])
+    return lnrates
@@ -0,0 +1,191 @@
+"""Runtime reduction of a SparseNetwork by flux pruning.
+
+Most reactions of the large networks carry a negligible part of the flow into
+and out of every nuclide they touch at any given temperature, e.g. the three-
+and four-body reverse channels like n_p_he4_he4__he3_li7.  FluxPruning keeps
+only the reactions that matter: at the start of every time window it takes the
+molar flows of all reactions, and a reaction stays active if, for one of its
+nuclides, it carries at least threshold of the total flow through that
+nuclide.  Reactions are deactivated and enabled again at every window.
+
+The reduced network is evaluated by kernels compiled once per SparseNetwork,
+which loop over index arrays of the active ReacLib sets, reactions,
+stoichiometry entries and Jacobian contributions.  Changing the active set
+only changes those arrays.  The sums are done in the order of the full
+network, the inactive terms are left out.
+"""
+
+import weakref
+
+import numba
+import numpy as np
+
+from .sparse import _flow, _ipow, molar_flows
+
+#kernels of every SparseNetwork, so repeated runs are not recompiled
+_kernels = weakref.WeakKeyDictionary()
+
+
+def _compile(network):
+    if network in _kernels:
+        return _kernels[network]
+    coefficients, set_rate, nrates = network.coefficients, network.set_rate, network.nrates
+    custom_rates, evaluate_custom = network.custom_rates, network.evaluate_custom
+    (reactant_ptr, reactant_species, reactant_power, prefactor, rho_power, ye_power,
+     stoich_species, stoich_rate, stoich_coeff, stoich_folded, A, Z) = network.topology()
+    jac_position, jac_stoich, jac_reactant, jac_row, jac_indices = network.jacobian_pattern()
+
+    @numba.njit()
+    def rates_eq(T, sets):
+        # the ReacLib sets, the hand-edited rates are always evaluated
+        T9 = T/1.e9
+        T9i = 1.0/T9
+        tfactors = np.array([1.0, T9i, T9i**(1./3.), T9**(1./3.), T9, T9**(5./3.), np.log(T9)])
+        rates = np.zeros(nrates, dtype=np.float64)
+        for i in sets:
+            exponent = coefficients[i, 0]
+            for j in range(1, 7):
+                exponent += coefficients[i, j]*tfactors[j]
+            rates[set_rate[i]] += np.exp(exponent)
+        rates[custom_rates] = evaluate_custom(T)
+        return rates
+
+    @numba.njit()
+    def fronts(Y, rho):
+        rho_pow = np.empty(np.max(rho_power) + 1, dtype=np.float64)
+        for p in range(rho_pow.shape[0]):
+            rho_pow[p] = _ipow(rho, p)
+        return rho_pow, np.sum(Z * Y)/np.sum(A * Y)
+
+    @numba.njit()
+    def rhs_eq(Y, rho, rates, reactions, entries):
+        rho_pow, ye = fronts(Y, rho)
+        flows = np.zeros(nrates, dtype=np.float64)
+        for k in reactions:
+            front = prefactor[k]*rho_pow[rho_power[k]]
+            if ye_power[k] == 1:
+                front *= ye
+            flows[k] = _flow(k, front, Y, rates, reactant_ptr, reactant_species, reactant_power)
+
+        dYdt = np.zeros(Y.shape[0], dtype=np.float64)
+        for m in entries:
+            k = stoich_rate[m]
+            if stoich_folded[m]:
+                front = stoich_coeff[m]*prefactor[k]*_ipow(rho, rho_power[k])
+                if ye_power[k] == 1:
+                    front *= ye
+                dYdt[stoich_species[m]] += _flow(k, front, Y, rates, reactant_ptr, reactant_species, reactant_power)
+            else:
+                dYdt[stoich_species[m]] += stoich_coeff[m]*flows[k]
+        return dYdt
+
+    @numba.njit()
+    def jacobian_eq(Y, rho, rates, reactions, contributions):
+        rho_pow, ye = fronts(Y, rho)
+        dflows = np.zeros(reactant_species.shape[0], dtype=np.float64)
+        for k in reactions:
+            front = prefactor[k]*rho_pow[rho_power[k]]
+            if ye_power[k] == 1:
+                front *= ye
+            for m in range(reactant_ptr[k], reactant_ptr[k+1]):
+                dflow = front
+                for n in range(reactant_ptr[k], reactant_ptr[k+1]):
+                    if n == m:
+                        dflow *= reactant_power[m]*_ipow(Y[reactant_species[m]], reactant_power[m] - 1)
+                    else:
+                        dflow *= _ipow(Y[reactant_species[n]], reactant_power[n])
+                dflows[m] = dflow*rates[k]
+
+        values = np.zeros(jac_indices.shape[0], dtype=np.float64)
+        for c in contributions:
+            values[jac_position[c]] += stoich_coeff[jac_stoich[c]]*dflows[jac_reactant[c]]
+        jac = np.zeros((Y.shape[0], Y.shape[0]), dtype=np.float64)
+        for e in range(values.shape[0]):
+            jac[jac_row[e], jac_indices[e]] = values[e]
+        return jac
+
+    _kernels[network] = (rates_eq, rhs_eq, jacobian_eq)
+    return _kernels[network]
+
+
+class FluxPruning:
+    '''the reactions of network with a relative flow above threshold,
+    updated at the start of every window of ln(t)
+
+    Used in place of the network in a solver: rates(T), rhs_rates_eq and
+    jacobian_rates_eq work on the active reactions only.  update(t, Y, rho,
+    T) has to be called before them, it chooses the active reactions when t
+    (in s) has passed the end of the current window.  scale multiplies the
+    rates (see nuclear.lifetime_scale), after the TabulatedRates tabulated
+    replaced theirs (see overrides.py).  The rates are evaluated from their
+    ReacLib sets, a RateTable of the network is not used.  history holds the
+    time and number of active reactions of every update.'''
+
+    def __init__(self, network, threshold=1e-8, window=0.1, scale=None, tabulated=None):
+        self.network = network
+        self.threshold = threshold
+        self.window = window
+        self.scale = np.ones(network.nrates) if scale is None else np.asarray(scale, dtype=np.float64)
+        self.tabulated = tabulated
+        self.history = []
+        self._rates_eq, self._rhs_eq, self._jacobian_eq = _compile(network)
+        self._t_next = None
+        self._select(np.ones(network.nrates, dtype=np.bool_))
+
+    def importance(self, Y, rho, T):
+        '''largest share of the flow through one of its nuclides carried by
+        every reaction, at abundances Y, density rho and temperature T (in K)'''
+        net = self.network
+        rates = net.rates(T) if self.tabulated is None else self.tabulated(T, net.rates(T))
+        flows = molar_flows(Y, rho, rates*self.scale, *net.topology()[:6], net.A, net.Z)
+        contribution = np.abs(net.stoich_coeff*flows[net.stoich_rate])
+        total = np.bincount(net.stoich_species, contribution, minlength=net.nnuc)[net.stoich_species]
+        share = np.divide(contribution, total, out=np.zeros_like(contribution), where=total > 0)
+        importance = np.zeros(net.nrates)
+        np.maximum.at(importance, net.stoich_rate, share)
+        return importance
+
+    def update(self, t, Y, rho, T):
+        '''choose the active reactions if t (in s) has passed the end of the
+        current window.  Returns True if they were chosen again'''
+        if self._t_next is not None and t < self._t_next:
+            return False
+        self._select(self.importance(Y, rho, T) >= self.threshold)
+        self._t_next = t*np.exp(self.window)
+        self.history.append((t, self.nactive))
+        return True
+
+    def _select(self, active):
+        net = self.network
+        self.active = active
+        self.nactive = int(np.sum(active))
+        self._sets = np.flatnonzero(active[net.set_rate])
+        self._reactions = np.flatnonzero(active)
+        self._entries = np.flatnonzero(active[net.stoich_rate])
+        self._contributions = np.flatnonzero(active[net.stoich_rate[net.jac_stoich]])
+        self._last_T = None
+
+    def rates(self, T):
+        '''the rates at temperature T (in K) multiplied by scale, 0 for the
+        inactive ReacLib rates'''
+        if T != self._last_T:
+            rates = self._rates_eq(T, self._sets)
+            if self.tabulated is not None:
+                rates = self.tabulated(T, rates)
+            self._last_rates = rates*self.scale
+            self._last_T = T
+        return self._last_rates
+
+    def rhs_rates_eq(self, Y, rho, rates):
+        return self._rhs_eq(Y, rho, rates, self._reactions, self._entries)
+
+    def jacobian_rates_eq(self, Y, rho, rates):
+        return self._jacobian_eq(Y, rho, rates, self._reactions, self._contributions)
+
+    def report(self):
+        '''number of reactions, updates and the least, mean and most active
+        reactions over the updates'''
+        active = np.array([n for _, n in self.history]) if self.history else np.array([self.nactive])
+        return {'reactions': self.network.nrates, 'updates': len(self.history),
+                'min active': int(active.min()), 'mean active': float(active.mean()),
+                'max active': int(active.max())}
@@ -0,0 +1,124 @@
+"""Registry of the networks generated by BBN_net.
+
+A network is registered under the hash of its nuclides, the source of its
+custom rates, the pynucastro version and the rewrites of transforms.py.  The
+first request writes the module to cache_directory()/registry, with a JSON
+description next to it; later requests import it from there, and requests in
+the same process get the module already imported, with the functions it has
+compiled:
+
+    from APODORA.networks import registry
+    net = registry.network(['n', 'p', 'd', 't', 'he3', 'he4'])
+    compiled = registry.compiled_network(['n', 'p', 'd', 't', 'he3', 'he4'])
+
+The compiled artifacts are those of aot.py and cache.py, which are keyed on
+the source of the module, so they are found again with it.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+
+import pynucastro as pyna
+
+from ..background import cache_directory
+from . import aot, transforms
+from .create_net import BBN_net, write_network
+from .rates import n__p, p__n
+
+#written into the key of a network, change it with the generated source
+registry_version = 1
+
+#the modules registered in this process by key
+_modules = {}
+
+
+def _directory(directory):
+    return os.path.join(cache_directory(), 'registry') if directory is None else directory
+
+
+def nuclide_names(nuclei):
+    '''the sorted distinct names of nuclei, names or pynucastro.Nucleus, in
+    the spelling of pynucastro.Nucleus.short_spec_name (h1 for p)'''
+    return sorted({pyna.Nucleus(str(nucleus)).short_spec_name for nucleus in nuclei})
+
+
+def network_key(nuclei, overrides=(p__n, n__p)):
+    '''hexadecimal SHA-256 of the nuclides, the custom rates overrides, the
+    pynucastro version and the rewrites of the network'''
+    with open(transforms.__file__, 'rb') as f:
+        rewrites = hashlib.sha256(f.read()).hexdigest()
+    rates = sorted((rate.fname, rate.function_string_py()) for rate in overrides)
+    key = (registry_version, nuclide_names(nuclei), rates, pyna.__version__, rewrites)
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+def _import(name, filename):
+    spec = importlib.util.spec_from_file_location(name, filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def network(nuclei, overrides=(p__n, n__p), directory=None):
+    '''the network module of BBN_net(nuclei, overrides), generated on the
+    first request and imported from directory (by default
+    cache_directory()/registry) on the later ones'''
+    key = network_key(nuclei, overrides)
+    if key in _modules:
+        return _modules[key]
+
+    name = f'network_{key[:16]}'
+    directory = _directory(directory)
+    filename = os.path.join(directory, name + '.py')
+    if not os.path.exists(filename):
+        os.makedirs(directory, exist_ok=True)
+        write_network(BBN_net(nuclide_names(nuclei), overrides), filename + '.tmp')
+        with open(os.path.join(directory, name + '.json'), 'w') as f:
+            json.dump({'key': key, 'nuclei': nuclide_names(nuclei),
+                       'overrides': sorted(rate.fname for rate in overrides),
+                       'pynucastro': pyna.__version__}, f, indent=1)
+        os.replace(filename + '.tmp', filename)
+
+    #the rates cached by cache.py and pickled functions import the network by its name
+    if directory not in sys.path:
+        sys.path.append(directory)
+    _modules[key] = sys.modules.get(name) or _import(name, filename)
+    return _modules[key]
+
+
+def compiled_network(nuclei, overrides=(p__n, n__p), directory=None, build_missing=True):
+    '''the aot.CompiledNetwork of network(nuclei, overrides, directory), built
+    ahead of time the first time if build_missing is True'''
+    return aot.load(network(nuclei, overrides, directory), build_missing=build_missing)
+
+
+def registered(directory=None):
+    '''the descriptions of the networks in directory, by the name of their
+    module'''
+    directory = _directory(directory)
+    if not os.path.isdir(directory):
+        return {}
+    descriptions = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.json'):
+            with open(os.path.join(directory, filename)) as f:
+                descriptions[filename[:-len('.json')]] = json.load(f)
+    return descriptions
+
+
+def registered_modules(directory=None):
+    '''the network modules in directory, imported by the name of their
+    module'''
+    directory = _directory(directory)
+    modules = {}
+    for name, description in registered(directory).items():
+        if directory not in sys.path:
+            sys.path.append(directory)
+        module = sys.modules.get(name) or _import(name, os.path.join(directory, name + '.py'))
+        _modules.setdefault(description['key'], module)
+        modules[name] = module
+    return modules
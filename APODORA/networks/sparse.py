@@ -0,0 +1,574 @@
+"""Array driven evaluation of networks written by pynucastro.
+
+The generated network modules (full_size_net, Newrate_net, ...) spell out every
+term of dY/dt and of the Jacobian by hand, which makes them slow to compile.
+SparseNetwork reads the reaction list of such a module and stores it as integer
+arrays, so that dY/dt is evaluated as one gather/multiply/scatter-add pass over
+the reactions.
+
+Rates in plain ReacLib form are read from the source of the generated rate
+functions and evaluated from a coefficient table.  Only rates that have been
+edited by hand (custom weak rates, interpolated tables, ...) are compiled from
+the module itself.
+
+The rates can also be tabulated once on a temperature grid and interpolated,
+see SparseNetwork.tabulate_rates and rate_table.RateTable.
+
+The compiled kernels are kept on disk, see cache.py.
+
+Screening is not supported, all networks in this project are run without it.
+"""
+
+import inspect
+import re
+from math import factorial
+
+import numba
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .cache import custom_evaluator
+from .rate_table import RateTable, interpolate_log_rates
+
+
+def parse_rate_name(name):
+    '''split a pynucastro rate name like "n_p_he4_he4__he3_li7" or
+    "p_p__d__weak__electron_capture" into reactants, products and a flag
+    telling if the rate is an electron capture'''
+
+    parts = name.split('__')
+    reactants = parts[0].split('_')
+    products = parts[1].split('_')
+    electron_capture = 'electron_capture' in parts[2:]
+    return reactants, products, electron_capture
+
+
+_tfactor_names = ['T9i', 'T913i', 'T913', 'T9', 'T953', 'lnT9']
+_number = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+
+
+def reaclib_sets(function, name):
+    '''ReacLib coefficients a0..a6 of every set in a generated rate function,
+    or None if the function has been edited and is not a plain ReacLib rate'''
+
+    source = inspect.getsource(getattr(function, 'py_func', function))
+    body = []
+    for line in source.split('\n')[1:]:
+        line = line.split('#')[0].strip()
+        if line and not line.startswith('def '):
+            body.append(line)
+    body = ' '.join(body)
+
+    statement = rf'rate = 0\.0 ((?:rate \+= np\.exp\([^()]*\) ?)*)rate_eval\.{name} = rate'
+    match = re.fullmatch(statement, body)
+    if match is None:
+        return None
+
+    sets = []
+    for exponent in re.findall(r'np\.exp\(([^()]*)\)', match.group(1)):
+        terms = [term.strip() for term in re.split(r'\+ (?=[-\d.])', exponent.strip())]
+        a = np.zeros(7)
+        for term in terms:
+            if re.fullmatch(_number, term):
+                a[0] = float(term)
+                continue
+            factor = re.fullmatch(rf'({_number})\*tf\.(\w+)', term)
+            if factor is None or factor.group(2) not in _tfactor_names:
+                return None
+            a[1 + _tfactor_names.index(factor.group(2))] = float(factor.group(1))
+        sets.append(a)
+    return sets
+
+
+@numba.njit(cache=True)
+def _no_custom_rates(T):
+    return np.empty(0, dtype=np.float64)
+
+
+def _custom_evaluator(module, names):
+    '''compile a function returning the hand-edited rates of the module'''
+    if not names:
+        return _no_custom_rates
+    return custom_evaluator(module, names)
+
+
+class SparseNetwork:
+    '''reaction network evaluated from integer arrays describing its topology
+
+    network = SparseNetwork(full_size_net) can be used in place of the module,
+    network.rhs and network.jacobian take the same arguments as the generated
+    rhs and jacobian.
+
+    Every reaction k contributes the molar flow
+
+        flow_k = prefactor_k * rho**rho_power_k * ye**ye_power_k * prod_s Y_s**power_ks * rate_k
+
+    where prefactor_k holds the symmetry factor for identical reactants.  The
+    flows are scattered into dY/dt through the stoichiometry entries (species,
+    reaction, coefficient).  Factors and entries are ordered like the terms of
+    the generated rhs_eq, so the sums are carried out in the same order.
+    '''
+
+    def __init__(self, module, rate_names=None):
+        if rate_names is None:
+            rate_names = list(module.RateEval.class_type.struct)
+
+        self.module = module
+        self.nnuc = module.nnuc
+        #lower case like the other networks, np_net has 'H1'
+        self.names = [name.lower() for name in module.names]
+        self.rate_names = list(rate_names)
+        self.nrates = len(self.rate_names)
+
+        self._set_topology(module)
+        self._set_jacobian_pattern()
+        self._set_rate_table(module)
+        self.rate_table = None
+        self._compile()
+
+    def _set_topology(self, module):
+        #pynucastro 2 writes the nuclei of the rate names capitalized
+        index = lambda nucleus: getattr(module, 'j' + nucleus.lower())
+
+        reactant_ptr = [0]
+        reactant_species = []
+        reactant_power = []
+        prefactor = np.ones(self.nrates)
+        rho_power = np.zeros(self.nrates, dtype=np.int32)
+        ye_power = np.zeros(self.nrates, dtype=np.int32)
+        consumed = [[] for _ in range(self.nnuc)]
+        produced = [[] for _ in range(self.nnuc)]
+
+        for k, name in enumerate(self.rate_names):
+            reactants, products, electron_capture = parse_rate_name(name)
+
+            # pynucastro writes the reactant factors sorted like the nuclei
+            species = sorted(set(index(r) for r in reactants))
+            powers = [[index(r) for r in reactants].count(s) for s in species]
+            reactant_species += species
+            reactant_power += powers
+            reactant_ptr.append(len(reactant_species))
+
+            symmetry = 1.0
+            for p in powers:
+                symmetry /= factorial(p)
+            # and the symmetry factor with 15 significant digits
+            prefactor[k] = float(f'{symmetry:.14e}')
+            rho_power[k] = len(reactants) - 1 + int(electron_capture)
+            ye_power[k] = int(electron_capture)
+
+            for s, c in zip(species, powers):
+                consumed[s].append((k, -c))
+            products = [index(p) for p in products]
+            for s in sorted(set(products)):
+                produced[s].append((k, products.count(s)))
+
+        stoich = [(j, k, c) for j in range(self.nnuc) for k, c in consumed[j] + produced[j]]
+
+        self.reactant_ptr = np.array(reactant_ptr, dtype=np.int32)
+        self.reactant_species = np.array(reactant_species, dtype=np.int32)
+        self.reactant_power = np.array(reactant_power, dtype=np.int32)
+        self.prefactor = prefactor
+        self.rho_power = rho_power
+        self.ye_power = ye_power
+        self.stoich_species = np.array([s[0] for s in stoich], dtype=np.int32)
+        self.stoich_rate = np.array([s[1] for s in stoich], dtype=np.int32)
+        self.stoich_coeff = np.array([s[2] for s in stoich], dtype=np.float64)
+        # multiplying by a coefficient that is not a power of two does not
+        # commute with the rounding of the product, those are folded into the
+        # front of the product like in the generated code
+        self.stoich_folded = np.array([abs(s[2]) not in (1, 2, 4) for s in stoich], dtype=np.bool_)
+        self.A = np.asarray(module.A, dtype=np.float64)
+        self.Z = np.asarray(module.Z, dtype=np.float64)
+
+    def _set_jacobian_pattern(self):
+        (self.jac_position, self.jac_stoich, self.jac_reactant, self.jac_row,
+         self.jac_indices, self.jac_indptr) = jacobian_pattern_arrays(
+            self.nnuc, self.reactant_ptr, self.reactant_species, self.stoich_species, self.stoich_rate)
+        self.nnz = len(self.jac_row)
+        self._csr_patterns = {}
+
+    def _set_rate_table(self, module):
+        coefficients = []
+        set_rate = []
+        custom = []
+        for k, name in enumerate(self.rate_names):
+            sets = reaclib_sets(getattr(module, name), name)
+            if sets is None:
+                custom.append(k)
+                continue
+            coefficients += sets
+            set_rate += [k]*len(sets)
+
+        self.coefficients = np.array(coefficients, dtype=np.float64).reshape(-1, 7)
+        self.set_rate = np.array(set_rate, dtype=np.int32)
+        self.custom_rates = np.array(custom, dtype=np.int32)
+        self.evaluate_custom = _custom_evaluator(module, [self.rate_names[k] for k in custom])
+
+    def topology(self):
+        '''arrays describing the network, in the order used by the kernels'''
+        return (self.reactant_ptr, self.reactant_species, self.reactant_power,
+                self.prefactor, self.rho_power, self.ye_power,
+                self.stoich_species, self.stoich_rate, self.stoich_coeff,
+                self.stoich_folded, self.A, self.Z)
+
+    def jacobian_pattern(self):
+        '''arrays mapping the reactions onto the nonzero entries of the Jacobian'''
+        return (self.jac_position, self.jac_stoich, self.jac_reactant,
+                self.jac_row, self.jac_indices)
+
+    def csr_pattern(self, offset=0):
+        '''indices and indptr of the Jacobian in CSR format, with offset empty
+        rows and columns in front (for variables solved alongside the network)'''
+        if offset not in self._csr_patterns:
+            indptr = np.concatenate((np.zeros(offset, dtype=np.int32), self.jac_indptr))
+            self._csr_patterns[offset] = (self.jac_indices + offset, indptr)
+        return self._csr_patterns[offset]
+
+    def tabulate_rates(self, T9_min=1e-3, T9_max=30.0, rtol=1e-6, method='cubic', **options):
+        '''replace the evaluation of the rates by interpolation in a RateTable
+
+        Rates that do not reach rtol on the grid, the hand-edited rates and
+        all rates outside [T9_min, T9_max] are still evaluated exactly.
+        Returns the network, so SparseNetwork(module).tabulate_rates() works'''
+        table = RateTable(self.exact_rates_eq, T9_min=T9_min, T9_max=T9_max,
+                          rtol=rtol, method=method, **options)
+        self.rate_table = table
+        self._compile()
+        return self
+
+    def _compile(self):
+        # the arrays are captured by the closures and frozen into the compiled
+        # code, so every call only passes the state.  numba keys the cache of
+        # a closure on what it captures, so those capturing only arrays are
+        # cached, those capturing a compiled function are not
+        coefficients, set_rate, nrates = self.coefficients, self.set_rate, self.nrates
+        custom_rates, evaluate_custom = self.custom_rates, self.evaluate_custom
+        topology = self.topology()
+        pattern = self.jacobian_pattern()
+
+        @numba.njit()
+        def exact_rates_eq(T):
+            rates = reaclib_rates(T, coefficients, set_rate, nrates)
+            rates[custom_rates] = evaluate_custom(T)
+            return rates
+
+        if self.rate_table is None:
+            rates_eq = exact_rates_eq
+        else:
+            lnT9_min, dlnT9, table, slopes, cubic = self.rate_table.arrays()
+            lnT9_max = self.rate_table.lnT9_max
+            # the ReacLib sets of the rates that are not interpolated
+            exact = np.setdiff1d(self.rate_table.exact, custom_rates).astype(np.int32)
+            in_exact = np.isin(set_rate, exact)
+            exact_coefficients = coefficients[in_exact]
+            exact_set_rate = set_rate[in_exact]
+
+            @numba.njit()
+            def rates_eq(T):
+                lnT9 = np.log(T/1.e9)
+                if lnT9 < lnT9_min or lnT9 > lnT9_max:
+                    return exact_rates_eq(T)
+                rates = np.exp(interpolate_log_rates(lnT9, lnT9_min, dlnT9, table, slopes, cubic))
+                if exact.shape[0] > 0:
+                    rates[exact] = reaclib_rates(T, exact_coefficients, exact_set_rate, nrates)[exact]
+                rates[custom_rates] = evaluate_custom(T)
+                return rates
+
+        @numba.njit()
+        def rhs_eq(Y, rho, T):
+            return rhs_from_rates(Y, rho, rates_eq(T), *topology)
+
+        @numba.njit()
+        def jacobian_eq(Y, rho, T):
+            return jacobian_from_rates(Y, rho, rates_eq(T), *topology, *pattern)
+
+        @numba.njit()
+        def jacobian_values_eq(Y, rho, T):
+            return jacobian_values(Y, rho, rates_eq(T), *topology, *pattern)
+
+        @numba.njit(cache=True)
+        def rhs_rates_eq(Y, rho, rates):
+            return rhs_from_rates(Y, rho, rates, *topology)
+
+        @numba.njit(cache=True)
+        def jacobian_rates_eq(Y, rho, rates):
+            return jacobian_from_rates(Y, rho, rates, *topology, *pattern)
+
+        @numba.njit(cache=True)
+        def jacobian_values_rates_eq(Y, rho, rates):
+            return jacobian_values(Y, rho, rates, *topology, *pattern)
+
+        @numba.njit(cache=True)
+        def rate_derivatives_rates_eq(Y, rho, rates):
+            return rate_derivatives(Y, rho, rates, *topology)
+
+        @numba.njit(cache=True)
+        def rhs_log_rates_eq(lnY, rho, rates):
+            Y = np.exp(lnY)
+            return rhs_from_rates(Y, rho, rates, *topology)/Y
+
+        @numba.njit(cache=True)
+        def jacobian_log_rates_eq(lnY, rho, rates):
+            Y = np.exp(lnY)
+            return log_jacobian(Y, rhs_from_rates(Y, rho, rates, *topology),
+                                jacobian_from_rates(Y, rho, rates, *topology, *pattern))
+
+        self.exact_rates_eq = exact_rates_eq
+        self.rates_eq = rates_eq
+        self.rhs_eq = rhs_eq
+        self.jacobian_eq = jacobian_eq
+        self.jacobian_values_eq = jacobian_values_eq
+        self.rhs_rates_eq = rhs_rates_eq
+        self.jacobian_rates_eq = jacobian_rates_eq
+        self.jacobian_values_rates_eq = jacobian_values_rates_eq
+        self.rate_derivatives_rates_eq = rate_derivatives_rates_eq
+        self.rhs_log_rates_eq = rhs_log_rates_eq
+        self.jacobian_log_rates_eq = jacobian_log_rates_eq
+        self._last_T = None
+        self._last_rates = None
+
+    def rates(self, T):
+        '''all rates of the network at temperature T (in K).  The last rate
+        vector is kept, so rhs and jacobian at the same T share it; it must not
+        be modified by the caller'''
+        if T != self._last_T:
+            self._last_rates = self.rates_eq(T)
+            self._last_T = T
+        return self._last_rates
+
+    def flows(self, Y, rho, T):
+        '''molar flow of every reaction, the summands of dY/dt'''
+        return molar_flows(Y, rho, self.rates(T), *self.topology()[:6], self.A, self.Z)
+
+    def rhs(self, t, Y, rho, T, screen_func=None):
+        return self.rhs_rates_eq(Y, rho, self.rates(T))
+
+    def jacobian(self, t, Y, rho, T, screen_func=None):
+        return self.jacobian_rates_eq(Y, rho, self.rates(T))
+
+    def rate_derivatives(self, t, Y, rho, T):
+        '''d(dY/dt)/d ln(rate) of every rate, with shape (nnuc, nrates)'''
+        return self.rate_derivatives_rates_eq(Y, rho, self.rates(T))
+
+    def rhs_log(self, t, lnY, rho, T, screen_func=None):
+        '''d ln(Y)/dt of the state lnY = ln(Y)'''
+        return self.rhs_log_rates_eq(lnY, rho, self.rates(T))
+
+    def jacobian_log(self, t, lnY, rho, T, screen_func=None):
+        '''jacobian of rhs_log, see log_jacobian'''
+        return self.jacobian_log_rates_eq(lnY, rho, self.rates(T))
+
+    def jacobian_csr(self, t, Y, rho, T, screen_func=None, offset=0, scale=1.0):
+        '''Jacobian as a csr_matrix.  The sparsity pattern is fixed by the
+        reaction list and shared between calls, only the values are refilled.
+        offset prepends empty rows and columns and scale multiplies the values,
+        so the matrix can be handed to solve_ivp directly'''
+        indices, indptr = self.csr_pattern(offset)
+        values = self.jacobian_values_rates_eq(Y, rho, self.rates(T))
+        if scale != 1.0:
+            values *= scale
+        shape = (self.nnuc + offset, self.nnuc + offset)
+        return csr_matrix((values, indices, indptr), shape=shape, copy=False)
+
+
+def jacobian_pattern_arrays(nnuc, reactant_ptr, reactant_species, stoich_species, stoich_rate):
+    '''position, stoich, reactant, row, indices and indptr arrays mapping the
+    reactions onto the nonzero entries of the Jacobian, see jacobian_pattern'''
+    # every stoichiometry entry (i, k) gives a contribution to jac[i, j] for
+    # every reactant j of reaction k, in the order the dense sum is done
+    contributions = []
+    for m in range(stoich_species.shape[0]):
+        k = stoich_rate[m]
+        for n in range(reactant_ptr[k], reactant_ptr[k+1]):
+            contributions.append((stoich_species[m], reactant_species[n], m, n))
+
+    pairs = sorted(set((i, j) for i, j, _, _ in contributions))
+    position = {pair: e for e, pair in enumerate(pairs)}
+
+    row = np.array([i for i, _ in pairs], dtype=np.int32)
+    return (np.array([position[(i, j)] for i, j, _, _ in contributions], dtype=np.int32),
+            np.array([c[2] for c in contributions], dtype=np.int32),
+            np.array([c[3] for c in contributions], dtype=np.int32),
+            row,
+            np.array([j for _, j in pairs], dtype=np.int32),
+            np.searchsorted(row, np.arange(nnuc + 1)).astype(np.int32))
+
+
+# SparseNetworks of the modules passed to sparse_network
+_networks = {}
+
+
+def sparse_network(network):
+    '''the SparseNetwork of a generated network module, built once per module
+    and shared by all callers.  SparseNetworks are returned unchanged'''
+    if isinstance(network, SparseNetwork):
+        return network
+    if network not in _networks:
+        _networks[network] = SparseNetwork(network)
+    return _networks[network]
+
+
+@numba.njit(cache=True)
+def reaclib_rates(T, coefficients, set_rate, nrates):
+
+    T9 = T/1.e9
+    T9i = 1.0/T9
+    tfactors = np.array([1.0, T9i, T9i**(1./3.), T9**(1./3.), T9, T9**(5./3.), np.log(T9)])
+
+    rates = np.zeros(nrates, dtype=np.float64)
+    for i in range(set_rate.shape[0]):
+        exponent = coefficients[i, 0]
+        for j in range(1, 7):
+            exponent += coefficients[i, j]*tfactors[j]
+        rates[set_rate[i]] += np.exp(exponent)
+    return rates
+
+
+@numba.njit(cache=True)
+def _ipow(y, p):
+    # same sequence of products as numba uses for Y[j]**2 in the generated code
+    result = 1.0
+    while p:
+        if p & 1:
+            result *= y
+        y *= y
+        p >>= 1
+    return result
+
+
+@numba.njit(cache=True)
+def _flow(k, front, Y, rates, reactant_ptr, reactant_species, reactant_power):
+    for m in range(reactant_ptr[k], reactant_ptr[k+1]):
+        front *= _ipow(Y[reactant_species[m]], reactant_power[m])
+    return front*rates[k]
+
+
+@numba.njit(cache=True)
+def molar_flows(Y, rho, rates, reactant_ptr, reactant_species, reactant_power,
+                prefactor, rho_power, ye_power, A, Z):
+
+    rho_pow = np.empty(np.max(rho_power) + 1, dtype=np.float64)
+    for p in range(rho_pow.shape[0]):
+        rho_pow[p] = _ipow(rho, p)
+    ye = np.sum(Z * Y)/np.sum(A * Y)
+
+    nrates = rates.shape[0]
+    flows = np.empty(nrates, dtype=np.float64)
+    for k in range(nrates):
+        front = prefactor[k]*rho_pow[rho_power[k]]
+        if ye_power[k] == 1:
+            front *= ye
+        flows[k] = _flow(k, front, Y, rates, reactant_ptr, reactant_species, reactant_power)
+    return flows
+
+
+@numba.njit(cache=True)
+def rhs_from_rates(Y, rho, rates, reactant_ptr, reactant_species, reactant_power,
+                   prefactor, rho_power, ye_power,
+                   stoich_species, stoich_rate, stoich_coeff, stoich_folded, A, Z):
+
+    flows = molar_flows(Y, rho, rates, reactant_ptr, reactant_species, reactant_power,
+                        prefactor, rho_power, ye_power, A, Z)
+
+    dYdt = np.zeros(Y.shape[0], dtype=np.float64)
+    for m in range(stoich_species.shape[0]):
+        k = stoich_rate[m]
+        if stoich_folded[m]:
+            # the coefficient enters at the front of the product, as in rhs_eq
+            front = stoich_coeff[m]*prefactor[k]*_ipow(rho, rho_power[k])
+            if ye_power[k] == 1:
+                front *= np.sum(Z * Y)/np.sum(A * Y)
+            dYdt[stoich_species[m]] += _flow(k, front, Y, rates, reactant_ptr, reactant_species, reactant_power)
+        else:
+            dYdt[stoich_species[m]] += stoich_coeff[m]*flows[k]
+    return dYdt
+
+
+@numba.njit(cache=True)
+def rate_derivatives(Y, rho, rates, reactant_ptr, reactant_species, reactant_power,
+                     prefactor, rho_power, ye_power,
+                     stoich_species, stoich_rate, stoich_coeff, stoich_folded, A, Z):
+    '''d(dY_i/dt)/d ln(rate_k), the stoichiometric coefficients times the
+    molar flows, with shape (nnuc, nrates)'''
+
+    flows = molar_flows(Y, rho, rates, reactant_ptr, reactant_species, reactant_power,
+                        prefactor, rho_power, ye_power, A, Z)
+
+    derivatives = np.zeros((Y.shape[0], rates.shape[0]), dtype=np.float64)
+    for m in range(stoich_species.shape[0]):
+        derivatives[stoich_species[m], stoich_rate[m]] += stoich_coeff[m]*flows[stoich_rate[m]]
+    return derivatives
+
+
+@numba.njit(cache=True)
+def flow_derivatives(Y, rho, rates, reactant_ptr, reactant_species, reactant_power,
+                     prefactor, rho_power, ye_power, A, Z):
+    '''d flow_k / d Y_s for every reactant entry (k, s) of the topology,
+    ye is held constant as in the generated jacobian_eq'''
+
+    rho_pow = np.empty(np.max(rho_power) + 1, dtype=np.float64)
+    for p in range(rho_pow.shape[0]):
+        rho_pow[p] = _ipow(rho, p)
+    ye = np.sum(Z * Y)/np.sum(A * Y)
+
+    dflows = np.empty(reactant_species.shape[0], dtype=np.float64)
+    for k in range(rates.shape[0]):
+        front = prefactor[k]*rho_pow[rho_power[k]]
+        if ye_power[k] == 1:
+            front *= ye
+        for m in range(reactant_ptr[k], reactant_ptr[k+1]):
+            dflow = front
+            for n in range(reactant_ptr[k], reactant_ptr[k+1]):
+                if n == m:
+                    dflow *= reactant_power[m]*_ipow(Y[reactant_species[m]], reactant_power[m] - 1)
+                else:
+                    dflow *= _ipow(Y[reactant_species[n]], reactant_power[n])
+            dflows[m] = dflow*rates[k]
+    return dflows
+
+
+@numba.njit(cache=True)
+def jacobian_values(Y, rho, rates, reactant_ptr, reactant_species, reactant_power,
+                    prefactor, rho_power, ye_power,
+                    stoich_species, stoich_rate, stoich_coeff, stoich_folded, A, Z,
+                    jac_position, jac_stoich, jac_reactant, jac_row, jac_indices):
+    '''the nonzero entries of the Jacobian, in CSR order'''
+
+    dflows = flow_derivatives(Y, rho, rates, reactant_ptr, reactant_species, reactant_power,
+                              prefactor, rho_power, ye_power, A, Z)
+
+    values = np.zeros(jac_indices.shape[0], dtype=np.float64)
+    for c in range(jac_position.shape[0]):
+        values[jac_position[c]] += stoich_coeff[jac_stoich[c]]*dflows[jac_reactant[c]]
+    return values
+
+
+@numba.njit(cache=True)
+def jacobian_from_rates(Y, rho, rates, reactant_ptr, reactant_species, reactant_power,
+                        prefactor, rho_power, ye_power,
+                        stoich_species, stoich_rate, stoich_coeff, stoich_folded, A, Z,
+                        jac_position, jac_stoich, jac_reactant, jac_row, jac_indices):
+
+    values = jacobian_values(Y, rho, rates, reactant_ptr, reactant_species, reactant_power,
+                             prefactor, rho_power, ye_power,
+                             stoich_species, stoich_rate, stoich_coeff, stoich_folded, A, Z,
+                             jac_position, jac_stoich, jac_reactant, jac_row, jac_indices)
+
+    nnuc = Y.shape[0]
+    jac = np.zeros((nnuc, nnuc), dtype=np.float64)
+    for e in range(values.shape[0]):
+        jac[jac_row[e], jac_indices[e]] = values[e]
+    return jac
+
+
+@numba.njit(cache=True)
+def log_jacobian(Y, dYdt, jac):
+    '''d(d ln(Y_i)/dt)/d ln(Y_j) from dY/dt and the jacobian jac at Y, which
+    is overwritten: the columns are scaled by Y_j, the rows divided by Y_i and
+    d ln(Y_i)/dt is taken off the diagonal'''
+    for i in range(Y.shape[0]):
+        for j in range(Y.shape[0]):
+            jac[i, j] *= Y[j]/Y[i]
+        jac[i, i] -= dYdt[i]/Y[i]
+    return jac
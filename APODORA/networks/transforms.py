@@ -0,0 +1,301 @@
+"""Rewrites of the network modules written by pynucastro.
+
+pynucastro writes rhs_eq and jacobian_eq as one function each, both starting
+with the evaluation of every rate.  The functions here work on the source text
+of such a module and are applied by write_AoTnetwork after write_network, and
+have been applied to the networks already in the repository:
+
+share_rates     rates evaluated once for rhs and jacobian
+batch_rates     rhs and jacobian of many states at once, in parallel
+log_abundances  rhs and jacobian of the state ln(Y)
+"""
+
+import re
+
+
+def _function(source, name):
+    '''start, end and body of the module level function name in source,
+    together with the decorator and the blank lines following it'''
+    match = re.search(rf'^(@numba\.njit\(\)\n)?def {name}\(.*\):\n', source, re.M)
+    if match is None:
+        raise ValueError(f'no function {name} in the network')
+    end = re.compile(r'^\S', re.M).search(source, match.end())
+    end = len(source) if end is None else end.start()
+    return match.start(), end, source[match.end():end]
+
+
+def _split_rates(body, result):
+    '''split the body of rhs_eq or jacobian_eq into the evaluation of the
+    rates, the screening and the computation of result'''
+    equations = body.index(f'    {result} = np.zeros')
+    screening = body.find('    if screen_func is not None:')
+    if screening < 0 or screening > equations:
+        screening = equations
+    return body[:screening], body[screening:equations], body[equations:]
+
+
+shared_rates = '''\
+@numba.njit()
+def rates_eq(T):
+{rates}    return rate_eval
+
+@numba.njit()
+def screen_rates(rate_eval, Y, rho, T, screen_func):
+{screening}
+@numba.njit()
+def rhs_rates_eq(Y, rho, rate_eval):
+
+{rhs}
+@numba.njit()
+def jacobian_rates_eq(Y, rho, rate_eval):
+
+{jacobian}
+@numba.njit()
+def rhs_eq(t, Y, rho, T, screen_func):
+    rate_eval = rates_eq(T)
+    screen_rates(rate_eval, Y, rho, T, screen_func)
+    return rhs_rates_eq(Y, rho, rate_eval)
+
+@numba.njit()
+def jacobian_eq(t, Y, rho, T, screen_func):
+    rate_eval = rates_eq(T)
+    screen_rates(rate_eval, Y, rho, T, screen_func)
+    return jacobian_rates_eq(Y, rho, rate_eval)
+
+@numba.njit()
+def rhs_jac_eq(t, Y, rho, T, screen_func):
+    rate_eval = rates_eq(T)
+    screen_rates(rate_eval, Y, rho, T, screen_func)
+    return rhs_rates_eq(Y, rho, rate_eval), jacobian_rates_eq(Y, rho, rate_eval)
+
+# temperature and rates of the last call to rates, rhs and jacobian at the
+# same temperature share them (only without screening, which depends on Y)
+_last_rates = [None, None]
+
+def rates(T):
+    """the rates at temperature T, only evaluated if T changed since the last call"""
+    if T != _last_rates[0]:
+        _last_rates[1] = rates_eq(T)
+        _last_rates[0] = T
+    return _last_rates[1]
+
+def rhs(t, Y, rho, T, screen_func=None):
+    if screen_func is not None:
+        return rhs_eq(t, Y, rho, T, screen_func)
+    return rhs_rates_eq(Y, rho, rates(T))
+
+def jacobian(t, Y, rho, T, screen_func=None):
+    if screen_func is not None:
+        return jacobian_eq(t, Y, rho, T, screen_func)
+    return jacobian_rates_eq(Y, rho, rates(T))
+
+def rhs_and_jacobian(t, Y, rho, T, screen_func=None):
+    """rhs and jacobian from a single evaluation of the rates"""
+    if screen_func is not None:
+        return rhs_jac_eq(t, Y, rho, T, screen_func)
+    rate_eval = rates(T)
+    return rhs_rates_eq(Y, rho, rate_eval), jacobian_rates_eq(Y, rho, rate_eval)
+
+'''
+
+def share_rates(source):
+    '''rewrite the source of a network so the rates are evaluated once in
+    rates_eq(T) and shared by the rhs and the jacobian
+
+    rhs and jacobian keep their signatures and rhs_and_jacobian returns
+    both.  Networks that were rewritten already are returned unchanged.'''
+
+    if re.search(r'^def rates_eq\(T\):', source, re.M):
+        return source
+
+    rhs_start = _function(source, 'rhs')[0]
+    _, _, rhs_body = _function(source, 'rhs_eq')
+    _, jacobian_end, jacobian_body = _function(source, 'jacobian_eq')
+    if source[rhs_start:jacobian_end].count('\ndef ') != 3:
+        raise ValueError('rhs and jacobian are not next to each other in the network')
+
+    rates, screening, rhs = _split_rates(rhs_body, 'dYdt')
+    _, _, jacobian = _split_rates(jacobian_body, 'jac')
+    if not screening.strip():
+        screening = '    pass\n\n'
+
+    shared = shared_rates.format(rates=rates, screening=screening,
+                                 rhs=rhs.rstrip('\n') + '\n',
+                                 jacobian=jacobian.rstrip('\n') + '\n')
+    return source[:rhs_start] + shared + source[jacobian_end:]
+
+
+batch_functions = '''\
+nrates = {nrates}
+
+@numba.njit()
+def rates_to_array(rate_eval):
+    rates = np.empty(nrates, dtype=np.float64)
+{to_array}
+    return rates
+
+@numba.njit()
+def rates_from_array(rates):
+    rate_eval = RateEval()
+{from_array}
+    return rate_eval
+
+@numba.njit()
+def temperature_groups(T):
+    """the distinct values of T, and the index of the value of every T"""
+    order = np.argsort(T)
+    unique = np.empty(T.shape[0], dtype=np.float64)
+    group = np.empty(T.shape[0], dtype=np.int64)
+    n = -1
+    for i in order:
+        if n < 0 or T[i] != unique[n]:
+            n += 1
+            unique[n] = T[i]
+        group[i] = n
+    return unique[:n+1], group
+
+@numba.njit(parallel=True)
+def rates_batch_eq(T):
+    """rates of every distinct temperature in T as rows of a table, and the
+    row belonging to every temperature"""
+    unique, group = temperature_groups(T)
+    table = np.empty((unique.shape[0], nrates), dtype=np.float64)
+    for g in numba.prange(unique.shape[0]):
+        table[g] = rates_to_array(rates_eq(unique[g]))
+    return table, group
+
+@numba.njit(parallel=True)
+def rhs_batch_rates_eq(Y, rho, table, group):
+    dYdt = np.empty((Y.shape[0], nnuc), dtype=np.float64)
+    for i in numba.prange(Y.shape[0]):
+        dYdt[i] = rhs_rates_eq(Y[i], rho[i], rates_from_array(table[group[i]]))
+    return dYdt
+
+@numba.njit(parallel=True)
+def jacobian_batch_rates_eq(Y, rho, table, group):
+    jac = np.empty((Y.shape[0], nnuc, nnuc), dtype=np.float64)
+    for i in numba.prange(Y.shape[0]):
+        jac[i] = jacobian_rates_eq(Y[i], rho[i], rates_from_array(table[group[i]]))
+    return jac
+
+@numba.njit()
+def rhs_batch_eq(t, Y, rho, T):
+    table, group = rates_batch_eq(T)
+    return rhs_batch_rates_eq(Y, rho, table, group)
+
+@numba.njit()
+def jacobian_batch_eq(t, Y, rho, T):
+    table, group = rates_batch_eq(T)
+    return jacobian_batch_rates_eq(Y, rho, table, group)
+
+# temperatures and rate table of the last call to rates_batch
+_last_rates_batch = [None, None, None]
+
+def rates_batch(T):
+    """rate table and rows for the temperatures T, only evaluated if T changed
+    since the last call"""
+    if _last_rates_batch[0] is None or not np.array_equal(T, _last_rates_batch[0]):
+        _last_rates_batch[1:] = rates_batch_eq(T)
+        _last_rates_batch[0] = np.array(T, dtype=np.float64)
+    return _last_rates_batch[1], _last_rates_batch[2]
+
+def rhs_batch(t, Y, rho, T):
+    """dY/dt of the states Y[N, nnuc] at densities rho[N] and temperatures
+    T[N], evaluated in parallel without screening.  The rates are evaluated
+    once for every distinct temperature"""
+    return rhs_batch_rates_eq(Y, rho, *rates_batch(np.asarray(T, dtype=np.float64)))
+
+def jacobian_batch(t, Y, rho, T):
+    """jacobians [N, nnuc, nnuc] of the states Y[N, nnuc], see rhs_batch"""
+    return jacobian_batch_rates_eq(Y, rho, *rates_batch(np.asarray(T, dtype=np.float64)))
+
+'''
+
+
+def rate_names(source):
+    '''names of the rates of a network, in the order of RateEval'''
+    spec = re.search(r'^@jitclass\(\[\n(.*?)^\]\)\nclass RateEval', source, re.M | re.S)
+    if spec is None:
+        raise ValueError('no RateEval in the network')
+    return re.findall(r'\("(\w+)", numba\.float64\)', spec.group(1))
+
+
+def batch_rates(source):
+    '''add rhs_batch and jacobian_batch, which evaluate many states at once
+    with numba.prange, to the source of a network rewritten by share_rates
+
+    The rates are evaluated once for every distinct temperature of the batch
+    and passed between the compiled functions as rows of a table, in the
+    order of rate_names.  Networks that have them already are returned
+    unchanged.'''
+
+    if re.search(r'^def rhs_batch\(', source, re.M):
+        return source
+    if not re.search(r'^def rates_eq\(T\):', source, re.M):
+        source = share_rates(source)
+
+    names = rate_names(source)
+    batch = batch_functions.format(
+        nrates=len(names),
+        to_array='\n'.join(f'    rates[{k}] = rate_eval.{name}' for k, name in enumerate(names)),
+        from_array='\n'.join(f'    rate_eval.{name} = rates[{k}]' for k, name in enumerate(names)))
+
+    aot = re.search(r'^#For AoT compilation of the network\n', source, re.M)
+    position = len(source) if aot is None else aot.start()
+    return source[:position] + batch + source[position:]
+
+
+log_functions = '''\
+@numba.njit()
+def log_jacobian(Y, dYdt, jac):
+    """d(d ln(Y_i)/dt)/d ln(Y_j) from dY/dt and the jacobian at Y"""
+    for i in range(nnuc):
+        for j in range(nnuc):
+            jac[i, j] *= Y[j]/Y[i]
+        jac[i, i] -= dYdt[i]/Y[i]
+    return jac
+
+@numba.njit()
+def rhs_log_rates_eq(lnY, rho, rate_eval):
+    Y = np.exp(lnY)
+    return rhs_rates_eq(Y, rho, rate_eval)/Y
+
+@numba.njit()
+def jacobian_log_rates_eq(lnY, rho, rate_eval):
+    Y = np.exp(lnY)
+    return log_jacobian(Y, rhs_rates_eq(Y, rho, rate_eval), jacobian_rates_eq(Y, rho, rate_eval))
+
+def rhs_log(t, lnY, rho, T, screen_func=None):
+    """d ln(Y)/dt of the state lnY = ln(Y)"""
+    if screen_func is not None:
+        Y = np.exp(lnY)
+        return rhs_eq(t, Y, rho, T, screen_func)/Y
+    return rhs_log_rates_eq(lnY, rho, rates(T))
+
+def jacobian_log(t, lnY, rho, T, screen_func=None):
+    """jacobian of rhs_log, the jacobian scaled by Y_j/Y_i with d ln(Y_i)/dt
+    taken off the diagonal"""
+    if screen_func is not None:
+        Y = np.exp(lnY)
+        return log_jacobian(Y, *rhs_jac_eq(t, Y, rho, T, screen_func))
+    return jacobian_log_rates_eq(lnY, rho, rates(T))
+
+'''
+
+
+def log_abundances(source):
+    '''add rhs_log and jacobian_log, the right hand side and jacobian of
+    the state ln(Y), to the source of a network rewritten by share_rates
+
+    Integrating ln(Y) turns the absolute tolerance into a relative one, so
+    trace nuclides are resolved without an atol near 0.  Networks that have
+    them already are returned unchanged.'''
+
+    if re.search(r'^def rhs_log\(', source, re.M):
+        return source
+    if not re.search(r'^def rates_eq\(T\):', source, re.M):
+        source = share_rates(source)
+
+    aot = re.search(r'^#For AoT compilation of the network\n', source, re.M)
+    position = len(source) if aot is None else aot.start()
+    return source[:position] + log_functions + source[position:]
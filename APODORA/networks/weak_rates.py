@@ -0,0 +1,128 @@
+"""The weak n <-> p rates of the networks.
+
+The rates are the fits of Serpico et al. 2004 (astro-ph/0408076, appendix
+C), which already include the radiative, finite nucleon mass and finite
+temperature corrections to the Born rates.  With z = m_e c^2/kT = 5.92989658/T9
+
+    n__p = exp(-qnp/z) sum_i a_i z^-i / tau_n
+    p__n = exp(-qpn z) sum_i b_i z^-i / tau_n     for T9 > 1.160451812, 0 below
+
+which are evaluated as polynomials in 1/z by Horner's rule with a single
+exponential.  n__p_rate and p__n_rate are called by the custom rates of the
+networks (see rates.py) and translated to C by c_kernel.py, weak_rates
+evaluates both for an array of T9, e.g. in the notebooks comparing rates.
+
+A WeakRateTable tabulates the rates of the fit, or reads a table of rates
+computed elsewhere (e.g. with the full finite temperature radiative
+corrections) and interpolates it like a RateTable:
+
+    table = WeakRateTable.from_file('weak_rates.txt')
+    n__p, p__n = table(1e9)
+
+and RateOverrides.from_weak_table (see overrides.py) hands it to the networks
+in run_bbn in place of the fit:
+
+    result = run_bbn(overrides=RateOverrides.from_weak_table(table))
+"""
+
+import numba
+import numpy as np
+from scipy import interpolate
+
+from ..nuclear import tau_n_rates
+from .rate_table import RateTable, rate_floor
+
+#coefficients a_i of n__p and b_i of p__n in powers of 1/z
+n__p_coefficients = np.array([1, 0.15735, 4.6172, -0.40520e2, 0.13875e3, -0.59898e2, 0.66752e2,
+                              -0.16705e2, 3.8071, -0.39140, 0.023590, -0.83696e-4, -0.42095e-4,
+                              0.17675e-5])
+p__n_coefficients = np.array([-0.62173, 0.22211e2, -0.72798e2, 0.11571e3, -0.11763e2, 0.45521e2,
+                              -3.7973, 0.41266, -0.026210, 0.87934e-3, -0.12016e-4])
+qnp = 0.33979
+qpn = 2.8602
+
+#z*T9, the electron mass in units of 1e9 K
+z_T9 = 5.92989658
+#below this T9 the fit of p__n is negative and the rate is set to zero
+p__n_T9_min = 1.160451812
+
+
+@numba.njit(cache=True)
+def horner(coefficients, x):
+    '''the polynomial sum_i coefficients[i] x^i'''
+    value = 0.0
+    for i in range(coefficients.shape[0] - 1, -1, -1):
+        value = value*x + coefficients[i]
+    return value
+
+
+@numba.njit(cache=True)
+def n__p_rate(T9):
+    '''the n --> p rate in 1/s at temperature T9 (in 1e9 K)'''
+    x = T9/z_T9
+    return horner(n__p_coefficients, x)*np.exp(-qnp*x)/tau_n_rates
+
+
+@numba.njit(cache=True)
+def p__n_rate(T9):
+    '''the p --> n rate in 1/s at temperature T9 (in 1e9 K)'''
+    if T9 <= p__n_T9_min:
+        return 0.0
+    return horner(p__n_coefficients, T9/z_T9)*np.exp(-qpn*z_T9/T9)/tau_n_rates
+
+
+@numba.njit(cache=True)
+def weak_rates(T9):
+    '''the n --> p and p --> n rates in 1/s at the temperatures T9 (an array,
+    in 1e9 K)'''
+    n__p = np.empty(T9.shape[0], dtype=np.float64)
+    p__n = np.empty(T9.shape[0], dtype=np.float64)
+    for i in range(T9.shape[0]):
+        n__p[i] = n__p_rate(T9[i])
+        p__n[i] = p__n_rate(T9[i])
+    return n__p, p__n
+
+
+def fit_rates(T):
+    '''the n__p and p__n rates at temperature T (in K), as taken by
+    RateTable'''
+    return np.array([n__p_rate(T/1e9), p__n_rate(T/1e9)])
+
+
+class WeakRateTable(RateTable):
+    '''the n__p and p__n rates tabulated like a RateTable, by default of the
+    fit.  rates(T) returns both at temperature T (in K).  The switch of the
+    p__n fit at T9=1.16 is not interpolated to rtol, so p__n is inexact
+    there for the fit; smooth tabulated rates are not'''
+
+    names = ('n__p', 'p__n')
+
+    def __init__(self, rates=fit_rates, T9_min=1e-3, T9_max=30.0, rtol=1e-8, **options):
+        super().__init__(rates, T9_min, T9_max, rtol, **options)
+
+    @classmethod
+    def from_file(cls, filename, tau_n=tau_n_rates, rtol=1e-8, **options):
+        '''the table of the rates in the columns T9, n__p, p__n (in 1/s) of
+        the text file filename, for the neutron lifetime tau_n (in s).  They
+        are scaled to tau_n_rates like the fit, so lifetime_scale applies to
+        both, and interpolated between the rows by a cubic spline in ln-ln'''
+        T9, *rates = np.loadtxt(filename, unpack=True)
+        rates = np.log(np.maximum(np.array(rates)*tau_n/tau_n_rates, rate_floor))
+        spline = interpolate.CubicSpline(np.log(T9), rates, axis=1)
+        return cls(lambda T: np.exp(spline(np.log(T/1e9))), T9.min(), T9.max(), rtol, **options)
+
+    def save(self, filename):
+        '''write the grid of the table to the text file filename, in the
+        columns read by from_file'''
+        np.savetxt(filename, np.column_stack([np.exp(self.lnT9), np.exp(self.table)]),
+                   header=f'T9 n__p[1/s] p__n[1/s], tau_n = {tau_n_rates} s')
+
+    def ratio(self, T9):
+        '''the tabulated rates over those of the fit at the temperatures T9
+        (an array, in 1e9 K), with shape (2, len(T9)); nan where the fit is
+        zero'''
+        T9 = np.asarray(T9, dtype=np.float64)
+        tabulated = np.array([self(1e9*t) for t in T9]).T
+        fit = np.array(weak_rates(T9))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(fit > 0, tabulated/fit, np.nan)
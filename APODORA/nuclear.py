@@ -0,0 +1,83 @@
+"""Nuclear data of the BBN nuclides, thermal abundances and observables.
+
+Mass excesses and spins are those used by AlterBBN, as in fastbbn.py.
+Nuclides are named like in the pynucastro networks ('n', 'h1', 'h2', ...).
+"""
+
+import numpy as np
+from scipy import special
+
+from APODORA.background import M_u, Q
+
+
+#mass excess in MeV and spin of every nuclide
+nuclear_data = {
+    'n': (8.071388, 0.5), 'h1': (7.289028, 0.5), 'h2': (13.135825, 1.), 'h3': (14.949915, 0.5),
+    'he3': (14.931325, 0.5), 'he4': (2.424931, 0.), 'li6': (14.0864, 1.), 'li7': (14.9078, 1.5),
+    'be7': (15.7696, 1.5), 'li8': (20.9464, 2.), 'b8': (22.9212, 2.), 'be9': (11.34758, 1.5),
+    'b10': (12.05086, 3.), 'b11': (8.6680, 1.5), 'c11': (10.6506, 1.5), 'b12': (13.3690, 1.),
+    'c12': (0., 0.), 'n12': (17.3382, 1.), 'c13': (3.125036, 0.5), 'n13': (5.3455, 0.5),
+    'c14': (3.019916, 0.), 'n14': (2.863440, 1.), 'o14': (8.006521, 0.), 'n15': (0.101439, 0.5),
+    'o15': (2.8554, 0.5), 'o16': (-4.737036, 0.),
+}
+
+#neutron lifetime in s built into the custom n__p and p__n rates of the networks
+tau_n_rates = 880.2
+
+
+def lifetime_scale(rate_names, tau_n):
+    '''factors for the rates rate_names that change the neutron lifetime of
+    the n <-> p rates from tau_n_rates to tau_n (in s).  tau_n may be an
+    array, the factors then have shape tau_n.shape + (nrates,)'''
+    tau_n = np.asarray(tau_n, dtype=np.float64)[..., None]
+    weak = np.array([name.split('__weak')[0] in ('n__p', 'p__n') for name in rate_names])
+    return np.where(weak, tau_n_rates/tau_n, 1.0)
+
+
+def masses(names, A):
+    '''masses in MeV of the nuclides names with mass numbers A'''
+    return np.array([a*M_u + nuclear_data[name][0] for name, a in zip(names, A)])
+
+
+def spins(names):
+    return np.array([nuclear_data[name][1] for name in names])
+
+
+def thermal_abundances(names, A, Z, T, eta, iterations=30):
+    '''abundances in thermal equilibrium at temperature T (in MeV) for
+    baryon-to-photon ratio eta, like get_Y_ini in fastbbn.py
+
+    eta may be an array, the abundances then have shape eta.shape + (nnuc,).
+    names must start with 'n' and 'h1', which set the neutron fraction.'''
+
+    A = np.asarray(A, dtype=np.float64)
+    Z = np.asarray(Z, dtype=np.float64)
+    eta = np.asarray(eta, dtype=np.float64)[..., None]
+    m = masses(names, A)
+    g = 1 + 2*spins(names)
+    B = (m[1]*Z + m[0]*(A - Z)) - m
+    tmp = special.zeta(3)**(A - 1)*np.pi**((1 - A)/2)*2**((3*A - 5)/2)*A**(5/2)
+
+    Xn = np.full(eta.shape, 1/(np.exp(Q/T) + 1))
+    for _ in range(iterations):
+        Xp = np.exp(Q/T)*Xn
+        Y = g*tmp*(T/m[0])**(3*(A - 1)/2)*eta**(A - 1)*Xp**Z*Xn**(A - Z)*np.exp(B/T)/A
+        Y[..., 0] = Xn[..., 0]
+        Y[..., 1] = Xp[..., 0]
+        Xn = Xn + (1 - np.sum(Y*A, axis=-1, keepdims=True))/len(names)
+    return Y
+
+
+def observables(names, Y):
+    '''the abundances printed by fastbbn.py: Yp, H2/H, (H3+He3)/H,
+    (Li7+Be7)/H, Li6/H and Be7/H, for abundances Y[..., nnuc]'''
+
+    Y = np.asarray(Y)
+    get = lambda name: Y[..., names.index(name)] if name in names else np.zeros(Y.shape[:-1])
+    H = get('h1')
+    return {'Yp': 4*get('he4'),
+            'H2/H': get('h2')/H,
+            '(H3+He3)/H': (get('h3') + get('he3'))/H,
+            '(Li7+Be7)/H': (get('li7') + get('be7'))/H,
+            'Li6/H': get('li6')/H,
+            'Be7/H': get('be7')/H}
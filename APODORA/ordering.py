@@ -0,0 +1,117 @@
+"""Orderings of the BBN nuclides in AlterBBN, PArthENoPE and the networks.
+
+AlterBBN and PArthENoPE number the nuclides like the code of Kawano (n, p,
+H2, ..., Be7, Li8, ...), while the networks written by pynucastro sort them
+by Z and then A (..., Li8, Be7, ...).  Instead of sorting lists of values
+along with lists of (A, Z) whenever a vector changes hands, the permutation
+between two orderings is computed once and applied by indexing:
+
+    index = permutation(network.names, 'alterbbn')
+    Y_alter = Y[index]
+    jac_alter = reorder_jacobian(jac, network.names, 'alterbbn')
+
+Nuclides are named like in the networks ('n', 'h1', 'h2', ...).  An ordering
+is either one of the names of orderings or a sequence of nuclide names.
+"""
+
+import functools
+import re
+
+import numpy as np
+
+#element symbols by charge, 'n' without mass number is the neutron
+_elements = ('h', 'he', 'li', 'be', 'b', 'c', 'n', 'o', 'f', 'ne', 'na', 'mg', 'al', 'si')
+
+#the 26 nuclides of AlterBBN and PArthENoPE, in their order
+kawano_names = ('n', 'h1', 'h2', 'h3', 'he3', 'he4', 'li6', 'li7', 'be7', 'li8', 'b8', 'be9',
+                'b10', 'b11', 'c11', 'b12', 'c12', 'n12', 'c13', 'n13', 'c14', 'n14', 'o14',
+                'n15', 'o15', 'o16')
+
+
+def nucleus(name):
+    '''charge Z and mass number A of the nuclide name, e.g. (2, 4) for 'he4' '''
+    if name == 'n':
+        return 0, 1
+    match = re.fullmatch(r'([a-z]+)(\d+)', name)
+    if match is None or match.group(1) not in _elements:
+        raise ValueError(f'{name!r} is not the name of a nuclide')
+    return _elements.index(match.group(1)) + 1, int(match.group(2))
+
+
+orderings = {'alterbbn': kawano_names,
+             'parthenope': kawano_names,
+             'pynucastro': tuple(sorted(kawano_names, key=nucleus))}
+
+
+def label(name):
+    '''the label of AlterBBN for the nuclide name, 'p' for 'h1' and 'Li7' for 'li7' '''
+    return 'p' if name == 'h1' else name.capitalize()
+
+
+def from_label(label):
+    '''the nuclide name of the label of AlterBBN or PArthENoPE, 'h1' for 'P' '''
+    name = label.strip().lower()
+    return 'h1' if name == 'p' else name
+
+
+def _names(order, within=None):
+    #the nuclide names of order, restricted to the nuclides of within if order
+    #is one of the named orderings
+    if isinstance(order, str):
+        try:
+            names = orderings[order.lower()]
+        except KeyError:
+            raise ValueError(f'unknown ordering {order!r}, use one of {", ".join(orderings)}') from None
+        if within is not None:
+            names = tuple(name for name in names if name in within)
+        return names
+    return tuple(order)
+
+
+@functools.lru_cache(maxsize=None)
+def _permutation(source, target):
+    position = {name: i for i, name in enumerate(source)}
+    missing = [name for name in target if name not in position]
+    if missing:
+        raise ValueError(f'{", ".join(missing)} not among the nuclides {", ".join(source)}')
+    index = np.array([position[name] for name in target], dtype=np.intp)
+    index.flags.writeable = False
+    return index
+
+
+def permutation(source, target):
+    '''index array p with x_target = x_source[p] for values x_source of the
+    nuclides source, in the ordering target
+
+    source and target are orderings.  A named target is restricted to the
+    nuclides of source, explicit nuclides of target must all be in source.
+    The arrays are computed once for every pair of orderings and must not
+    be changed.'''
+    source = _names(source)
+    return _permutation(source, _names(target, within=source))
+
+
+def nuclide_index(source, target):
+    '''like permutation, but a slice if target is a contiguous run of source,
+    so indexing with it gives a view instead of a copy'''
+    index = permutation(source, target)
+    if len(index) and np.all(np.diff(index) == 1):
+        return slice(int(index[0]), int(index[-1]) + 1)
+    return index
+
+
+def reorder(x, source, target, axis=-1):
+    '''the values x of the nuclides source along axis, in the ordering target'''
+    index = nuclide_index(source, target)
+    if isinstance(index, slice):
+        return x[(slice(None),)*(axis % np.ndim(x)) + (index,)]
+    return np.take(x, index, axis=axis)
+
+
+def reorder_jacobian(jac, source, target):
+    '''the jacobians jac[..., nnuc, nnuc] of the nuclides source, with rows
+    and columns in the ordering target'''
+    index = nuclide_index(source, target)
+    if isinstance(index, slice):
+        return jac[..., index, index]
+    return jac[..., index[:, None], index]
@@ -0,0 +1,195 @@
+"""Call counts, time and steps of the BBN solvers.
+
+The CacheBackground notebook timed the derivatives, the jacobian and the
+background with global counters.  A SolverProfile does the same for any run:
+the rhs, jacobian and LU decompositions are wrapped by timed(), every call is
+recorded with its time and the temperature of the state it was made at, and
+the steps taken and rejected are counted by the solver of method().  Runs are
+split into stages, e.g. the networks of fastbbn.run_bbn:
+
+    profile = SolverProfile()
+    result = run_bbn(profile=profile)
+    profile.report()          # nested dict, also profile.to_json()
+    profile.frame()           # pandas DataFrame by stage, kind and T
+
+The records are kept per call, so the bins of temperature can be chosen when
+the report is made.  A call costs about 2 us more while it is profiled.
+"""
+
+import contextlib
+import json
+import time
+
+import numpy as np
+from scipy import integrate
+
+#evaluations of the rhs at new times in one attempted step, used to count
+#the rejected steps of the solvers of scipy
+_nodes = {integrate.Radau: 3, integrate.BDF: 1}
+
+
+class SolverProfile:
+    '''calls, time and steps of one or more runs of a solver
+
+    Every call of a function wrapped by timed(kind, ...) is recorded with its
+    time, the temperature (in MeV) it was made at and the current stage.
+    The kinds are free, the solvers use 'rhs', 'jacobian', 'lu' and
+    'solve'.'''
+
+    def __init__(self):
+        self.current = None
+        self.stages = {}
+        self._kind = []
+        self._stage = []
+        self._elapsed = []
+        self._T = []
+
+    def record(self, kind, elapsed, T=np.nan):
+        '''add one call of kind taking elapsed seconds at temperature T'''
+        self._kind.append(kind)
+        self._stage.append(self.current)
+        self._elapsed.append(elapsed)
+        self._T.append(T)
+
+    def timed(self, kind, function, temperature=None):
+        '''function, recording every call as kind.  temperature(*args) gives
+        the temperature of the call, it is not included in the time'''
+        def wrapper(*args):
+            start = time.perf_counter()
+            value = function(*args)
+            elapsed = time.perf_counter() - start
+            self.record(kind, elapsed, np.nan if temperature is None else temperature(*args))
+            return value
+        return wrapper
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        '''record the calls and steps inside the block under stage name, and
+        add its wall time to the stage'''
+        previous, self.current = self.current, name
+        totals = self._totals(name)
+        start = time.perf_counter()
+        try:
+            yield totals
+        finally:
+            totals['wall time'] += time.perf_counter() - start
+            self.current = previous
+
+    def _totals(self, name):
+        return self.stages.setdefault(name, {'wall time': 0.0, 'steps': 0, 'rejected': 0})
+
+    def count_steps(self, accepted, rejected=0):
+        '''add accepted and rejected steps to the current stage'''
+        totals = self._totals(self.current)
+        totals['steps'] += int(accepted)
+        if totals['rejected'] is not None:
+            totals['rejected'] = None if rejected is None else totals['rejected'] + int(rejected)
+
+    def method(self, method='Radau', temperature=None):
+        '''a subclass of the OdeSolver method (a class or its name in
+        scipy.integrate) for solve_ivp which counts the steps and records the
+        LU decompositions and solves, temperature(t, y) as for timed.  The
+        rejected steps, failed error tests and Newton iterations which
+        made the step smaller, are counted for Radau and BDF only'''
+        base = getattr(integrate, method) if isinstance(method, str) else method
+        nodes = next((n for solver, n in _nodes.items() if issubclass(base, solver)), None)
+        profile = self
+
+        class ProfiledSolver(base):
+            def __init__(self, fun, t0, y0, t_bound, **options):
+                super().__init__(fun, t0, y0, t_bound, **options)
+                state = (lambda *args: temperature(self.t, self.y)) if temperature is not None else None
+                if hasattr(self, 'lu'):
+                    self.lu = profile.timed('lu', self.lu, state)
+                    self.solve_lu = profile.timed('solve', self.solve_lu, state)
+                fun = self.fun
+                self._times = set()
+
+                def counted(t, y):
+                    self._times.add(t)
+                    return fun(t, y)
+                self.fun = counted
+
+            def _step_impl(self):
+                t = self.t
+                self._times.clear()
+                success, message = super()._step_impl()
+                if success:
+                    if nodes is None:
+                        profile.count_steps(1, None)
+                    else:
+                        attempts = sum(1 for s in self._times if self.direction*(s - t) > 0)//nodes
+                        profile.count_steps(1, max(attempts - 1, 0))
+                return success, message
+
+        ProfiledSolver.__name__ = 'Profiled' + base.__name__
+        return ProfiledSolver
+
+    def solve_ivp(self, fun, t_span, y0, method='Radau', jac=None, temperature=None, stage=None, **options):
+        '''scipy.integrate.solve_ivp with fun and jac profiled as 'rhs' and
+        'jacobian', under stage if it is given'''
+        if jac is not None and callable(jac):
+            timed = self.timed('jacobian', jac, temperature)
+            #LSODA calls jac with as many arguments as it declares
+            jac = lambda t, y: timed(t, y)
+        block = self.stage(stage) if stage is not None else contextlib.nullcontext(self._totals(self.current))
+        with block as totals:
+            solution = integrate.solve_ivp(self.timed('rhs', fun, temperature), t_span, y0,
+                                           method=self.method(method, temperature), jac=jac, **options)
+        for key in ('nfev', 'njev', 'nlu'):
+            totals[key] = totals.get(key, 0) + int(getattr(solution, key))
+        return solution
+
+    def _arrays(self):
+        return (np.array(self._kind, dtype=object), np.array(self._stage, dtype=object),
+                np.array(self._elapsed, dtype=np.float64), np.array(self._T, dtype=np.float64))
+
+    def report(self, bins_per_decade=4):
+        '''nested dict of the calls: the totals of every stage, the calls,
+        time and time per call of every kind, and the time of every kind in
+        bins of log10(T) with bins_per_decade bins per decade'''
+        kind, stage, elapsed, T = self._arrays()
+        calls = {}
+        for k in dict.fromkeys(self._kind):
+            mask = kind == k
+            calls[k] = {'calls': int(np.sum(mask)), 'time': float(np.sum(elapsed[mask])),
+                        'per call': float(np.mean(elapsed[mask]))}
+        stages = {}
+        for name, totals in self.stages.items():
+            mask = stage == name
+            stages[str(name)] = dict(totals, **{f'{k} time': float(np.sum(elapsed[mask & (kind == k)]))
+                                                 for k in calls})
+        report = {'stages': stages, 'calls': calls}
+
+        known = np.isfinite(T) & (T > 0)
+        if np.any(known):
+            logT = np.log10(T[known])
+            first = np.floor(logT.min()*bins_per_decade)
+            last = np.floor(logT.max()*bins_per_decade) + 1
+            edges = 10**(np.arange(first, last + 1)/bins_per_decade)
+            index = np.clip(np.searchsorted(edges, T[known], side='right') - 1, 0, len(edges) - 2)
+            report['temperature'] = {'edges [MeV]': edges.tolist()}
+            for k in calls:
+                mask = kind[known] == k
+                report['temperature'][k] = np.bincount(index[mask], elapsed[known][mask],
+                                                       minlength=len(edges) - 1).tolist()
+        return report
+
+    def to_json(self, filename=None, bins_per_decade=4):
+        '''the report as a JSON string, also written to filename if given'''
+        text = json.dumps(self.report(bins_per_decade), indent=1)
+        if filename is not None:
+            with open(filename, 'w') as f:
+                f.write(text)
+        return text
+
+    def frame(self, bins_per_decade=4):
+        '''pandas DataFrame of the calls, time and time per call by stage,
+        kind and bin of temperature (its lower edge in MeV)'''
+        import pandas as pd
+        kind, stage, elapsed, T = self._arrays()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            T_bin = 10**(np.floor(np.log10(T)*bins_per_decade)/bins_per_decade)
+        data = pd.DataFrame({'stage': stage, 'kind': kind, 'T [MeV]': T_bin, 'time': elapsed})
+        frame = data.groupby(['stage', 'kind', 'T [MeV]'], dropna=False)['time'].agg(['count', 'sum', 'mean'])
+        return frame.rename(columns={'count': 'calls', 'sum': 'time', 'mean': 'per call'})
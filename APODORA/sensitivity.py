@@ -0,0 +1,200 @@
+"""Sensitivities of the abundances to the rates, forward and adjoint.
+
+The sensitivities S_ik = dY_i/d ln(rate_k) of all rates of a network follow
+the linear equations
+
+    dS/dt = J S + D,    J = d(dY/dt)/dY,  D_ik = d(dY_i/dt)/d ln(rate_k)
+
+with J of jacobian_rates_eq and D of rate_derivatives_rates_eq of the
+SparseNetwork (the stoichiometry times the molar flows).  They are
+integrated after the network, over the steps of its solution, by one step of
+the three stage Radau IIA method (order 5 and stiffly accurate, the method
+of the Radau solver of scipy) per step, with J and D evaluated on the dense
+output of the solution.  The columns of all rates share the LU factorization
+of the step, so one run gives the sensitivities that took a run per rate by
+finite differences.  Unlike the jacobian of the solver, J takes in that the
+density and ye change with Y, see total_jacobian: the density goes with the
+masses, so n -> p lowers it.
+
+The nuclides brought into equilibrium at the start of a stage start with
+the sensitivities of the equilibrium, see equilibrium_sensitivities.
+
+For a few outputs of the final abundances against many inputs the adjoint
+is cheaper: the gradient lam = dO/dY of an output O at the end follows
+
+    dlam/dt = -J^T lam,    dO/dp = lam(t0)^T dY(t0)/dp + int lam^T P dt
+
+backwards, with P_ip = d(dY_i/dt)/dp the derivatives by the inputs p (the
+ln of the rates, ln(eta), n_nu, ...), so a backward pass gives dO/dp of all
+of them with one column instead of one per input.  Its steps are the
+transposes of those of the forward sensitivities, taken over the steps of
+the forward solution in reverse (see adjoint_step), so both give the same
+gradients up to rounding.  Radau run backwards over the same steps instead
+was off by 1e-3 in the weak rates: their flows are large where lam has
+nearly settled, and the steps are not made for the small rest.
+
+The forward solution is kept with its dense output, or, to bound the
+memory, the Checkpoints hold its state at every few steps and the steps
+between two of them are solved again when the backward pass gets there, so
+only the dense output of one segment is held at a time.  The equilibrium at
+the start of a stage is passed back by equilibrium_adjoint.
+
+What it costs: a step of the backward pass factorizes the 3n x 3n matrix of
+the collocation with J at each of the three stages, which is not the matrix
+of the simplified Newton iteration of the solver (one J for all stages), so
+its LU factors can not be reused.  With the dense output kept the backward
+pass costs a little more than the forward solve, so a run with the adjoint
+takes two to two and a half plain runs, less than the three of the forward
+sensitivities.  The checkpoints hold less memory and add one to two forward
+solves, solving the segments again from their first steps.  The timings are
+measured by benchmarks/bench_adjoint.py.
+"""
+
+import numba
+import numpy as np
+from scipy import linalg
+
+#the Radau IIA method of order 5 (Hairer and Wanner, Solving Ordinary
+#Differential Equations II, table 5.6)
+_sqrt6 = np.sqrt(6.0)
+_c = np.array([(4 - _sqrt6)/10, (4 + _sqrt6)/10, 1.0])
+_A = np.array([[(88 - 7*_sqrt6)/360, (296 - 169*_sqrt6)/1800, (-2 + 3*_sqrt6)/225],
+               [(296 + 169*_sqrt6)/1800, (88 + 7*_sqrt6)/360, (-2 - 3*_sqrt6)/225],
+               [(16 - _sqrt6)/36, (16 + _sqrt6)/36, 1/9]])
+
+
+@numba.njit(cache=True)
+def total_jacobian(J, D, Y, masses, rho_power, ye_power, A, Z):
+    '''J with the terms of the density and ye, which depend on Y through the
+    masses (in MeV) and charges of the nuclides: the flows go with
+    rho**rho_power ye**ye_power, so d(dY/dt)/d ln(rho) = D rho_power'''
+    n, nrates = D.shape
+    dlnrho = masses/np.sum(masses*Y)
+    dlnye = Z/np.sum(Z*Y) - A/np.sum(A*Y)
+    result = J.copy()
+    for i in range(n):
+        drho = 0.0
+        dye = 0.0
+        for k in range(nrates):
+            drho += D[i, k]*rho_power[k]
+            dye += D[i, k]*ye_power[k]
+        for j in range(n):
+            result[i, j] += drho*dlnrho[j] + dye*dlnye[j]
+    return result
+
+
+def equilibrium_sensitivities(J, D, S, free, conserved=None, A=None):
+    '''S with the rows free replaced by the sensitivities of the equilibrium
+    dY_free/dt = 0, J_ff S_f = -(J_fx S_x + D_f) for the others held at S.
+    With conserved (an index into the free nuclides) its row is replaced by
+    baryon number conservation, sum A S = 0, as in equilibrium_initial_state'''
+    free = np.flatnonzero(free)
+    if len(free) == 0:
+        return S
+    held = np.setdiff1d(np.arange(len(S)), free)
+    matrix = J[np.ix_(free, free)].copy()
+    right = -(D[free] + J[np.ix_(free, held)] @ S[held])
+    if conserved is not None:
+        matrix[conserved] = A[free]
+        right[conserved] = -A[held] @ S[held]
+    S = S.copy()
+    S[free] = np.linalg.solve(matrix, right)
+    return S
+
+
+def equilibrium_adjoint(J, P, lam, free, conserved=None, A=None):
+    '''the adjoint of equilibrium_sensitivities: lam of the nuclides held
+    with the part of the free ones that goes through the equilibrium added,
+    and the gradient -P_f^T mu by the inputs of P, with J_ff^T mu = lam_f.
+    lam has a column per output'''
+    free = np.flatnonzero(free)
+    if len(free) == 0:
+        return lam, np.zeros((P.shape[1], lam.shape[1]))
+    held = np.setdiff1d(np.arange(len(lam)), free)
+    matrix = J[np.ix_(free, free)].copy()
+    coupling = J[np.ix_(free, held)].copy()
+    forcing = P[free].copy()
+    if conserved is not None:
+        matrix[conserved] = A[free]
+        coupling[conserved] = A[held]
+        forcing[conserved] = 0
+    #the columns of the nuclides far below the others are scaled up
+    scale = 1/np.max(np.abs(matrix), axis=0)
+    mu = np.linalg.solve((matrix*scale).T, scale[:, None]*lam[free])
+    lam = lam.copy()
+    lam[held] -= coupling.T @ mu
+    lam[free] = 0
+    return lam, -forcing.T @ mu
+
+
+def radau_step(linearization, t, h, S):
+    '''S after the step h from t of dS/dt = J S + D, with
+    linearization(t) returning J and D'''
+    n = S.shape[0]
+    stages = [linearization(t + c*h) for c in _c]
+    matrix = np.eye(3*n)
+    right = np.tile(S, (3, 1))
+    for i in range(3):
+        for j, (J, D) in enumerate(stages):
+            matrix[i*n:(i+1)*n, j*n:(j+1)*n] -= h*_A[i, j]*J
+            right[i*n:(i+1)*n] += h*_A[i, j]*D
+    #stiffly accurate, the solution is the last stage
+    return linalg.lu_solve(linalg.lu_factor(matrix), right)[2*n:]
+
+
+def integrate_sensitivities(linearization, t, S):
+    '''the sensitivities at t[-1] from S at t[0], over the steps of the
+    times t, with linearization(t) returning J and D'''
+    for t0, t1 in zip(t[:-1], t[1:]):
+        S = radau_step(linearization, t0, t1 - t0, S)
+    return S
+
+
+def adjoint_step(linearization, t, h, lam):
+    '''the transpose of radau_step: lam at t from lam at t + h and the
+    gradient by the inputs of P over the step, with linearization(t)
+    returning J and P'''
+    n = lam.shape[0]
+    stages = [linearization(t + c*h) for c in _c]
+    matrix = np.eye(3*n)
+    for i in range(3):
+        for j, (J, _) in enumerate(stages):
+            matrix[i*n:(i+1)*n, j*n:(j+1)*n] -= h*_A[i, j]*J
+    right = np.zeros((3*n, lam.shape[1]))
+    right[2*n:] = lam
+    nu = linalg.lu_solve(linalg.lu_factor(matrix), right, trans=1).reshape(3, n, -1)
+    #the weights of the stages j, sum_i A_ij nu_i
+    weights = (_A.T @ nu.reshape(3, -1)).reshape(nu.shape)
+    gradient = h*(stages[0][1].T @ weights[0] + stages[1][1].T @ weights[1] + stages[2][1].T @ weights[2])
+    return nu.sum(axis=0), gradient
+
+
+class Checkpoints:
+    '''the steps t of a forward solution with its states y kept at every
+    every-th step and the last.  solve(t0, t1, y0, first_step) solves the
+    steps from t0 to t1 again from y0 and returns the dense output'''
+
+    def __init__(self, t, y, every, solve):
+        self.t = t
+        self.index = np.union1d(np.arange(0, len(t) - 1, every), [len(t) - 1])
+        self.y = y[:, self.index].copy()
+        self.solve = solve
+
+    def segments(self):
+        '''the steps and dense output between two checkpoints, from the last
+        to the first'''
+        for i in range(len(self.index) - 2, -1, -1):
+            t = self.t[self.index[i]:self.index[i+1] + 1]
+            yield t, self.solve(t[0], t[-1], self.y[:, i], t[1] - t[0])
+
+
+def integrate_adjoint(linearization, checkpoints, lam):
+    '''lam at the first step of the Checkpoints from lam at the last, and
+    the gradient gathered over them, with linearization(t, y) returning J
+    and P at the state y'''
+    gradient = 0
+    for t, sol in checkpoints.segments():
+        for t0, t1 in zip(t[-2::-1], t[-1:0:-1]):
+            lam, step = adjoint_step(lambda t: linearization(t, sol(t)), t0, t1 - t0, lam)
+            gradient = gradient + step
+    return lam, gradient
@@ -0,0 +1,271 @@
+"""Monte Carlo propagation of the uncertainties of the nuclear rates.
+
+Every reaction with an uncertainty gets a log-normal multiplier,
+exp(sigma z) with z drawn from a standard normal distribution, shared with
+its reverse rates, and fastbbn.run_bbn is run for every sample with the
+multipliers as RateOverrides, so the networks are compiled once per process
+and the background is read from its cache:
+
+    from APODORA.uncertainty import RateUncertainties, monte_carlo
+    uncertainties = RateUncertainties({'p_d__he3': 0.05, 'd_d__n_he3': 0.02})
+    result = monte_carlo(uncertainties, 10000, 'mc_rates', processes=8)
+    result.mean(), result.covariance(), result.sensitivities()
+
+The samples run in a pool of processes and their results are written as
+they come to a directory of .npy files in column order, memory mapped, so a
+run that was stopped is continued by calling monte_carlo again and the
+columns are read without loading the rest:
+
+    z.npy           the normal draws of every reaction (nsamples, nreactions)
+    Y.npy           the final abundances of the nuclides (nsamples, nnuc)
+    done.npy        the samples that have run, failed.npy those that failed
+    seconds.npy     the wall time of every sample
+    central.npy     the final abundances without multipliers
+    monte_carlo.json    reactions, sigmas, nuclides and options of the run
+"""
+
+import importlib
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from APODORA.networks.overrides import RateOverrides
+from APODORA.networks.sparse import parse_rate_name, sparse_network
+from APODORA.nuclear import observables
+
+#written into monte_carlo.json, change it with the files
+format_version = 1
+
+
+def _reaction(name):
+    # reactants and products of the rate name, in lower case and sorted
+    reactants, products, _ = parse_rate_name(name.lower())
+    return tuple(sorted(reactants)), tuple(sorted(products))
+
+
+class RateUncertainties:
+    '''log-normal uncertainties of rates
+
+    sigmas maps rate names to the standard deviation of ln(rate).  With
+    reverse the rates of the networks with reactants and products swapped
+    get the same multiplier, so a reaction and its reverse rate stay related
+    by detailed balance.'''
+
+    def __init__(self, sigmas, reverse=True):
+        self.sigmas = {name: float(sigma) for name, sigma in sigmas.items()}
+        self.reverse = reverse
+
+    @classmethod
+    def uniform(cls, rate_names, sigma, reverse=True):
+        '''the same sigma for all rates rate_names, without the reverse rates
+        among them if reverse is True'''
+        sigmas = {}
+        for name in rate_names:
+            forward, backward = _reaction(name)
+            if not reverse or not any(_reaction(other) == (backward, forward) for other in sigmas):
+                sigmas[name] = sigma
+        return cls(sigmas, reverse)
+
+    @property
+    def reactions(self):
+        return list(self.sigmas)
+
+    def groups(self, rate_names):
+        '''for every reaction the names among rate_names that get its
+        multiplier'''
+        groups = []
+        for name in self.sigmas:
+            forward, backward = _reaction(name)
+            reverse = [other for other in rate_names if other != name and self.reverse
+                       and other not in self.sigmas and _reaction(other) == (backward, forward)]
+            groups.append([name] + reverse)
+        return groups
+
+    def sample(self, nsamples, seed=None):
+        '''standard normal draws of shape (nsamples, nreactions)'''
+        return np.random.default_rng(seed).standard_normal((nsamples, len(self.sigmas)))
+
+    def overrides(self, z, groups):
+        '''the RateOverrides of the draws z of one sample, for the groups of
+        rate names'''
+        factors = np.exp(np.array(list(self.sigmas.values()))*z)
+        return RateOverrides({name: f for f, group in zip(factors, groups) for name in group})
+
+
+class MonteCarloResult:
+    '''the samples of monte_carlo in directory, memory mapped
+
+    z holds the normal draws and Y the final abundances of the nuclides
+    names, the rows that are not valid are not used by the statistics.'''
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'monte_carlo.json')) as f:
+            self.description = json.load(f)
+        self.reactions = self.description['reactions']
+        self.sigmas = np.array(self.description['sigmas'])
+        self.names = self.description['names']
+        for column in ('z', 'Y', 'done', 'failed', 'seconds', 'central'):
+            setattr(self, column, np.load(os.path.join(directory, column + '.npy'), mmap_mode='r'))
+
+    @property
+    def valid(self):
+        '''the samples that ran to the end'''
+        return np.asarray(self.done) & ~np.asarray(self.failed)
+
+    def observables(self):
+        '''the observables of nuclear.observables of the valid samples'''
+        return observables(self.names, np.asarray(self.Y[self.valid]))
+
+    def mean(self):
+        '''the means of the observables'''
+        return {key: np.mean(value) for key, value in self.observables().items()}
+
+    def std(self):
+        '''the standard deviations of the observables'''
+        return {key: np.std(value, ddof=1) for key, value in self.observables().items()}
+
+    def covariance(self):
+        '''the names of the observables and their covariance matrix'''
+        values = self.observables()
+        return list(values), np.cov(np.array(list(values.values())))
+
+    def sensitivities(self):
+        '''d ln(observable)/d ln(rate) of every reaction, fitted by least
+        squares to ln(observable) against the ln(multipliers) of the valid
+        samples, by observable'''
+        ln_multipliers = np.asarray(self.z[self.valid])*self.sigmas
+        design = np.column_stack([np.ones(len(ln_multipliers)), ln_multipliers])
+        result = {}
+        for key, value in self.observables().items():
+            if np.all(value > 0):
+                result[key] = np.linalg.lstsq(design, np.log(value), rcond=None)[0][1:]
+        return result
+
+    def report(self):
+        '''the number of samples and the mean, standard deviation and
+        central value of every observable'''
+        central = observables(self.names, np.asarray(self.central))
+        std = self.std()
+        return {'samples': int(np.sum(self.done)), 'failed': int(np.sum(self.failed)),
+                'observables': {key: {'mean': float(mean), 'std': float(std[key]), 'central': float(central[key])}
+                                for key, mean in self.mean().items()}}
+
+
+#the uncertainties, groups of rate names and options of run_bbn of a worker
+_worker = {}
+
+
+def _initialize(uncertainties, groups, options):
+    _worker.update(uncertainties=uncertainties, groups=groups, options=options)
+
+
+def _run_sample(task):
+    # the final abundances and wall time of the sample index with draws z
+    from fastbbn import run_bbn
+
+    index, z = task
+    start = time.perf_counter()
+    try:
+        result = run_bbn(overrides=_worker['uncertainties'].overrides(z, _worker['groups']),
+                         **_worker['options'])
+        Y = result.Y[:, -1]
+    except (RuntimeError, np.linalg.LinAlgError):
+        Y = None
+    return index, Y, time.perf_counter() - start
+
+
+def _description(uncertainties, nsamples, seed, names, options):
+    return {'version': format_version, 'reactions': uncertainties.reactions,
+            'sigmas': list(uncertainties.sigmas.values()), 'reverse': uncertainties.reverse,
+            'nsamples': nsamples, 'seed': seed, 'names': names,
+            'options': {key: repr(value) for key, value in sorted(options.items())}}
+
+
+def monte_carlo(uncertainties, nsamples, directory, processes=None, seed=0, flush_every=100,
+                verbose=False, **options):
+    '''run_bbn for nsamples draws of the RateUncertainties uncertainties,
+    in a pool of processes (os.cpu_count() by default, in this process for
+    1), writing the results to directory.  options are passed to run_bbn.
+
+    A directory holding the samples of the same uncertainties, seed and
+    options is continued with the samples that have not run.  Returns the
+    MonteCarloResult'''
+    from fastbbn import Stage, default_stages, run_bbn
+
+    stages = options.get('stages', default_stages)
+    if isinstance(stages, (Stage, str)) or not np.iterable(stages):
+        stages = [stages]
+    networks = [stage.network if isinstance(stage, Stage) else stage for stage in stages]
+    rate_names = list(dict.fromkeys(name for network in networks for name in sparse_network(
+        importlib.import_module(network) if isinstance(network, str) else network).rate_names))
+    groups = uncertainties.groups(rate_names)
+    unknown = [group[0] for group in groups if group[0] not in rate_names]
+    if unknown:
+        raise ValueError(f'no network of the run has the rates {unknown}')
+
+    filename = os.path.join(directory, 'monte_carlo.json')
+    if os.path.exists(filename):
+        result = MonteCarloResult(directory)
+        if result.description != _description(uncertainties, nsamples, seed, result.names, options):
+            raise ValueError(f'{directory} holds the samples of another Monte Carlo')
+    else:
+        #the central run compiles the networks and caches the background
+        #before the workers start
+        central = run_bbn(**options)
+        names = list(central.names)
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'central.npy'), central.Y[:, -1])
+        np.save(os.path.join(directory, 'z.npy'), np.asfortranarray(uncertainties.sample(nsamples, seed)))
+        columns = {'Y': ((nsamples, len(names)), np.float64, np.nan), 'done': ((nsamples,), np.bool_, False),
+                   'failed': ((nsamples,), np.bool_, False), 'seconds': ((nsamples,), np.float64, np.nan)}
+        for column, (shape, dtype, fill) in columns.items():
+            array = np.lib.format.open_memmap(os.path.join(directory, column + '.npy'), mode='w+',
+                                              dtype=dtype, shape=shape, fortran_order=True)
+            array[...] = fill
+            array.flush()
+            del array
+        with open(filename, 'w') as f:
+            json.dump(_description(uncertainties, nsamples, seed, names, options), f, indent=1)
+
+    open_column = lambda column: np.load(os.path.join(directory, column + '.npy'), mmap_mode='r+')
+    z = np.load(os.path.join(directory, 'z.npy'))
+    Y, done, failed, seconds = (open_column(column) for column in ('Y', 'done', 'failed', 'seconds'))
+    tasks = [(index, z[index]) for index in np.flatnonzero(~done)]
+
+    def store(index, Y_final, wall_time):
+        if Y_final is None or len(Y_final) != Y.shape[1]:
+            failed[index] = True
+        else:
+            Y[index] = Y_final
+        seconds[index] = wall_time
+        done[index] = True
+
+    processes = os.cpu_count() if processes is None else processes
+    start = time.perf_counter()
+    if processes == 1 or len(tasks) <= 1:
+        _initialize(uncertainties, groups, options)
+        samples = map(_run_sample, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, _initialize, (uncertainties, groups, options))
+        samples = pool.imap_unordered(_run_sample, tasks)
+    try:
+        for count, sample in enumerate(samples, 1):
+            store(*sample)
+            if count % flush_every == 0 or count == len(tasks):
+                for column in (Y, failed, seconds, done):
+                    column.flush()
+                if verbose:
+                    elapsed = time.perf_counter() - start
+                    print(f'{count}/{len(tasks)} samples, {count/elapsed:.2f} per s')
+    finally:
+        for column in (Y, failed, seconds, done):
+            column.flush()
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return MonteCarloResult(directory)
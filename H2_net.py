@@ -140,71 +140,25 @@ def n_p_p__p_d(rate_eval, tf):
     rate_eval.n_p_p__p_d = rate
 
 
-b0 = -0.62173 
-b1 = 0.22211e2
-b2 = -0.72798e2
-b3 = 0.11571e3
-b4 = -0.11763e2
-b5 = 0.45521e2
-b6 = -3.7973 
-b7 = 0.41266 
-b8 = -0.026210
-b9 = 0.87934e-3
-b10 = -0.12016e-4
-qpn = 2.8602
-
-@numba.njit() 
-def p__n(rate_eval, tf):  
-    # p --> n
-    z=5.92989658*tf.T9i
-    rate=0
-    #rate from https://arxiv.org/pdf/astro-ph/0408076.pdf appendix C
-    b=[b0,b1,b2,b3,b4,b5,b6,b7,b8,b9,b10]
-    if tf.T9>1.160451812:
-      for i in range(11):
-         rate+=1/880.2*np.exp(-qpn*z)*b[i]*z**-i 
-        
-    #Kawano rate
-    #rate=1/879.6*(5.252/z - 16.229/z**2 + 18.059/z**3 + 34.181/z**4 + 27.617/z**5)*np.exp(-2.530988*z)
-    rate_eval.p__n = rate
-
-
-a0 = 1
-a1 = 0.15735 
-a2 = 4.6172
-a3 = -0.40520e2 
-a4 = 0.13875e3 
-a5 = -0.59898e2
-a6 = 0.66752e2 
-a7 = -0.16705e2 
-a8 = 3.8071
-a9 = -0.39140 
-a10 = 0.023590 
-a11 = -0.83696e-4
-a12 = -0.42095e-4 
-a13 = 0.17675e-5
-qnp = 0.33979 
+from APODORA.networks.weak_rates import p__n_rate
 
 @numba.njit()
-def n__p(rate_eval, tf):
-    # n --> p
-    z=5.92989658*tf.T9i
-    #rate from https://arxiv.org/pdf/astro-ph/0408076.pdf appendix C
-    rate=0
-    a=[a0,a1,a2,a3,a4,a5,a6,a7,a8,a9,a10,a11,a12,a13]
-    for i in range(14):
-      rate+=1/880.2*np.exp(-qnp/z)*a[i]*z**-i
+def p__n(rate_eval, tf):
+    # p --> n
+    #rate from https://arxiv.org/pdf/astro-ph/0408076.pdf appendix C, see APODORA/networks/weak_rates.py
+    rate_eval.p__n = p__n_rate(tf.T9)
 
-    #Kawano rate
-    #rate = 1/879.6*(0.565/z - 6.382/z**2 + 11.108/z**3 + 36.492/z**4 + 27.512/z**5)
 
-    rate_eval.n__p = rate
+from APODORA.networks.weak_rates import n__p_rate
 
-def rhs(t, Y, rho, T, screen_func=None):
-    return rhs_eq(t, Y, rho, T, screen_func)
+@numba.njit()
+def n__p(rate_eval, tf):
+    # n --> p
+    #rate from https://arxiv.org/pdf/astro-ph/0408076.pdf appendix C, see APODORA/networks/weak_rates.py
+    rate_eval.n__p = n__p_rate(tf.T9)
 
 @numba.njit()
-def rhs_eq(t, Y, rho, T, screen_func):
+def rates_eq(T):
 
     tf = Tfactors(T)
     rate_eval = RateEval()
@@ -221,6 +175,10 @@ def rhs_eq(t, Y, rho, T, screen_func):
     p__n(rate_eval, tf)
     n__p(rate_eval, tf)
 
+    return rate_eval
+
+@numba.njit()
+def screen_rates(rate_eval, Y, rho, T, screen_func):
     if screen_func is not None:
         plasma_state = PlasmaState(T, rho, Y, Z)
 
@@ -234,6 +192,10 @@ def rhs_eq(t, Y, rho, T, screen_func):
         scor = screen_func(plasma_state, scn_fac)
         rate_eval.p_d__n_p_p *= scor
 
+
+@numba.njit()
+def rhs_rates_eq(Y, rho, rate_eval):
+
     dYdt = np.zeros((nnuc), dtype=np.float64)
 
     dYdt[jn] = (
@@ -269,39 +231,8 @@ def rhs_eq(t, Y, rho, T, screen_func):
 
     return dYdt
 
-def jacobian(t, Y, rho, T, screen_func=None):
-    return jacobian_eq(t, Y, rho, T, screen_func)
-
 @numba.njit()
-def jacobian_eq(t, Y, rho, T, screen_func):
-
-    tf = Tfactors(T)
-    rate_eval = RateEval()
-
-    # reaclib rates
-    d__n_p(rate_eval, tf)
-    n_p__d(rate_eval, tf)
-    p_p__d__weak__bet_pos_(rate_eval, tf)
-    p_p__d__weak__electron_capture(rate_eval, tf)
-    p_d__n_p_p(rate_eval, tf)
-    n_p_p__p_d(rate_eval, tf)
-
-    # custom rates
-    p__n(rate_eval, tf)
-    n__p(rate_eval, tf)
-
-    if screen_func is not None:
-        plasma_state = PlasmaState(T, rho, Y, Z)
-
-        scn_fac = ScreenFactors(1, 1, 1, 1)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_p__d__weak__bet_pos_ *= scor
-        rate_eval.p_p__d__weak__electron_capture *= scor
-        rate_eval.n_p_p__p_d *= scor
-
-        scn_fac = ScreenFactors(1, 1, 1, 2)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_d__n_p_p *= scor
+def jacobian_rates_eq(Y, rho, rate_eval):
 
     jac = np.zeros((nnuc, nnuc), dtype=np.float64)
 
@@ -367,26 +298,179 @@ def jacobian_eq(t, Y, rho, T, screen_func):
 
     return jac
 
-#For AoT compilation of the network
-def AoT(networkname):
-   from numba.pycc import CC
+@numba.njit()
+def rhs_eq(t, Y, rho, T, screen_func):
+    rate_eval = rates_eq(T)
+    screen_rates(rate_eval, Y, rho, T, screen_func)
+    return rhs_rates_eq(Y, rho, rate_eval)
+
+@numba.njit()
+def jacobian_eq(t, Y, rho, T, screen_func):
+    rate_eval = rates_eq(T)
+    screen_rates(rate_eval, Y, rho, T, screen_func)
+    return jacobian_rates_eq(Y, rho, rate_eval)
+
+@numba.njit()
+def rhs_jac_eq(t, Y, rho, T, screen_func):
+    rate_eval = rates_eq(T)
+    screen_rates(rate_eval, Y, rho, T, screen_func)
+    return rhs_rates_eq(Y, rho, rate_eval), jacobian_rates_eq(Y, rho, rate_eval)
+
+# temperature and rates of the last call to rates, rhs and jacobian at the
+# same temperature share them (only without screening, which depends on Y)
+_last_rates = [None, None]
+
+def rates(T):
+    """the rates at temperature T, only evaluated if T changed since the last call"""
+    if T != _last_rates[0]:
+        _last_rates[1] = rates_eq(T)
+        _last_rates[0] = T
+    return _last_rates[1]
+
+def rhs(t, Y, rho, T, screen_func=None):
+    if screen_func is not None:
+        return rhs_eq(t, Y, rho, T, screen_func)
+    return rhs_rates_eq(Y, rho, rates(T))
+
+def jacobian(t, Y, rho, T, screen_func=None):
+    if screen_func is not None:
+        return jacobian_eq(t, Y, rho, T, screen_func)
+    return jacobian_rates_eq(Y, rho, rates(T))
+
+def rhs_and_jacobian(t, Y, rho, T, screen_func=None):
+    """rhs and jacobian from a single evaluation of the rates"""
+    if screen_func is not None:
+        return rhs_jac_eq(t, Y, rho, T, screen_func)
+    rate_eval = rates(T)
+    return rhs_rates_eq(Y, rho, rate_eval), jacobian_rates_eq(Y, rho, rate_eval)
+
+nrates = 8
+
+@numba.njit()
+def rates_to_array(rate_eval):
+    rates = np.empty(nrates, dtype=np.float64)
+    rates[0] = rate_eval.d__n_p
+    rates[1] = rate_eval.n_p__d
+    rates[2] = rate_eval.p_p__d__weak__bet_pos_
+    rates[3] = rate_eval.p_p__d__weak__electron_capture
+    rates[4] = rate_eval.p_d__n_p_p
+    rates[5] = rate_eval.n_p_p__p_d
+    rates[6] = rate_eval.p__n
+    rates[7] = rate_eval.n__p
+    return rates
+
+@numba.njit()
+def rates_from_array(rates):
+    rate_eval = RateEval()
+    rate_eval.d__n_p = rates[0]
+    rate_eval.n_p__d = rates[1]
+    rate_eval.p_p__d__weak__bet_pos_ = rates[2]
+    rate_eval.p_p__d__weak__electron_capture = rates[3]
+    rate_eval.p_d__n_p_p = rates[4]
+    rate_eval.n_p_p__p_d = rates[5]
+    rate_eval.p__n = rates[6]
+    rate_eval.n__p = rates[7]
+    return rate_eval
+
+@numba.njit()
+def temperature_groups(T):
+    """the distinct values of T, and the index of the value of every T"""
+    order = np.argsort(T)
+    unique = np.empty(T.shape[0], dtype=np.float64)
+    group = np.empty(T.shape[0], dtype=np.int64)
+    n = -1
+    for i in order:
+        if n < 0 or T[i] != unique[n]:
+            n += 1
+            unique[n] = T[i]
+        group[i] = n
+    return unique[:n+1], group
+
+@numba.njit(parallel=True)
+def rates_batch_eq(T):
+    """rates of every distinct temperature in T as rows of a table, and the
+    row belonging to every temperature"""
+    unique, group = temperature_groups(T)
+    table = np.empty((unique.shape[0], nrates), dtype=np.float64)
+    for g in numba.prange(unique.shape[0]):
+        table[g] = rates_to_array(rates_eq(unique[g]))
+    return table, group
+
+@numba.njit(parallel=True)
+def rhs_batch_rates_eq(Y, rho, table, group):
+    dYdt = np.empty((Y.shape[0], nnuc), dtype=np.float64)
+    for i in numba.prange(Y.shape[0]):
+        dYdt[i] = rhs_rates_eq(Y[i], rho[i], rates_from_array(table[group[i]]))
+    return dYdt
+
+@numba.njit(parallel=True)
+def jacobian_batch_rates_eq(Y, rho, table, group):
+    jac = np.empty((Y.shape[0], nnuc, nnuc), dtype=np.float64)
+    for i in numba.prange(Y.shape[0]):
+        jac[i] = jacobian_rates_eq(Y[i], rho[i], rates_from_array(table[group[i]]))
+    return jac
+
+@numba.njit()
+def rhs_batch_eq(t, Y, rho, T):
+    table, group = rates_batch_eq(T)
+    return rhs_batch_rates_eq(Y, rho, table, group)
 
-   cc = CC(networkname)
-   # Uncomment the following line to print out the compilation steps
-   #cc.verbose = True
+@numba.njit()
+def jacobian_batch_eq(t, Y, rho, T):
+    table, group = rates_batch_eq(T)
+    return jacobian_batch_rates_eq(Y, rho, table, group)
+
+# temperatures and rate table of the last call to rates_batch
+_last_rates_batch = [None, None, None]
+
+def rates_batch(T):
+    """rate table and rows for the temperatures T, only evaluated if T changed
+    since the last call"""
+    if _last_rates_batch[0] is None or not np.array_equal(T, _last_rates_batch[0]):
+        _last_rates_batch[1:] = rates_batch_eq(T)
+        _last_rates_batch[0] = np.array(T, dtype=np.float64)
+    return _last_rates_batch[1], _last_rates_batch[2]
+
+def rhs_batch(t, Y, rho, T):
+    """dY/dt of the states Y[N, nnuc] at densities rho[N] and temperatures
+    T[N], evaluated in parallel without screening.  The rates are evaluated
+    once for every distinct temperature"""
+    return rhs_batch_rates_eq(Y, rho, *rates_batch(np.asarray(T, dtype=np.float64)))
+
+def jacobian_batch(t, Y, rho, T):
+    """jacobians [N, nnuc, nnuc] of the states Y[N, nnuc], see rhs_batch"""
+    return jacobian_batch_rates_eq(Y, rho, *rates_batch(np.asarray(T, dtype=np.float64)))
 
-   #
-   @cc.export('nnuc','i4()')
-   def nNuc():
-      return nnuc
+@numba.njit()
+def log_jacobian(Y, dYdt, jac):
+    """d(d ln(Y_i)/dt)/d ln(Y_j) from dY/dt and the jacobian at Y"""
+    for i in range(nnuc):
+        for j in range(nnuc):
+            jac[i, j] *= Y[j]/Y[i]
+        jac[i, i] -= dYdt[i]/Y[i]
+    return jac
 
-   @cc.export('rhs', 'f8[:](f8, f8[:], f8, f8)')
-   def rhsCC(t, Y, rho, T):
-      return rhs_eq(t, Y, rho, T, None)
+@numba.njit()
+def rhs_log_rates_eq(lnY, rho, rate_eval):
+    Y = np.exp(lnY)
+    return rhs_rates_eq(Y, rho, rate_eval)/Y
 
-   @cc.export('jacobian', '(f8, f8[:], f8, f8)')
-   def jacobian(t, Y, rho, T):
-      return jacobian_eq(t, Y, rho, T, None)
+@numba.njit()
+def jacobian_log_rates_eq(lnY, rho, rate_eval):
+    Y = np.exp(lnY)
+    return log_jacobian(Y, rhs_rates_eq(Y, rho, rate_eval), jacobian_rates_eq(Y, rho, rate_eval))
 
+def rhs_log(t, lnY, rho, T, screen_func=None):
+    """d ln(Y)/dt of the state lnY = ln(Y)"""
+    if screen_func is not None:
+        Y = np.exp(lnY)
+        return rhs_eq(t, Y, rho, T, screen_func)/Y
+    return rhs_log_rates_eq(lnY, rho, rates(T))
 
-   cc.compile()
+def jacobian_log(t, lnY, rho, T, screen_func=None):
+    """jacobian of rhs_log, the jacobian scaled by Y_j/Y_i with d ln(Y_i)/dt
+    taken off the diagonal"""
+    if screen_func is not None:
+        Y = np.exp(lnY)
+        return log_jacobian(Y, *rhs_jac_eq(t, Y, rho, T, screen_func))
+    return jacobian_log_rates_eq(lnY, rho, rates(T))
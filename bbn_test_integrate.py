@@ -1292,71 +1292,25 @@ def p_p_he4_he4__he3_be7(rate_eval, tf):
     rate_eval.p_p_he4_he4__he3_be7 = rate
 
 
-b0 = -0.62173 
-b1 = 0.22211e2
-b2 = -0.72798e2
-b3 = 0.11571e3
-b4 = -0.11763e2
-b5 = 0.45521e2
-b6 = -3.7973 
-b7 = 0.41266 
-b8 = -0.026210
-b9 = 0.87934e-3
-b10 = -0.12016e-4
-qpn = 2.8602
-
-@numba.njit() 
-def p__n(rate_eval, tf):  
-    # p --> n
-    z=5.92989658*tf.T9i
-    rate=0
-    #rate from https://arxiv.org/pdf/astro-ph/0408076.pdf appendix C
-    b=[b0,b1,b2,b3,b4,b5,b6,b7,b8,b9,b10]
-    if tf.T9>1.160451812:
-      for i in range(11):
-         rate+=1/880.2*np.exp(-qpn*z)*b[i]*z**-i 
-        
-    #Kawano rate
-    #rate=1/879.6*(5.252/z - 16.229/z**2 + 18.059/z**3 + 34.181/z**4 + 27.617/z**5)*np.exp(-2.530988*z)
-    rate_eval.p__n = rate
-
-
-a0 = 1
-a1 = 0.15735 
-a2 = 4.6172
-a3 = -0.40520e2 
-a4 = 0.13875e3 
-a5 = -0.59898e2
-a6 = 0.66752e2 
-a7 = -0.16705e2 
-a8 = 3.8071
-a9 = -0.39140 
-a10 = 0.023590 
-a11 = -0.83696e-4
-a12 = -0.42095e-4 
-a13 = 0.17675e-5
-qnp = 0.33979 
+from APODORA.networks.weak_rates import p__n_rate
 
 @numba.njit()
-def n__p(rate_eval, tf):
-    # n --> p
-    z=5.92989658*tf.T9i
-    #rate from https://arxiv.org/pdf/astro-ph/0408076.pdf appendix C
-    rate=0
-    a=[a0,a1,a2,a3,a4,a5,a6,a7,a8,a9,a10,a11,a12,a13]
-    for i in range(14):
-      rate+=1/880.2*np.exp(-qnp/z)*a[i]*z**-i
+def p__n(rate_eval, tf):
+    # p --> n
+    #rate from https://arxiv.org/pdf/astro-ph/0408076.pdf appendix C, see APODORA/networks/weak_rates.py
+    rate_eval.p__n = p__n_rate(tf.T9)
 
-    #Kawano rate
-    #rate = 1/879.6*(0.565/z - 6.382/z**2 + 11.108/z**3 + 36.492/z**4 + 27.512/z**5)
 
-    rate_eval.n__p = rate
+from APODORA.networks.weak_rates import n__p_rate
 
-def rhs(t, Y, rho, T, screen_func=None):
-    return rhs_eq(t, Y, rho, T, screen_func)
+@numba.njit()
+def n__p(rate_eval, tf):
+    # n --> p
+    #rate from https://arxiv.org/pdf/astro-ph/0408076.pdf appendix C, see APODORA/networks/weak_rates.py
+    rate_eval.n__p = n__p_rate(tf.T9)
 
 @numba.njit()
-def rhs_eq(t, Y, rho, T, screen_func):
+def rates_eq(T):
 
     tf = Tfactors(T)
     rate_eval = RateEval()
@@ -1452,6 +1406,10 @@ def rhs_eq(t, Y, rho, T, screen_func):
     p__n(rate_eval, tf)
     n__p(rate_eval, tf)
 
+    return rate_eval
+
+@numba.njit()
+def screen_rates(rate_eval, Y, rho, T, screen_func):
     if screen_func is not None:
         plasma_state = PlasmaState(T, rho, Y, Z)
 
@@ -1594,6 +1552,10 @@ def rhs_eq(t, Y, rho, T, screen_func):
         rate_eval.n_p_he4_he4__he3_li7 *= scor
         rate_eval.n_p_he4_he4__t_be7 *= scor
 
+
+@numba.njit()
+def rhs_rates_eq(Y, rho, rate_eval):
+
     dYdt = np.zeros((nnuc), dtype=np.float64)
 
     dYdt[jn] = (
@@ -1927,247 +1889,8 @@ def rhs_eq(t, Y, rho, T, screen_func):
 
     return dYdt
 
-def jacobian(t, Y, rho, T, screen_func=None):
-    return jacobian_eq(t, Y, rho, T, screen_func)
-
 @numba.njit()
-def jacobian_eq(t, Y, rho, T, screen_func):
-
-    tf = Tfactors(T)
-    rate_eval = RateEval()
-
-    # reaclib rates
-    t__he3__weak__wc12(rate_eval, tf)
-    he3__t__weak__electron_capture(rate_eval, tf)
-    be7__li7__weak__electron_capture(rate_eval, tf)
-    d__n_p(rate_eval, tf)
-    t__n_d(rate_eval, tf)
-    he3__p_d(rate_eval, tf)
-    he4__n_he3(rate_eval, tf)
-    he4__p_t(rate_eval, tf)
-    he4__d_d(rate_eval, tf)
-    li6__he4_d(rate_eval, tf)
-    li7__n_li6(rate_eval, tf)
-    li7__he4_t(rate_eval, tf)
-    li8__n_li7(rate_eval, tf)
-    li8__he4_he4__weak__wc12(rate_eval, tf)
-    be7__p_li6(rate_eval, tf)
-    be7__he4_he3(rate_eval, tf)
-    li6__n_p_he4(rate_eval, tf)
-    n_p__d(rate_eval, tf)
-    p_p__d__weak__bet_pos_(rate_eval, tf)
-    p_p__d__weak__electron_capture(rate_eval, tf)
-    n_d__t(rate_eval, tf)
-    p_d__he3(rate_eval, tf)
-    d_d__he4(rate_eval, tf)
-    he4_d__li6(rate_eval, tf)
-    p_t__he4(rate_eval, tf)
-    he4_t__li7(rate_eval, tf)
-    n_he3__he4(rate_eval, tf)
-    p_he3__he4__weak__bet_pos_(rate_eval, tf)
-    he4_he3__be7(rate_eval, tf)
-    n_li6__li7(rate_eval, tf)
-    p_li6__be7(rate_eval, tf)
-    n_li7__li8(rate_eval, tf)
-    d_d__n_he3(rate_eval, tf)
-    d_d__p_t(rate_eval, tf)
-    p_t__n_he3(rate_eval, tf)
-    p_t__d_d(rate_eval, tf)
-    d_t__n_he4(rate_eval, tf)
-    he4_t__n_li6(rate_eval, tf)
-    n_he3__p_t(rate_eval, tf)
-    n_he3__d_d(rate_eval, tf)
-    d_he3__p_he4(rate_eval, tf)
-    t_he3__d_he4(rate_eval, tf)
-    he4_he3__p_li6(rate_eval, tf)
-    n_he4__d_t(rate_eval, tf)
-    p_he4__d_he3(rate_eval, tf)
-    d_he4__t_he3(rate_eval, tf)
-    he4_he4__n_be7(rate_eval, tf)
-    he4_he4__p_li7(rate_eval, tf)
-    n_li6__he4_t(rate_eval, tf)
-    p_li6__he4_he3(rate_eval, tf)
-    d_li6__n_be7(rate_eval, tf)
-    d_li6__p_li7(rate_eval, tf)
-    p_li7__n_be7(rate_eval, tf)
-    p_li7__d_li6(rate_eval, tf)
-    p_li7__he4_he4(rate_eval, tf)
-    d_li7__p_li8(rate_eval, tf)
-    t_li7__d_li8(rate_eval, tf)
-    p_li8__d_li7(rate_eval, tf)
-    d_li8__t_li7(rate_eval, tf)
-    n_be7__p_li7(rate_eval, tf)
-    n_be7__d_li6(rate_eval, tf)
-    n_be7__he4_he4(rate_eval, tf)
-    p_d__n_p_p(rate_eval, tf)
-    t_t__n_n_he4(rate_eval, tf)
-    t_he3__n_p_he4(rate_eval, tf)
-    he3_he3__p_p_he4(rate_eval, tf)
-    d_li7__n_he4_he4(rate_eval, tf)
-    p_li8__n_he4_he4(rate_eval, tf)
-    d_be7__p_he4_he4(rate_eval, tf)
-    t_li7__n_n_he4_he4(rate_eval, tf)
-    he3_li7__n_p_he4_he4(rate_eval, tf)
-    t_be7__n_p_he4_he4(rate_eval, tf)
-    he3_be7__p_p_he4_he4(rate_eval, tf)
-    n_p_he4__li6(rate_eval, tf)
-    n_p_p__p_d(rate_eval, tf)
-    n_n_he4__t_t(rate_eval, tf)
-    n_p_he4__t_he3(rate_eval, tf)
-    p_p_he4__he3_he3(rate_eval, tf)
-    n_he4_he4__p_li8(rate_eval, tf)
-    n_he4_he4__d_li7(rate_eval, tf)
-    p_he4_he4__d_be7(rate_eval, tf)
-    n_n_he4_he4__t_li7(rate_eval, tf)
-    n_p_he4_he4__he3_li7(rate_eval, tf)
-    n_p_he4_he4__t_be7(rate_eval, tf)
-    p_p_he4_he4__he3_be7(rate_eval, tf)
-
-    # custom rates
-    p__n(rate_eval, tf)
-    n__p(rate_eval, tf)
-
-    if screen_func is not None:
-        plasma_state = PlasmaState(T, rho, Y, Z)
-
-        scn_fac = ScreenFactors(1, 1, 1, 1)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_p__d__weak__bet_pos_ *= scor
-        rate_eval.p_p__d__weak__electron_capture *= scor
-        rate_eval.n_p_p__p_d *= scor
-        rate_eval.p_p_he4_he4__he3_be7 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 1, 2)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_d__he3 *= scor
-        rate_eval.p_d__n_p_p *= scor
-
-        scn_fac = ScreenFactors(1, 2, 1, 2)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_d__he4 *= scor
-        rate_eval.d_d__n_he3 *= scor
-        rate_eval.d_d__p_t *= scor
-
-        scn_fac = ScreenFactors(1, 2, 2, 4)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_d__li6 *= scor
-        rate_eval.d_he4__t_he3 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 1, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_t__he4 *= scor
-        rate_eval.p_t__n_he3 *= scor
-        rate_eval.p_t__d_d *= scor
-
-        scn_fac = ScreenFactors(1, 3, 2, 4)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_t__li7 *= scor
-        rate_eval.he4_t__n_li6 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 2, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_he3__he4__weak__bet_pos_ *= scor
-
-        scn_fac = ScreenFactors(2, 4, 2, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_he3__be7 *= scor
-        rate_eval.he4_he3__p_li6 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 3, 6)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_li6__be7 *= scor
-        rate_eval.p_li6__he4_he3 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 1, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_t__n_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 2, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_he3__p_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 3, 2, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.t_he3__d_he4 *= scor
-        rate_eval.t_he3__n_p_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 2, 4)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_he4__d_he3 *= scor
-        rate_eval.n_p_he4__li6 *= scor
-        rate_eval.n_p_he4__t_he3 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 2, 4)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_he4__n_be7 *= scor
-        rate_eval.he4_he4__p_li7 *= scor
-        rate_eval.n_he4_he4__p_li8 *= scor
-        rate_eval.n_he4_he4__d_li7 *= scor
-        rate_eval.n_n_he4_he4__t_li7 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 3, 6)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_li6__n_be7 *= scor
-        rate_eval.d_li6__p_li7 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 3, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_li7__n_be7 *= scor
-        rate_eval.p_li7__d_li6 *= scor
-        rate_eval.p_li7__he4_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 3, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_li7__p_li8 *= scor
-        rate_eval.d_li7__n_he4_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 3, 3, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.t_li7__d_li8 *= scor
-        rate_eval.t_li7__n_n_he4_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 3, 8)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_li8__d_li7 *= scor
-        rate_eval.p_li8__n_he4_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 3, 8)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_li8__t_li7 *= scor
-
-        scn_fac = ScreenFactors(1, 3, 1, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.t_t__n_n_he4 *= scor
-
-        scn_fac = ScreenFactors(2, 3, 2, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he3_he3__p_p_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 4, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_be7__p_he4_he4 *= scor
-
-        scn_fac = ScreenFactors(2, 3, 3, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he3_li7__n_p_he4_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 3, 4, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.t_be7__n_p_he4_he4 *= scor
-
-        scn_fac = ScreenFactors(2, 3, 4, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he3_be7__p_p_he4_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 1, 1)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_p_he4__he3_he3 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 2, 4)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_he4_he4__d_be7 *= scor
-        rate_eval.n_p_he4_he4__he3_li7 *= scor
-        rate_eval.n_p_he4_he4__t_be7 *= scor
+def jacobian_rates_eq(Y, rho, rate_eval):
 
     jac = np.zeros((nnuc, nnuc), dtype=np.float64)
 
@@ -2997,28 +2720,337 @@ def jacobian_eq(t, Y, rho, T, screen_func):
 
     return jac
 
+@numba.njit()
+def rhs_eq(t, Y, rho, T, screen_func):
+    rate_eval = rates_eq(T)
+    screen_rates(rate_eval, Y, rho, T, screen_func)
+    return rhs_rates_eq(Y, rho, rate_eval)
+
+@numba.njit()
+def jacobian_eq(t, Y, rho, T, screen_func):
+    rate_eval = rates_eq(T)
+    screen_rates(rate_eval, Y, rho, T, screen_func)
+    return jacobian_rates_eq(Y, rho, rate_eval)
+
+@numba.njit()
+def rhs_jac_eq(t, Y, rho, T, screen_func):
+    rate_eval = rates_eq(T)
+    screen_rates(rate_eval, Y, rho, T, screen_func)
+    return rhs_rates_eq(Y, rho, rate_eval), jacobian_rates_eq(Y, rho, rate_eval)
 
-#For AoT compilation of the network
-def AoT(networkname):
-   from numba.pycc import CC
+# temperature and rates of the last call to rates, rhs and jacobian at the
+# same temperature share them (only without screening, which depends on Y)
+_last_rates = [None, None]
 
-   cc = CC(networkname)
-   # Uncomment the following line to print out the compilation steps
-   #cc.verbose = True
+def rates(T):
+    """the rates at temperature T, only evaluated if T changed since the last call"""
+    if T != _last_rates[0]:
+        _last_rates[1] = rates_eq(T)
+        _last_rates[0] = T
+    return _last_rates[1]
 
-   #
-   @cc.export('nnuc','i4()')
-   def nNuc():
-      return nnuc
+def rhs(t, Y, rho, T, screen_func=None):
+    if screen_func is not None:
+        return rhs_eq(t, Y, rho, T, screen_func)
+    return rhs_rates_eq(Y, rho, rates(T))
 
-   @cc.export('rhs', 'f8[:](f8, f8[:], f8, f8)')
-   def rhsCC(t, Y, rho, T):
-      return rhs_eq(t, Y, rho, T, None)
+def jacobian(t, Y, rho, T, screen_func=None):
+    if screen_func is not None:
+        return jacobian_eq(t, Y, rho, T, screen_func)
+    return jacobian_rates_eq(Y, rho, rates(T))
 
-   @cc.export('jacobian', '(f8, f8[:], f8, f8)')
-   def jacobian(t, Y, rho, T):
-      return jacobian_eq(t, Y, rho, T, None)
+def rhs_and_jacobian(t, Y, rho, T, screen_func=None):
+    """rhs and jacobian from a single evaluation of the rates"""
+    if screen_func is not None:
+        return rhs_jac_eq(t, Y, rho, T, screen_func)
+    rate_eval = rates(T)
+    return rhs_rates_eq(Y, rho, rate_eval), jacobian_rates_eq(Y, rho, rate_eval)
+
+nrates = 87
+
+@numba.njit()
+def rates_to_array(rate_eval):
+    rates = np.empty(nrates, dtype=np.float64)
+    rates[0] = rate_eval.t__he3__weak__wc12
+    rates[1] = rate_eval.he3__t__weak__electron_capture
+    rates[2] = rate_eval.be7__li7__weak__electron_capture
+    rates[3] = rate_eval.d__n_p
+    rates[4] = rate_eval.t__n_d
+    rates[5] = rate_eval.he3__p_d
+    rates[6] = rate_eval.he4__n_he3
+    rates[7] = rate_eval.he4__p_t
+    rates[8] = rate_eval.he4__d_d
+    rates[9] = rate_eval.li6__he4_d
+    rates[10] = rate_eval.li7__n_li6
+    rates[11] = rate_eval.li7__he4_t
+    rates[12] = rate_eval.li8__n_li7
+    rates[13] = rate_eval.li8__he4_he4__weak__wc12
+    rates[14] = rate_eval.be7__p_li6
+    rates[15] = rate_eval.be7__he4_he3
+    rates[16] = rate_eval.li6__n_p_he4
+    rates[17] = rate_eval.n_p__d
+    rates[18] = rate_eval.p_p__d__weak__bet_pos_
+    rates[19] = rate_eval.p_p__d__weak__electron_capture
+    rates[20] = rate_eval.n_d__t
+    rates[21] = rate_eval.p_d__he3
+    rates[22] = rate_eval.d_d__he4
+    rates[23] = rate_eval.he4_d__li6
+    rates[24] = rate_eval.p_t__he4
+    rates[25] = rate_eval.he4_t__li7
+    rates[26] = rate_eval.n_he3__he4
+    rates[27] = rate_eval.p_he3__he4__weak__bet_pos_
+    rates[28] = rate_eval.he4_he3__be7
+    rates[29] = rate_eval.n_li6__li7
+    rates[30] = rate_eval.p_li6__be7
+    rates[31] = rate_eval.n_li7__li8
+    rates[32] = rate_eval.d_d__n_he3
+    rates[33] = rate_eval.d_d__p_t
+    rates[34] = rate_eval.p_t__n_he3
+    rates[35] = rate_eval.p_t__d_d
+    rates[36] = rate_eval.d_t__n_he4
+    rates[37] = rate_eval.he4_t__n_li6
+    rates[38] = rate_eval.n_he3__p_t
+    rates[39] = rate_eval.n_he3__d_d
+    rates[40] = rate_eval.d_he3__p_he4
+    rates[41] = rate_eval.t_he3__d_he4
+    rates[42] = rate_eval.he4_he3__p_li6
+    rates[43] = rate_eval.n_he4__d_t
+    rates[44] = rate_eval.p_he4__d_he3
+    rates[45] = rate_eval.d_he4__t_he3
+    rates[46] = rate_eval.he4_he4__n_be7
+    rates[47] = rate_eval.he4_he4__p_li7
+    rates[48] = rate_eval.n_li6__he4_t
+    rates[49] = rate_eval.p_li6__he4_he3
+    rates[50] = rate_eval.d_li6__n_be7
+    rates[51] = rate_eval.d_li6__p_li7
+    rates[52] = rate_eval.p_li7__n_be7
+    rates[53] = rate_eval.p_li7__d_li6
+    rates[54] = rate_eval.p_li7__he4_he4
+    rates[55] = rate_eval.d_li7__p_li8
+    rates[56] = rate_eval.t_li7__d_li8
+    rates[57] = rate_eval.p_li8__d_li7
+    rates[58] = rate_eval.d_li8__t_li7
+    rates[59] = rate_eval.n_be7__p_li7
+    rates[60] = rate_eval.n_be7__d_li6
+    rates[61] = rate_eval.n_be7__he4_he4
+    rates[62] = rate_eval.p_d__n_p_p
+    rates[63] = rate_eval.t_t__n_n_he4
+    rates[64] = rate_eval.t_he3__n_p_he4
+    rates[65] = rate_eval.he3_he3__p_p_he4
+    rates[66] = rate_eval.d_li7__n_he4_he4
+    rates[67] = rate_eval.p_li8__n_he4_he4
+    rates[68] = rate_eval.d_be7__p_he4_he4
+    rates[69] = rate_eval.t_li7__n_n_he4_he4
+    rates[70] = rate_eval.he3_li7__n_p_he4_he4
+    rates[71] = rate_eval.t_be7__n_p_he4_he4
+    rates[72] = rate_eval.he3_be7__p_p_he4_he4
+    rates[73] = rate_eval.n_p_he4__li6
+    rates[74] = rate_eval.n_p_p__p_d
+    rates[75] = rate_eval.n_n_he4__t_t
+    rates[76] = rate_eval.n_p_he4__t_he3
+    rates[77] = rate_eval.p_p_he4__he3_he3
+    rates[78] = rate_eval.n_he4_he4__p_li8
+    rates[79] = rate_eval.n_he4_he4__d_li7
+    rates[80] = rate_eval.p_he4_he4__d_be7
+    rates[81] = rate_eval.n_n_he4_he4__t_li7
+    rates[82] = rate_eval.n_p_he4_he4__he3_li7
+    rates[83] = rate_eval.n_p_he4_he4__t_be7
+    rates[84] = rate_eval.p_p_he4_he4__he3_be7
+    rates[85] = rate_eval.p__n
+    rates[86] = rate_eval.n__p
+    return rates
+
+@numba.njit()
+def rates_from_array(rates):
+    rate_eval = RateEval()
+    rate_eval.t__he3__weak__wc12 = rates[0]
+    rate_eval.he3__t__weak__electron_capture = rates[1]
+    rate_eval.be7__li7__weak__electron_capture = rates[2]
+    rate_eval.d__n_p = rates[3]
+    rate_eval.t__n_d = rates[4]
+    rate_eval.he3__p_d = rates[5]
+    rate_eval.he4__n_he3 = rates[6]
+    rate_eval.he4__p_t = rates[7]
+    rate_eval.he4__d_d = rates[8]
+    rate_eval.li6__he4_d = rates[9]
+    rate_eval.li7__n_li6 = rates[10]
+    rate_eval.li7__he4_t = rates[11]
+    rate_eval.li8__n_li7 = rates[12]
+    rate_eval.li8__he4_he4__weak__wc12 = rates[13]
+    rate_eval.be7__p_li6 = rates[14]
+    rate_eval.be7__he4_he3 = rates[15]
+    rate_eval.li6__n_p_he4 = rates[16]
+    rate_eval.n_p__d = rates[17]
+    rate_eval.p_p__d__weak__bet_pos_ = rates[18]
+    rate_eval.p_p__d__weak__electron_capture = rates[19]
+    rate_eval.n_d__t = rates[20]
+    rate_eval.p_d__he3 = rates[21]
+    rate_eval.d_d__he4 = rates[22]
+    rate_eval.he4_d__li6 = rates[23]
+    rate_eval.p_t__he4 = rates[24]
+    rate_eval.he4_t__li7 = rates[25]
+    rate_eval.n_he3__he4 = rates[26]
+    rate_eval.p_he3__he4__weak__bet_pos_ = rates[27]
+    rate_eval.he4_he3__be7 = rates[28]
+    rate_eval.n_li6__li7 = rates[29]
+    rate_eval.p_li6__be7 = rates[30]
+    rate_eval.n_li7__li8 = rates[31]
+    rate_eval.d_d__n_he3 = rates[32]
+    rate_eval.d_d__p_t = rates[33]
+    rate_eval.p_t__n_he3 = rates[34]
+    rate_eval.p_t__d_d = rates[35]
+    rate_eval.d_t__n_he4 = rates[36]
+    rate_eval.he4_t__n_li6 = rates[37]
+    rate_eval.n_he3__p_t = rates[38]
+    rate_eval.n_he3__d_d = rates[39]
+    rate_eval.d_he3__p_he4 = rates[40]
+    rate_eval.t_he3__d_he4 = rates[41]
+    rate_eval.he4_he3__p_li6 = rates[42]
+    rate_eval.n_he4__d_t = rates[43]
+    rate_eval.p_he4__d_he3 = rates[44]
+    rate_eval.d_he4__t_he3 = rates[45]
+    rate_eval.he4_he4__n_be7 = rates[46]
+    rate_eval.he4_he4__p_li7 = rates[47]
+    rate_eval.n_li6__he4_t = rates[48]
+    rate_eval.p_li6__he4_he3 = rates[49]
+    rate_eval.d_li6__n_be7 = rates[50]
+    rate_eval.d_li6__p_li7 = rates[51]
+    rate_eval.p_li7__n_be7 = rates[52]
+    rate_eval.p_li7__d_li6 = rates[53]
+    rate_eval.p_li7__he4_he4 = rates[54]
+    rate_eval.d_li7__p_li8 = rates[55]
+    rate_eval.t_li7__d_li8 = rates[56]
+    rate_eval.p_li8__d_li7 = rates[57]
+    rate_eval.d_li8__t_li7 = rates[58]
+    rate_eval.n_be7__p_li7 = rates[59]
+    rate_eval.n_be7__d_li6 = rates[60]
+    rate_eval.n_be7__he4_he4 = rates[61]
+    rate_eval.p_d__n_p_p = rates[62]
+    rate_eval.t_t__n_n_he4 = rates[63]
+    rate_eval.t_he3__n_p_he4 = rates[64]
+    rate_eval.he3_he3__p_p_he4 = rates[65]
+    rate_eval.d_li7__n_he4_he4 = rates[66]
+    rate_eval.p_li8__n_he4_he4 = rates[67]
+    rate_eval.d_be7__p_he4_he4 = rates[68]
+    rate_eval.t_li7__n_n_he4_he4 = rates[69]
+    rate_eval.he3_li7__n_p_he4_he4 = rates[70]
+    rate_eval.t_be7__n_p_he4_he4 = rates[71]
+    rate_eval.he3_be7__p_p_he4_he4 = rates[72]
+    rate_eval.n_p_he4__li6 = rates[73]
+    rate_eval.n_p_p__p_d = rates[74]
+    rate_eval.n_n_he4__t_t = rates[75]
+    rate_eval.n_p_he4__t_he3 = rates[76]
+    rate_eval.p_p_he4__he3_he3 = rates[77]
+    rate_eval.n_he4_he4__p_li8 = rates[78]
+    rate_eval.n_he4_he4__d_li7 = rates[79]
+    rate_eval.p_he4_he4__d_be7 = rates[80]
+    rate_eval.n_n_he4_he4__t_li7 = rates[81]
+    rate_eval.n_p_he4_he4__he3_li7 = rates[82]
+    rate_eval.n_p_he4_he4__t_be7 = rates[83]
+    rate_eval.p_p_he4_he4__he3_be7 = rates[84]
+    rate_eval.p__n = rates[85]
+    rate_eval.n__p = rates[86]
+    return rate_eval
+
+@numba.njit()
+def temperature_groups(T):
+    """the distinct values of T, and the index of the value of every T"""
+    order = np.argsort(T)
+    unique = np.empty(T.shape[0], dtype=np.float64)
+    group = np.empty(T.shape[0], dtype=np.int64)
+    n = -1
+    for i in order:
+        if n < 0 or T[i] != unique[n]:
+            n += 1
+            unique[n] = T[i]
+        group[i] = n
+    return unique[:n+1], group
+
+@numba.njit(parallel=True)
+def rates_batch_eq(T):
+    """rates of every distinct temperature in T as rows of a table, and the
+    row belonging to every temperature"""
+    unique, group = temperature_groups(T)
+    table = np.empty((unique.shape[0], nrates), dtype=np.float64)
+    for g in numba.prange(unique.shape[0]):
+        table[g] = rates_to_array(rates_eq(unique[g]))
+    return table, group
+
+@numba.njit(parallel=True)
+def rhs_batch_rates_eq(Y, rho, table, group):
+    dYdt = np.empty((Y.shape[0], nnuc), dtype=np.float64)
+    for i in numba.prange(Y.shape[0]):
+        dYdt[i] = rhs_rates_eq(Y[i], rho[i], rates_from_array(table[group[i]]))
+    return dYdt
 
+@numba.njit(parallel=True)
+def jacobian_batch_rates_eq(Y, rho, table, group):
+    jac = np.empty((Y.shape[0], nnuc, nnuc), dtype=np.float64)
+    for i in numba.prange(Y.shape[0]):
+        jac[i] = jacobian_rates_eq(Y[i], rho[i], rates_from_array(table[group[i]]))
+    return jac
 
-   if __name__ == "__main__":
-      cc.compile()
+@numba.njit()
+def rhs_batch_eq(t, Y, rho, T):
+    table, group = rates_batch_eq(T)
+    return rhs_batch_rates_eq(Y, rho, table, group)
+
+@numba.njit()
+def jacobian_batch_eq(t, Y, rho, T):
+    table, group = rates_batch_eq(T)
+    return jacobian_batch_rates_eq(Y, rho, table, group)
+
+# temperatures and rate table of the last call to rates_batch
+_last_rates_batch = [None, None, None]
+
+def rates_batch(T):
+    """rate table and rows for the temperatures T, only evaluated if T changed
+    since the last call"""
+    if _last_rates_batch[0] is None or not np.array_equal(T, _last_rates_batch[0]):
+        _last_rates_batch[1:] = rates_batch_eq(T)
+        _last_rates_batch[0] = np.array(T, dtype=np.float64)
+    return _last_rates_batch[1], _last_rates_batch[2]
+
+def rhs_batch(t, Y, rho, T):
+    """dY/dt of the states Y[N, nnuc] at densities rho[N] and temperatures
+    T[N], evaluated in parallel without screening.  The rates are evaluated
+    once for every distinct temperature"""
+    return rhs_batch_rates_eq(Y, rho, *rates_batch(np.asarray(T, dtype=np.float64)))
+
+def jacobian_batch(t, Y, rho, T):
+    """jacobians [N, nnuc, nnuc] of the states Y[N, nnuc], see rhs_batch"""
+    return jacobian_batch_rates_eq(Y, rho, *rates_batch(np.asarray(T, dtype=np.float64)))
+
+@numba.njit()
+def log_jacobian(Y, dYdt, jac):
+    """d(d ln(Y_i)/dt)/d ln(Y_j) from dY/dt and the jacobian at Y"""
+    for i in range(nnuc):
+        for j in range(nnuc):
+            jac[i, j] *= Y[j]/Y[i]
+        jac[i, i] -= dYdt[i]/Y[i]
+    return jac
+
+@numba.njit()
+def rhs_log_rates_eq(lnY, rho, rate_eval):
+    Y = np.exp(lnY)
+    return rhs_rates_eq(Y, rho, rate_eval)/Y
+
+@numba.njit()
+def jacobian_log_rates_eq(lnY, rho, rate_eval):
+    Y = np.exp(lnY)
+    return log_jacobian(Y, rhs_rates_eq(Y, rho, rate_eval), jacobian_rates_eq(Y, rho, rate_eval))
+
+def rhs_log(t, lnY, rho, T, screen_func=None):
+    """d ln(Y)/dt of the state lnY = ln(Y)"""
+    if screen_func is not None:
+        Y = np.exp(lnY)
+        return rhs_eq(t, Y, rho, T, screen_func)/Y
+    return rhs_log_rates_eq(lnY, rho, rates(T))
+
+def jacobian_log(t, lnY, rho, T, screen_func=None):
+    """jacobian of rhs_log, the jacobian scaled by Y_j/Y_i with d ln(Y_i)/dt
+    taken off the diagonal"""
+    if screen_func is not None:
+        Y = np.exp(lnY)
+        return log_jacobian(Y, *rhs_jac_eq(t, Y, rho, T, screen_func))
+    return jacobian_log_rates_eq(lnY, rho, rates(T))
@@ -0,0 +1,91 @@
+"""Accuracy and speed of the e+- thermodynamics kernel.
+
+rho_e, P_e and drho_e/dT of background.electron_thermodynamics are compared
+with the Fermi-Dirac integrals taken by quad, and so is the 9 term series over
+scipy.special.kn of fastbbn.py it replaces.  The kernel has to agree with quad
+to 1e-10 everywhere.  Then both are timed per temperature.
+
+    python benchmarks/bench_electron.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import integrate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from APODORA.background import L, M, dMdz, e_mass, electron_eq, electron_thermodynamics
+
+
+def series9(T):
+    '''rho_e, P_e and drho_e of fastbbn.py'''
+    z = e_mass/T
+    C = 2/np.pi**2*e_mass**4
+    return (C*np.sum([(-1)**(n+1)*M(n*z) for n in range(1, 10)]),
+            C*np.sum([(-1)**(n+1)/(n*z)*L(n*z) for n in range(1, 10)]),
+            C*np.sum([(-1)**n*n*z/T*dMdz(n*z) for n in range(1, 10)]))
+
+
+def fermi_dirac(T):
+    '''rho_e, P_e and drho_e as integrals over x = E/e_mass'''
+    z = e_mass/T
+    C = 2/np.pi**2*e_mass**4
+    occupation = lambda x: 1/(np.exp(z*x) + 1)
+    integrals = (lambda x: x**2*np.sqrt(x**2 - 1)*occupation(x),
+                 lambda x: (x**2 - 1)**1.5/3*occupation(x),
+                 lambda x: x**2*np.sqrt(x**2 - 1)*z*x/T*occupation(x)*(1 - occupation(x)))
+    upper = 1 + 800/z
+    return tuple(C*integrate.quad(f, 1, upper, epsabs=0, epsrel=1e-13, limit=500,
+                                  points=[1 + 1/z, 1 + 10/z])[0] for f in integrals)
+
+
+def accuracy(T):
+    print(f'{"T [MeV]":>9} {"quantity":>8} {"kernel":>10} {"9 terms":>10}')
+    worst = 0.0
+    for x in T:
+        with np.errstate(over='ignore'):
+            exact = fermi_dirac(x)
+        kernel = [float(v) for v in electron_thermodynamics(x)]
+        old = series9(x)
+        for name, e, k, o in zip(('rho_e', 'P_e', 'drho_e'), exact, kernel, old):
+            if e < 1e-250:
+                continue
+            worst = max(worst, abs(k/e - 1))
+            print(f'{x:9.3e} {name:>8} {abs(k/e - 1):10.2e} {abs(o/e - 1):10.2e}')
+    print(f'largest relative error of the kernel: {worst:.2e}')
+    assert worst < 1e-10, 'the e+- kernel is not accurate to 1e-10'
+
+
+def timing(T, repeat=20):
+    electron_eq(T[0], 1e-12, 2000)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for x in T:
+            electron_eq(x, 1e-12, 2000)
+    scalar = (time.perf_counter() - start)/(repeat*len(T))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        electron_thermodynamics(T)
+    array = (time.perf_counter() - start)/(repeat*len(T))
+
+    start = time.perf_counter()
+    for x in T:
+        series9(x)
+    old = (time.perf_counter() - start)/len(T)
+
+    print(f'kernel, scalar T: {1e6*scalar:8.2f} us per temperature')
+    print(f'kernel, array T:  {1e6*array:8.2f} us per temperature')
+    print(f'9 terms of kn:    {1e6*old:8.2f} us per temperature')
+
+
+def main():
+    accuracy(np.geomspace(2e-3, 10, 12))
+    timing(np.geomspace(1e-3, 27/11.60451812, 1000))
+
+
+if __name__ == '__main__':
+    main()
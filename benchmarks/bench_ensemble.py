@@ -0,0 +1,75 @@
+"""Throughput of integrate_ensemble against a loop over fastbbn.py.
+
+An ensemble of N cosmologies with eta in [5e-10, 7e-10] is integrated in
+lockstep for every number of numba threads up to NUMBA_NUM_THREADS, and
+fastbbn.run_bbn is called `loops` times in a Python loop, one cosmology at a
+time, on the same network as a single stage with the background integrated
+along (cached=False) and the same tolerances, like the ensemble.  Both are
+reported in cosmologies per second of wall time, with the largest relative
+difference of the observables of the loop from those of the ensemble.
+
+    python benchmarks/bench_ensemble.py [network] [N] [loops]
+"""
+
+import importlib
+import os
+import sys
+import time
+
+import numba
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from APODORA.ensemble import integrate_ensemble
+from fastbbn import run_bbn
+
+
+def fastbbn_loop(network, eta, **options):
+    '''wall time and observables of run_bbn of network for every eta'''
+    times, values = [], []
+    for x in eta:
+        start = time.perf_counter()
+        result = run_bbn(eta=x, stages=network, cached=False, **options)
+        times.append(time.perf_counter() - start)
+        values.append(result.observables())
+    return np.array(times), values
+
+
+def thread_counts():
+    counts, n = [], 1
+    while n < numba.config.NUMBA_NUM_THREADS:
+        counts.append(n)
+        n *= 2
+    return counts + [numba.config.NUMBA_NUM_THREADS]
+
+
+def main(name='bbn_test_integrate', N=64, loops=2):
+    network = importlib.import_module(name)
+    eta = np.linspace(5e-10, 7e-10, N)
+
+    # compile outside of the timing
+    integrate_ensemble(network, eta[:2], t_end=1.0)
+
+    print(f'{name}, {N} cosmologies')
+    print(f'{"threads":>8} {"wall [s]":>10} {"steps":>7} {"cosmologies/s":>14}')
+    for threads in thread_counts():
+        numba.set_num_threads(threads)
+        result = integrate_ensemble(network, eta)
+        if not result.success.all():
+            print(f'{np.sum(~result.success)} members failed')
+        print(f'{threads:>8} {result.wall_time:10.2f} {result.steps.max():7} {result.throughput:14.3f}')
+
+    if loops:
+        options = dict(rtol=1e-6, atol=1e-20)
+        run_bbn(eta=eta[0], stages=network, cached=False, t_end=1.0, **options)
+        times, values = fastbbn_loop(network, eta[:loops], **options)
+        ensemble = result.observables()
+        difference = max(abs(value[key]/ensemble[key][i] - 1) for i, value in enumerate(values)
+                         for key in ('Yp', 'H2/H', '(H3+He3)/H', '(Li7+Be7)/H'))
+        print(f'run_bbn loop: {times.mean():.2f} s per cosmology, '
+              f'{1/times.mean():.3f} cosmologies/s ({loops} runs), '
+              f'largest relative difference of the observables {difference:.1e}')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2], *map(int, sys.argv[2:4]))
@@ -0,0 +1,58 @@
+"""Steps, wall time and accuracy of run_bbn integrating ln(Y) against Y.
+
+Every setting is run `repeat` times and the fastest run is reported with its
+number of steps and the largest relative deviations of the observables, of
+all final abundances above 1e-60 and of the trace nuclides Li8, B12, C14 and
+O14 from a run integrating Y with rtol=1e-9.  Integrating ln(Y) controls the
+relative error of every abundance, however small, instead of leaving the
+trace nuclides to atol.
+
+    python benchmarks/bench_log_abundances.py [repeat]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from fastbbn import run_bbn
+
+settings = {
+    'Y, rtol=1e-6': dict(),
+    'Y, rtol=1e-5': dict(rtol=1e-5),
+    'lnY, rtol=1e-6': dict(log_abundances=True),
+    'lnY, rtol=1e-5': dict(log_abundances=True, rtol=1e-5),
+    'lnY, rtol=1e-4': dict(log_abundances=True, rtol=1e-4),
+}
+trace = ('li8', 'b12', 'c14', 'o14')
+
+
+def fastest(options, repeat):
+    run_bbn(**options)
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run_bbn(**options)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(repeat=3):
+    reference = run_bbn(rtol=1e-9)
+    expected = reference.observables()
+    resolved = reference.final > 1e-60
+    print(f'{"state":>15} {"wall [s]":>9} {"steps":>6} {"observables":>12} {"abundances":>11} '
+          + ' '.join(f'{name:>8}' for name in trace))
+    for name, options in settings.items():
+        wall, result = fastest(options, repeat)
+        values = result.observables()
+        observables = max(abs(values[key]/expected[key] - 1) for key in expected)
+        deviation = np.abs(result.final/reference.final - 1, where=resolved, out=np.zeros(len(resolved)))
+        nuclides = ' '.join(f'{deviation[reference.names.index(n)]:8.1e}' for n in trace)
+        print(f'{name:>15} {wall:9.2f} {len(result.t):6} {observables:12.1e} {np.max(deviation):11.1e} {nuclides}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,39 @@
+"""Samples per second of the Monte Carlo over the rates of uncertainty.py.
+
+The twelve reactions of the standard BBN network (with their reverse rates)
+get an uncertainty of 10% and monte_carlo runs nsamples samples into a
+temporary directory for every number of processes, from the caches of the
+networks and the background the central run leaves.  The time includes the
+start of the processes of the pool:
+
+    python benchmarks/bench_monte_carlo.py [nsamples] [processes ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from APODORA.uncertainty import RateUncertainties, monte_carlo
+
+#n <-> p is left to the neutron lifetime
+reactions = ('n_p__d', 'p_d__he3', 'd_d__n_he3', 'd_d__p_t', 'n_he3__p_t', 'p_t__he4', 'd_t__n_he4',
+             'd_he3__p_he4', 'he4_t__li7', 'he4_he3__be7', 'n_be7__p_li7', 'p_li7__he4_he4')
+
+
+def main(nsamples=20, processes=(1,)):
+    uncertainties = RateUncertainties({name: 0.1 for name in reactions})
+    print(f'{"processes":>10} {"samples/s":>10} {"s/sample":>10}')
+    for n in processes:
+        with tempfile.TemporaryDirectory() as directory:
+            monte_carlo(uncertainties, 1, os.path.join(directory, 'warm'), processes=1)
+            start = time.perf_counter()
+            result = monte_carlo(uncertainties, nsamples, os.path.join(directory, 'mc'), processes=n)
+            elapsed = time.perf_counter() - start
+        print(f'{n:>10} {nsamples/elapsed:10.2f} {elapsed/nsamples:10.2f}')
+    print(result.report()['observables']['H2/H'])
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]), processes=tuple(map(int, sys.argv[2:])) or (1,))
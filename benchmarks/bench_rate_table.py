@@ -0,0 +1,114 @@
+"""Exact against tabulated rates in a BBN run of a generated network.
+
+The network is integrated with Radau along an approximate radiation dominated
+background, T9 = 10.4/sqrt(t/s) and rho_b = 2.05e-5 T9**3 g/cm^3 (eta = 6.1e-10),
+from T9 = 10 to t = 5e4 s, once with the rates evaluated from the ReacLib fits
+and once interpolated in a RateTable.  Then the full default run of
+fastbbn.run_bbn is timed with the exact rates and with rate_table_rtol, with
+the largest relative difference of the observables:
+
+    python benchmarks/bench_rate_table.py [network] [rtol of the table]
+"""
+
+import importlib
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import integrate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from APODORA.networks import SparseNetwork
+from fastbbn import run_bbn
+
+keys = ('Yp', 'H2/H', '(H3+He3)/H', '(Li7+Be7)/H')
+
+
+def T_of_t(t):
+    return 10.4e9/np.sqrt(t)
+
+
+def rho_of_t(t):
+    return 2.05e-5*(T_of_t(t)/1e9)**3
+
+
+def initial_state(network, T):
+    Y = np.zeros(network.nnuc)
+    Xn = 1/(np.exp(1.293/(T/1.1604518e10)) + 1)
+    Y[network.module.jn] = Xn
+    Y[network.module.jp] = 1 - Xn
+    return Y
+
+
+def run(network, t_span, Y0):
+    rhs = lambda t, Y: network.rhs(t, Y, rho_of_t(t), T_of_t(t))
+    jac = lambda t, Y: network.jacobian(t, Y, rho_of_t(t), T_of_t(t))
+
+    # compile outside of the timing
+    rhs(t_span[0], Y0), jac(t_span[0], Y0)
+
+    start = time.perf_counter()
+    solution = integrate.solve_ivp(rhs, t_span, Y0, method='Radau', rtol=1e-6, atol=1e-20,
+                                     jac=jac, first_step=1e-8)
+    return solution, time.perf_counter() - start
+
+
+def time_rates(network, T, repeat=20000):
+    network.rates_eq(T[0])
+    start = time.perf_counter()
+    for i in range(repeat):
+        network.rates_eq(T[i % len(T)])
+    return (time.perf_counter() - start)/repeat
+
+
+def full_run(rtol, repeat=3):
+    # the fastest of repeat default runs with exact and tabulated rates
+    results = {}
+    for table_rtol in (None, rtol):
+        run_bbn(rate_table_rtol=table_rtol)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            values = run_bbn(rate_table_rtol=table_rtol).observables()
+            times.append(time.perf_counter() - start)
+        results[table_rtol] = values, min(times)
+    difference = max(abs(results[rtol][0][key]/results[None][0][key] - 1) for key in keys)
+    print(f'run_bbn: exact rates {results[None][1]:.2f} s, tabulated {results[rtol][1]:.2f} s, '
+          f'largest relative difference of the observables {difference:.1e}')
+
+
+def main(name='full_size_net', rtol=1e-6):
+    module = importlib.import_module(name)
+    exact = SparseNetwork(module)
+
+    start = time.perf_counter()
+    tabulated = SparseNetwork(module).tabulate_rates(rtol=rtol)
+    build = time.perf_counter() - start
+    table = tabulated.rate_table
+    print(f'{name}: {exact.nrates} rates on {table.table.shape[0]} points, '
+          f'{len(table.exact)} evaluated exactly, built in {build:.2f} s')
+
+    T = np.geomspace(3e7, 2.7e10, 1000)
+    for label, network in (('exact', exact), ('tabulated', tabulated)):
+        print(f'rates({label}): {1e6*time_rates(network, T):.2f} us per call')
+
+    t_span = (1.0815, 5e4)
+    Y0 = initial_state(exact, T_of_t(t_span[0]))
+    results = {}
+    for label, network in (('exact', exact), ('tabulated', tabulated)):
+        solution, wall = run(network, t_span, Y0)
+        results[label] = solution.y[:, -1]
+        print(f'{label:>10}: {wall:7.2f} s, {solution.nfev} rhs and {solution.njev} jacobian calls')
+
+    print(f'{"nucleus":>8} {"exact":>12} {"tabulated":>12} {"rel. diff":>10}')
+    for j, nucleus in enumerate(exact.names):
+        a, b = results['exact'][j], results['tabulated'][j]
+        if a > 1e-15:
+            print(f'{nucleus:>8} {a:12.5e} {b:12.5e} {abs(b - a)/a:10.2e}')
+
+    full_run(rtol)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2], *map(float, sys.argv[2:3]))
@@ -0,0 +1,83 @@
+"""Speed against accuracy of run_bbn with the reactions pruned by FluxPruning.
+
+For every threshold the default stages of fastbbn.run_bbn are run `repeat`
+times with prune=threshold, and the fastest run is reported with the mean
+number of active reactions of every stage and the relative errors in Yp, D/H
+and Li7/H (after the decay of Be7) against the unpruned run.  The wall time
+on one core is dominated by the solver, so the time of rhs and jacobian of
+full_size_net is also given, evaluated along the unpruned solution after
+50 s with the reactions the pruning keeps there, updates included.
+
+    python benchmarks/bench_reduction.py [repeat]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import full_size_net
+from APODORA.background import Background, TMeV2T9
+from APODORA.networks import FluxPruning, sparse_network
+from APODORA.nuclear import masses
+from fastbbn import run_bbn
+
+thresholds = (None, 1e-12, 1e-9, 1e-6, 1e-4)
+observables = {'Yp': 'Yp', 'D/H': 'H2/H', 'Li7/H': '(Li7+Be7)/H'}
+
+
+def fastest(prune, repeat):
+    run_bbn(prune=prune)
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run_bbn(prune=prune)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def kernel_time(result, prune, rho):
+    '''mean time in us of rates, rhs and jacobian of full_size_net over the
+    states of result after 50 s, pruned with threshold prune, including the
+    updates of the active reactions'''
+    network = sparse_network(full_size_net)
+    states = [(result.t[i], result.T[i]*TMeV2T9*1e9, rho[i], np.ascontiguousarray(result.Y[:, i]))
+              for i in np.flatnonzero(result.t > 50)]
+    pruning = None if prune is None else FluxPruning(network, prune)
+    start = time.perf_counter()
+    for t, T, rho_i, Y in states:
+        if pruning is None:
+            R = network.rates_eq(T)
+            network.rhs_rates_eq(Y, rho_i, R)
+            network.jacobian_rates_eq(Y, rho_i, R)
+        else:
+            pruning.update(t, Y, rho_i, T)
+            R = pruning.rates(T)
+            pruning.rhs_rates_eq(Y, rho_i, R)
+            pruning.jacobian_rates_eq(Y, rho_i, R)
+    return 1e6*(time.perf_counter() - start)/len(states)
+
+
+def main(repeat=3):
+    reference = None
+    print(f'{"prune":>7} {"wall [s]":>9} {"steps":>6} {"kernels [us]":>13} {"active per stage":>22} '
+          + ' '.join(f'{name:>8}' for name in observables))
+    for prune in thresholds:
+        wall, result = fastest(prune, repeat)
+        if reference is None:
+            reference = result
+            background = Background(result.eta, result.n_nu, result.T[0])
+            rho = background.rho_b_cgs(result.Y.T, result.a, masses(result.names, result.A))
+        values = result.observables()
+        errors = ' '.join(f'{abs(values[key]/reference.observables()[key] - 1):8.1e}'
+                          for key in observables.values())
+        active = '-' if result.reduction is None else \
+            '/'.join(f'{r["mean active"]:.0f}' for r in result.reduction)
+        kernels = kernel_time(reference, prune, rho)
+        print(f'{str(prune):>7} {wall:9.2f} {len(result.t):6} {kernels:13.1f} {active:>22} {errors}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
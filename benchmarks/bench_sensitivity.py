@@ -0,0 +1,50 @@
+"""Forward sensitivities against finite differences of whole runs.
+
+run_bbn(sensitivities=True) gives d ln(observable)/d ln(rate) of all rates
+of the stages in one run.  It is timed against a plain run, and checked
+against central differences of two runs with the rate multiplied by
+exp(+-eps), for the rates given (by default the weak rates and n_p__d):
+
+    python benchmarks/bench_sensitivity.py [rate ...]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from APODORA.networks import RateOverrides
+from fastbbn import run_bbn
+
+keys = ('Yp', 'H2/H', '(H3+He3)/H', '(Li7+Be7)/H')
+
+
+def timed(**options):
+    start = time.perf_counter()
+    result = run_bbn(**options)
+    return result, time.perf_counter() - start
+
+
+def main(rates=('n__p', 'p__n', 'n_p__d'), eps=1e-3, rtol=1e-9):
+    run_bbn(sensitivities=True)
+    plain, t_plain = timed()
+    result, t_sensitivities = timed(sensitivities=True)
+    print(f'plain run {t_plain:.2f} s, with the sensitivities of {len(result.rate_names)} rates '
+          f'{t_sensitivities:.2f} s, by finite differences {2*len(result.rate_names)*t_plain:.0f} s')
+
+    result = run_bbn(sensitivities=True, rtol=rtol, atol=1e-90)
+    forward = result.observable_sensitivities()
+    print(f'{"rate":>14} ' + ' '.join(f'{key:>24}' for key in keys))
+    for rate in rates:
+        up, down = (run_bbn(overrides=RateOverrides({rate: np.exp(sign*eps)}), rtol=rtol,
+                            atol=1e-90).observables() for sign in (1, -1))
+        k = result.rate_names.index(rate)
+        print(f'{rate:>14} ' + ' '.join(
+            f'{forward[key][k]:11.6f}/{(np.log(up[key]) - np.log(down[key]))/(2*eps):11.6f}'
+            for key in keys))
+
+
+if __name__ == '__main__':
+    main(*([tuple(sys.argv[1:])] if len(sys.argv) > 1 else []))
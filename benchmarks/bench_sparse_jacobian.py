@@ -0,0 +1,61 @@
+"""The dense jacobian against the csr_matrix of sparse_jacobian in run_bbn.
+
+With sparse_jacobian Radau gets the jacobian on the fixed pattern of
+SparseNetwork.csr_pattern and factorizes it by sparse LU (splu) instead of
+dense LU.  The default run is timed both ways with the largest relative
+difference of the observables, and for every network the jacobian and its
+factorization, as Radau does it every step, at the start of BBN (T9=1):
+
+    python benchmarks/bench_sparse_jacobian.py [network ...]
+"""
+
+import importlib
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import linalg
+from scipy.sparse import identity
+from scipy.sparse.linalg import splu
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from APODORA.networks import sparse_network
+from fastbbn import run_bbn
+
+keys = ('Yp', 'H2/H', '(H3+He3)/H', '(Li7+Be7)/H')
+
+
+def best(function, repeat=200):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(networks=('np_net', 'bbn_test_integrate', 'full_size_net')):
+    results = {}
+    for sparse in (False, True):
+        run_bbn(sparse_jacobian=sparse)
+        start = time.perf_counter()
+        results[sparse] = run_bbn(sparse_jacobian=sparse).observables(), time.perf_counter() - start
+    difference = max(abs(results[True][0][key]/results[False][0][key] - 1) for key in keys)
+    print(f'run_bbn: dense {results[False][1]:.2f} s, sparse {results[True][1]:.2f} s, '
+          f'largest relative difference {difference:.1e}')
+
+    print(f'{"network":>20} {"nnuc":>5} {"nnz":>5} {"dense [us]":>11} {"sparse [us]":>12}')
+    for name in networks:
+        net = sparse_network(importlib.import_module(name))
+        Y = np.full(net.nnuc, 1e-10)
+        Y[:2] = 0.1, 0.75
+        T, rho, h = 1e9, 1e-5, 1e-3
+        dense = lambda: linalg.lu_factor(np.eye(net.nnuc) - h*net.jacobian(0.0, Y, rho, T))
+        csr = lambda: splu((identity(net.nnuc, format='csc') - h*net.jacobian_csr(0.0, Y, rho, T)).tocsc())
+        dense(), csr()
+        print(f'{name:>20} {net.nnuc:5} {net.nnz:5} {1e6*best(dense):11.1f} {1e6*best(csr):12.1f}')
+
+
+if __name__ == '__main__':
+    main(*([tuple(sys.argv[1:])] if len(sys.argv) > 1 else []))
@@ -0,0 +1,79 @@
+"""Wall time and accuracy of the network stages of fastbbn.run_bbn.
+
+Every schedule of stages is run `repeat` times and the fastest run is
+reported, together with the largest relative deviation from the reference
+schedule (bbn_test_integrate up to 1 s, then full_size_net, as fastbbn.py did
+before the stages) of the observables and of the final abundances above
+1e-30.  The default stages have to match the reference to 1e-6 in the
+observables and to 1e-3 in the final abundances.
+
+    python benchmarks/bench_staging.py [repeat]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from APODORA.background import TMeV2T9
+from fastbbn import Stage, default_stages, run_bbn
+
+reference = (Stage('bbn_test_integrate', t_end=1.0), Stage('full_size_net'))
+
+schedules = {
+    'reference': reference,
+    'default': default_stages,
+    'n/p to T9=20': (Stage('np_net', T_end=20/TMeV2T9), Stage('bbn_test_integrate', t_end=1.0),
+                     Stage('full_size_net')),
+    'Li8 > 1e-60': (Stage('bbn_test_integrate', Y_end=1e-60), Stage('full_size_net')),
+    'Li8 > 1e-40': (Stage('bbn_test_integrate', Y_end=1e-40), Stage('full_size_net')),
+    'T9 < 2': (Stage('bbn_test_integrate', T_end=2/TMeV2T9), Stage('full_size_net')),
+    'small only': (Stage('bbn_test_integrate'),),
+}
+
+#tolerances of the default stages against the reference
+observables_rtol = 1e-6
+abundances_rtol = 1e-3
+
+
+def fastest(stages, repeat):
+    '''fastest of repeat runs with stages, and its result'''
+    run_bbn(stages=stages)
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run_bbn(stages=stages)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def deviations(result, reference):
+    '''largest relative deviations of the observables and of the final
+    abundances above 1e-30 from those of reference'''
+    observables = np.array(list(result.observables().values()))
+    expected = np.array(list(reference.observables().values()))
+    names = [name for name, Y in zip(reference.names, reference.final) if Y > 1e-30 and name in result.names]
+    Y = np.array([result.final[result.names.index(name)] for name in names])
+    Y_expected = np.array([reference.final[reference.names.index(name)] for name in names])
+    return np.max(np.abs(observables/expected - 1)), np.max(np.abs(Y/Y_expected - 1))
+
+
+def main(repeat=3):
+    print(f'{"stages":>14} {"wall [s]":>9} {"steps":>6} {"observables":>12} {"abundances":>11}  switches [s]')
+    results = {}
+    for name, stages in schedules.items():
+        wall, result = fastest(stages, repeat)
+        results[name] = result
+        observables, abundances = deviations(result, results['reference'])
+        switches = ', '.join(f'{t:.3g}' for _, t in result.stages[1:])
+        print(f'{name:>14} {wall:9.2f} {len(result.t):6} {observables:12.1e} {abundances:11.1e}  {switches}')
+
+    observables, abundances = deviations(results['default'], results['reference'])
+    assert observables < observables_rtol, 'the default stages change the observables'
+    assert abundances < abundances_rtol, 'the default stages change the final abundances'
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,74 @@
+"""Time to the first result of a fresh process, without and with the caches.
+
+Every case runs in a new process with empty numba and APODORA caches (cold),
+then in new processes reusing the caches the first one wrote (warm), which is
+what a process started later, e.g. by multiprocessing, pays.  The background
+solutions cached by the user are copied in, so only the compilation is
+timed.  The cases are the first rates, rhs and jacobian of the SparseNetworks
+of np_net, bbn2_test_integrate and full_size_net, and a complete run_bbn:
+
+    python benchmarks/bench_startup.py [repeat] [--module]
+
+The functions of the generated modules take jitclasses and are compiled
+again by every process, see APODORA/networks/cache.py.  --module adds the
+first rhs and jacobian of bbn2_test_integrate from its module; they take
+minutes for full_size_net.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, root)
+from APODORA.background import cache_directory
+
+cases = {
+    'sparse np_net': 'warm_up(["np_net"])',
+    'sparse bbn2_test_integrate': 'warm_up(["bbn2_test_integrate"])',
+    'sparse full_size_net': 'warm_up(["full_size_net"])',
+    'run_bbn': 'import fastbbn; fastbbn.run_bbn()',
+}
+module = ('import numpy as np, bbn2_test_integrate as net; Y = np.full(net.nnuc, 1e-10); '
+          'net.rhs(0.0, Y, 1e-5, 1e9); net.jacobian(0.0, Y, 1e-5, 1e9)')
+setup = 'from APODORA.networks.cache import warm_up; '
+
+
+def run(code, caches):
+    '''wall time of a new python process running code with the caches in the
+    directory caches'''
+    environment = dict(os.environ, PYTHONPATH=root, MPLBACKEND='Agg',
+                       NUMBA_CACHE_DIR=os.path.join(caches, 'numba'),
+                       APODORA_CACHE=os.path.join(caches, 'APODORA'))
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', setup + code], env=environment, cwd=root, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def startup(code, repeat):
+    '''wall time of code in a process with empty caches and the fastest of
+    repeat processes with the caches it left'''
+    with tempfile.TemporaryDirectory() as caches:
+        background = os.path.join(cache_directory(), 'background')
+        if os.path.isdir(background):
+            shutil.copytree(background, os.path.join(caches, 'APODORA', 'background'))
+        cold = run(code, caches)
+        warm = min(run(code, caches) for _ in range(repeat))
+    return cold, warm
+
+
+def main(repeat=3, with_module=False):
+    selected = dict(cases, module=module) if with_module else cases
+    print(f'{"case":>28} {"cold [s]":>9} {"warm [s]":>9}')
+    for name, code in selected.items():
+        cold, warm = startup(code, repeat)
+        print(f'{name:>28} {cold:9.2f} {warm:9.2f}')
+
+
+if __name__ == '__main__':
+    arguments = [a for a in sys.argv[1:] if a != '--module']
+    main(*map(int, arguments[:1]), with_module='--module' in sys.argv)
@@ -0,0 +1,256 @@
+"""Networks, backends, solvers and tolerances on one standard BBN run.
+
+Every case is a network with one backend of its rhs and jacobian: 'module'
+uses the functions of the generated module, 'sparse' its SparseNetwork, 'c'
+its C kernels (see APODORA/networks/c_kernel.py) and 'aot' one of the
+compiled AoT builds, which are taken with the nuclides of the network they
+were compiled from.  Each case integrates the standard run
+(eta=6.1e-10, 3.046 neutrinos, the neutron lifetime of the rates, from
+equilibrium at T9=10 up to 1e5 s on the cached background) with Radau, BDF
+and LSODA at every rtol.  The background starts at T9=27, where the larger
+networks fail without the stages of fastbbn.run_bbn.  The fastest of
+`repeat` runs is reported with its steps, calls and time of the rhs and
+jacobian (see APODORA.profiling), and the largest relative deviations of the
+observables and of the final abundances above 1e-30 from a Radau run of the
+network at rtol=1e-10.  The first call of the functions of a module compiles
+them, which takes minutes for the networks of 26 nuclides.
+
+The results are written as JSON and CSV.  With --baseline, the results of an
+earlier run, the suite fails if a case that succeeded there fails, if its
+deviations grew by more than deviation_factor, its rhs and jacobian calls
+by more than calls_factor or its wall time by more than time_factor, or if
+a reference changed by more than reference_rtol:
+
+    python benchmarks/bench_suite.py --output suite.json
+    python benchmarks/bench_suite.py --baseline suite.json --output new.json
+"""
+
+import argparse
+import csv
+import importlib
+import json
+import os
+import platform
+import sys
+import time
+
+import numba
+import numpy as np
+import scipy
+from scipy import optimize
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from APODORA.background import Background, TMeV2T9, background_eq, cached_background, timeunit
+from APODORA.equilibrium import equilibrium_initial_state
+from APODORA.networks import c_kernel, sparse_network
+from APODORA.nuclear import masses, observables, thermal_abundances
+from APODORA.profiling import SolverProfile
+
+#(network, backend) of every case, and the networks the AoT builds were
+#compiled from
+cases = (('full_size_net', 'module'), ('full_size_net', 'sparse'), ('full_size_net', 'c'),
+         ('full_AoT_net', 'aot'), ('Newrate_net', 'module'), ('max_3MeV_net', 'module'),
+         ('bbn_test_integrate', 'module'), ('bbn2_test_integrate', 'module'), ('bbn2_test_integrate', 'sparse'),
+         ('bbn2_test_integrate', 'c'), ('AoT_net', 'aot'))
+aot_sources = {'full_AoT_net': 'full_size_net', 'AoT_net': 'bbn2_test_integrate'}
+solvers = ('Radau', 'BDF', 'LSODA')
+rtols = (1e-4, 1e-6, 1e-8)
+
+scenario = {'eta': 6.1e-10, 'n_nu': 3.046, 'T_ini': 27/TMeV2T9, 'T9_start': 10.0, 't_end': 1e5, 'atol': 1e-80}
+reference_rtol_solve = 1e-10
+minimum_abundance = 1e-30
+
+#regression check against a baseline
+deviation_factor = 2.0
+calls_factor = 1.1
+time_factor = 1.3
+reference_rtol = 1e-6
+
+
+def source(network):
+    '''the generated network module with the nuclides of network'''
+    return aot_sources.get(network, network)
+
+
+def backend(network, kind):
+    '''rhs(Y, rho, T) and jacobian(Y, rho, T), T in K, of network'''
+    if kind == 'sparse':
+        net = sparse_network(importlib.import_module(network))
+        return (lambda Y, rho, T: net.rhs_rates_eq(Y, rho, net.rates(T)),
+                lambda Y, rho, T: net.jacobian_rates_eq(Y, rho, net.rates(T)))
+    if kind == 'c':
+        net = c_kernel.load(importlib.import_module(network))
+        return (lambda Y, rho, T: net.rhs(0.0, Y, rho, T),
+                lambda Y, rho, T: net.jacobian(0.0, Y, rho, T))
+    module = importlib.import_module(network)
+    return (lambda Y, rho, T: module.rhs(0.0, Y, rho, T),
+            lambda Y, rho, T: module.jacobian(0.0, Y, rho, T))
+
+
+def run(network, kind, solver, rtol, profile):
+    '''the standard run of network with backend kind and solver at rtol,
+    recorded in profile.  Returns the solution and the names of the nuclides'''
+    net = sparse_network(importlib.import_module(source(network)))
+    rhs, jacobian = backend(network, kind)
+    background = Background(scenario['eta'], scenario['n_nu'], scenario['T_ini'])
+    arrays = cached_background(scenario['n_nu'], scenario['T_ini'], t_end=2*scenario['t_end']).arrays()
+    m_nucs = masses(net.names, net.A)
+    #the background starts at T_ini, the network at T9_start
+    T_start = scenario['T9_start']/TMeV2T9
+    t_start = np.exp(optimize.brentq(lambda lnt: background_eq(np.exp(lnt), *arrays)[0] - T_start,
+                                     np.log(background.t_ini/timeunit), np.log(scenario['t_end'])))
+
+    def state(t, Y):
+        T, a = background_eq(t_start + t/timeunit, *arrays)
+        return T*TMeV2T9*1e9, background.rho_b_cgs(Y, a, m_nucs)
+
+    def ndall(t, Y):
+        T, rho = state(t, Y)
+        return rhs(Y, rho, T)/timeunit
+
+    def jac(t, Y):
+        T, rho = state(t, Y)
+        return jacobian(Y, rho, T)/timeunit
+
+    T, a = background_eq(t_start, *arrays)
+    Y = thermal_abundances(net.names, net.A, net.Z, T, background.eta_ini)
+    Y = equilibrium_initial_state(net, T*TMeV2T9*1e9, background.rho_b_cgs(Y, a, m_nucs), Y, fixed=())
+    solution = profile.solve_ivp(ndall, [0, (scenario['t_end'] - t_start)*timeunit], Y, method=solver,
+                                 jac=jac, temperature=lambda t, y: state(t, y)[0]/(TMeV2T9*1e9),
+                                 stage=f'{network}/{kind}/{solver}/{rtol:g}', rtol=rtol,
+                                 atol=scenario['atol'])
+    return solution, net.names
+
+
+def reference(network):
+    '''final abundances and observables of network at rtol=1e-10 with Radau'''
+    solution, names = run(network, 'module', 'Radau', reference_rtol_solve, SolverProfile())
+    if not solution.success:
+        raise RuntimeError(f'the reference of {network} failed: {solution.message}')
+    final = solution.y[:, -1]
+    return {'names': list(names), 'final': final.tolist(),
+            'observables': {key: float(value) for key, value in observables(names, final).items()}}
+
+
+def deviations(names, final, expected):
+    '''largest relative deviations of the observables and of the final
+    abundances above minimum_abundance from the reference expected'''
+    values = observables(names, final)
+    observable = max(abs(values[key]/value - 1) for key, value in expected['observables'].items())
+    Y_ref = np.array(expected['final'])
+    resolved = Y_ref > minimum_abundance
+    return float(observable), float(np.max(np.abs(final[resolved]/Y_ref[resolved] - 1)))
+
+
+def benchmark(network, kind, solver, rtol, expected, repeat):
+    '''the record of the fastest of repeat runs'''
+    best = None
+    for _ in range(repeat):
+        profile = SolverProfile()
+        start = time.perf_counter()
+        solution, names = run(network, kind, solver, rtol, profile)
+        wall = time.perf_counter() - start
+        if best is None or wall < best[0]:
+            best = wall, solution, names, profile
+    wall, solution, names, profile = best
+    stage, = profile.report()['stages'].values()
+    calls = profile.report()['calls']
+    record = {'network': network, 'backend': kind, 'solver': solver, 'rtol': rtol,
+              'success': bool(solution.success), 'message': solution.message, 'wall time': wall,
+              'steps': stage['steps'], 'rejected': stage['rejected'], 'nfev': stage['nfev'],
+              'njev': stage['njev'], 'nlu': stage['nlu'],
+              'rhs calls': calls['rhs']['calls'], 'rhs time': calls['rhs']['time'],
+              'jacobian calls': calls.get('jacobian', {}).get('calls', 0),
+              'jacobian time': calls.get('jacobian', {}).get('time', 0.0),
+              'observables deviation': None, 'abundances deviation': None}
+    if solution.success:
+        record['observables deviation'], record['abundances deviation'] = \
+            deviations(names, solution.y[:, -1], expected)
+    return record
+
+
+def regressions(results, baseline):
+    '''the regressions of results against the results baseline, as messages'''
+    messages = []
+    for network, expected in results['references'].items():
+        old = baseline['references'].get(network)
+        if old is not None and old['names'] == expected['names']:
+            changed = max(abs(value/old['observables'][key] - 1) for key, value in expected['observables'].items())
+            if changed > reference_rtol:
+                messages.append(f'the reference of {network} changed by {changed:.1e}')
+    key = lambda r: (r['network'], r['backend'], r['solver'], r['rtol'])
+    old_records = {key(record): record for record in baseline['results']}
+    for record in results['results']:
+        old = old_records.get(key(record))
+        if old is None or not old['success']:
+            continue
+        case = '{} {} {} rtol={:g}'.format(*key(record))
+        if not record['success']:
+            messages.append(f'{case} failed: {record["message"]}')
+            continue
+        for name in ('observables deviation', 'abundances deviation'):
+            if record[name] > deviation_factor*old[name] + 1e-14:
+                messages.append(f'{case}: {name} {record[name]:.2e} > {old[name]:.2e}')
+        calls, old_calls = (r['rhs calls'] + r['jacobian calls'] for r in (record, old))
+        if calls > calls_factor*old_calls:
+            messages.append(f'{case}: {calls} calls > {old_calls}')
+        if record['wall time'] > time_factor*old['wall time']:
+            messages.append(f'{case}: {record["wall time"]:.2f} s > {old["wall time"]:.2f} s')
+    return messages
+
+
+def write(results, filename):
+    '''results as JSON to filename and the records as CSV next to it'''
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=1)
+    with open(os.path.splitext(filename)[0] + '.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results['results'][0]))
+        writer.writeheader()
+        writer.writerows(results['results'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--networks', nargs='+', help='only the cases of these networks')
+    parser.add_argument('--solvers', nargs='+', default=solvers)
+    parser.add_argument('--rtols', nargs='+', type=float, default=rtols)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', default='bench_suite.json', help='JSON file, the CSV is written next to it')
+    parser.add_argument('--baseline', help='JSON file of an earlier run to check against')
+    args = parser.parse_args()
+
+    selected = [case for case in cases if args.networks is None or case[0] in args.networks]
+    results = {'scenario': dict(scenario, reference_rtol=reference_rtol_solve),
+               'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                               'scipy': scipy.__version__, 'numba': numba.__version__,
+                               'machine': platform.machine(), 'cpus': os.cpu_count()},
+               'references': {}, 'results': []}
+    print(f'{"network":>20} {"backend":>7} {"solver":>6} {"rtol":>6} {"wall [s]":>9} {"steps":>6} '
+          f'{"rhs":>6} {"jac":>5} {"observables":>12} {"abundances":>11}')
+    for network, kind in selected:
+        name = source(network)
+        if name not in results['references']:
+            results['references'][name] = reference(name)
+        for solver in args.solvers:
+            for rtol in args.rtols:
+                record = benchmark(network, kind, solver, rtol, results['references'][name], args.repeat)
+                results['results'].append(record)
+                if record['success']:
+                    print(f'{network:>20} {kind:>7} {solver:>6} {rtol:6.0e} {record["wall time"]:9.2f} '
+                          f'{record["steps"]:6} {record["rhs calls"]:6} {record["jacobian calls"]:5} '
+                          f'{record["observables deviation"]:12.1e} {record["abundances deviation"]:11.1e}')
+                else:
+                    print(f'{network:>20} {kind:>7} {solver:>6} {rtol:6.0e} failed: {record["message"]}')
+    write(results, args.output)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            messages = regressions(results, json.load(f))
+        for message in messages:
+            print('regression:', message)
+        if messages:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""The weak n <-> p rates of weak_rates.py against the loops they replaced.
+
+The custom rates of the networks used to build lists of the 14 and 11
+coefficients of the fits and sum a power of z with the exponential for every
+term.  The loops are compiled here as they were and timed against the
+kernels of weak_rates.py, one temperature at a time and for an array, with
+the largest relative difference, and against the interpolation of a
+WeakRateTable.  The C kernels of np_net are built (see
+APODORA/networks/c_kernel.py) and their rates have to agree with those of
+the kernels bit for bit.  run_bbn with the table of the fit handed to the
+networks by RateOverrides.from_weak_table is compared with the fit:
+
+    python benchmarks/bench_weak_rates.py [number of temperatures]
+"""
+
+import importlib
+import os
+import sys
+import time
+
+import numba
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from APODORA.networks import RateOverrides, c_kernel, sparse_network
+from APODORA.networks.weak_rates import (WeakRateTable, n__p_coefficients, n__p_rate, p__n_coefficients,
+                                         p__n_rate, qnp, qpn, weak_rates)
+from fastbbn import run_bbn
+
+keys = ('Yp', 'H2/H', '(H3+He3)/H', '(Li7+Be7)/H')
+
+a0, a1, a2, a3, a4, a5, a6, a7, a8, a9, a10, a11, a12, a13 = n__p_coefficients
+b0, b1, b2, b3, b4, b5, b6, b7, b8, b9, b10 = p__n_coefficients
+
+
+@numba.njit
+def loop_n__p(T9):
+    z = 5.92989658/T9
+    rate = 0
+    a = [a0, a1, a2, a3, a4, a5, a6, a7, a8, a9, a10, a11, a12, a13]
+    for i in range(14):
+        rate += 1/880.2*np.exp(-qnp/z)*a[i]*z**-i
+    return rate
+
+
+@numba.njit
+def loop_p__n(T9):
+    rate = 0
+    if T9 > 1.160451812:
+        b = [b0, b1, b2, b3, b4, b5, b6, b7, b8, b9, b10]
+        z = 5.92989658/T9
+        for i in range(11):
+            rate += 1/880.2*np.exp(-qpn*z)*b[i]*z**-i
+    return rate
+
+
+@numba.njit
+def scalar_loop(n__p, p__n, T9):
+    total = 0.0
+    for T in T9:
+        total += n__p(T) + p__n(T)
+    return total
+
+
+def best(function, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def check_c_kernel(T9):
+    # the rates of the C kernels of np_net, n__p and p__n only, against the
+    # SparseNetwork
+    net = sparse_network(importlib.import_module('np_net'))
+    filename = c_kernel.load('np_net').filename
+    extension = sys.modules['_apodora_c.' + os.path.basename(filename).split('.')[0]]
+    for T in T9:
+        if not np.array_equal(extension.rates(T*1e9), net.rates(T*1e9)):
+            raise AssertionError(f'the C kernels of np_net differ at T9={T}')
+    print(f'C kernels of np_net agree at {len(T9)} temperatures')
+
+
+def main(n=100000):
+    T9 = np.geomspace(1e-3, 30.0, n)
+    old = np.array([[loop_n__p(T), loop_p__n(T)] for T in T9]).T
+    new = np.array(weak_rates(T9))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        difference = np.nanmax(np.abs(new/old - 1), axis=1)
+    print(f'largest relative difference: n__p {difference[0]:.1e}, p__n {difference[1]:.1e}')
+    check_c_kernel(T9[::max(1, n//1000)])
+
+    scalar_loop(loop_n__p, loop_p__n, T9[:2]), scalar_loop(n__p_rate, p__n_rate, T9[:2])
+    table = WeakRateTable()
+    print(f'{"":>20} {"ns per T9":>10}')
+    for name, function in (('loops', lambda: scalar_loop(loop_n__p, loop_p__n, T9)),
+                           ('Horner', lambda: scalar_loop(n__p_rate, p__n_rate, T9)),
+                           ('Horner, array', lambda: weak_rates(T9))):
+        print(f'{name:>20} {1e9*best(function)/n:10.1f}')
+    lnT9 = np.log(T9[:n//100])
+    interpolation = best(lambda: [table.interpolate_log(x) for x in lnT9])
+    print(f'{"table, python call":>20} {1e9*interpolation/len(lnT9):10.1f}')
+    print(f'table of {table.table.shape[0]} points, error of n__p {table.error[0]:.1e}')
+
+    fit = run_bbn().observables()
+    tabulated = run_bbn(overrides=RateOverrides.from_weak_table(table)).observables()
+    difference = max(abs(tabulated[key]/fit[key] - 1) for key in keys)
+    print(f'run_bbn with the table: largest relative difference of the observables {difference:.1e}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
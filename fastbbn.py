@@ -1,360 +1,535 @@
-import numpy as np
-import scipy.linalg as la
-from scipy import special
-from scipy import integrate
-import matplotlib.pyplot as plt
-import AoT_net as bbn_n
-nNucs=bbn_n.nnuc()
-import full_AoT_net as bbn_full
-fnNucs=bbn_full.nnuc()
-
-
-#Background
-#Special functions og deres afledte
-def L(z):
-    return special.kn(2,z)/z
-
-def M(z):
-    return (3/4*special.kn(3,z)+1/4*special.kn(1,z))/z
-
-def dMdz(z):
-    return -3/z**2*special.kn(3,z) -special.kn(2,z)/z
-
-def N(z):
-    return (1/2*special.kn(4,z)+1/2*special.kn(2,z))/z
-
-
-timeunit =1.519*10**21  #MeV/hbar in unit of 1/second 
-
-n_life=879.6*timeunit   #Neutron lifetime in units of MeV/hbar
-Q=1.293                 #neutron proton mass difference in MeV
-M_u=931.494102          #atomic mass unit in MeV
-SBC=np.pi**2/60         #Stefan-Boltzmann constant in natural units
-G=6.709e-45             #gravatational constant in units of c=hbar=MeV=1
-#infapprox=1e3           #large number acting as upper limit on itegrals
-n_nu=3.046              #number of neutrino families with correction from 
-                        #Nollett and Steigman, BBN and the CMB constrain neutrino coupled light WIMPs, 2015
-
-TMeV2T9=11.60451812 #conversion factor from MeV to 10^9K
-cm3s=1.167*10**-11  #conversion factor for cm^3/s
-gcm3=232012         #conversion factor for g/cm^3
-meter=5.068e12      #conversion factor for m
-cm=5.068e10         #conversion factor for cm
-barn=389.4          #conversion factor for barn
-e_mass=0.51099895   #electron mass in MeV
-
-
-def rho_e(T): #electron/positron density, chemical potential assumed to be 0 so cosh(phi*n)=1
-    z=e_mass/T
-    return 2/np.pi**2*e_mass**4*np.sum([(-1)**(n+1)*M(n*z) for n in range(1,10)])
-
-def drho_e(T): #derivative of rho_e with respect to temperature
-    z=e_mass/T
-    return 2/np.pi**2*e_mass**4*np.sum([(-1)**(n)*n*z/T*dMdz(n*z) for n in range(1,10)])
-
-def P_e(T): #electron/positron pressure
-    z=e_mass/T
-    return 2/np.pi**2*e_mass**4*np.sum([(-1)**(n+1)/(n*z)*L(n*z) for n in range(1,10)])  
-
-def rho_gamma(T):   #photon energy density
-    return (np.pi**2)/15*T**4 
-
-def drho_gamma(T):  #derivative
-    return 4*(np.pi**2)/15*T**3 
-
-def P_gamma(T):     #photon pressure
-    return rho_gamma(T)/3
-
-
-
-### Initial conditions ###
-
-T_ini=27/TMeV2T9            #initial temperature in MeV
-
-t_ini=1.226*10**21/T_ini**2 #initial time in hbar/MeV
-t_cut=1*timeunit            #time at which full reaction network is added
-
-z_ini=e_mass/T_ini
+"""BBN for a single cosmology with the networks generated by pynucastro.
 
-n_gamma_ini= 1.20206*2/np.pi**2*T_ini**3    #initial number density of photons based on theory
-n_gamma_ini= rho_gamma(T_ini)/(2.701*T_ini) #initial number density of photons based mean photon energy
+The abundances start in thermal equilibrium at T_ini, brought into
+equilibrium with the network by equilibrium_initial_state, and are integrated
+with Radau together with the temperature and scale factor of the background.
+The run goes through a sequence of Stages, networks of growing size that are
+switched when the temperature or the abundance of the heaviest nuclide
+crosses a threshold, so the full network is only integrated once it matters.
 
-eta=6.1e-10     #CMB baryon-to-photon ratio
-eta_ini=eta*(1+(rho_e(T_ini)+P_e(T_ini))/(rho_gamma(T_ini)+P_gamma(T_ini))) #entropi bevarelse
+    from fastbbn import run_bbn
+    result = run_bbn(eta=6.1e-10)
+    print(result.observables())
+    result.plot()
 
-rho_nu_ini=n_nu*7/8*(np.pi**2)/15*T_ini**4 #initial neutrino density
+Running the file computes the default cosmology, saves the abundances to
+abundance.png and prints the final abundances.
+"""
 
-rho_b_ini=M_u*eta_ini*n_gamma_ini    #initial baryon density
+import importlib
 
-rho_tot_ini=rho_e(T_ini)+rho_gamma(T_ini)+rho_nu_ini#+rho_b_ini  #initial total energy density
-
-H_ini=np.sqrt(8*np.pi/3*G*rho_tot_ini)
-
-def rho_nu(T,a): #neutrino energy density
-    #return 7/8*np.pi**2/15*T**4
-    return rho_nu_ini/a**4
-
-def rho_b(a):
-    return rho_b_ini/a**3
-
-
-### Solving the background ###
-
-def rho_tot(T,a): #total density
-    return rho_e(T)+rho_gamma(T)+rho_nu(T,a)#+rho_b(a)
-
-def rho_set(T,a): #total density of non-decoupled components
-    return rho_e(T)+rho_gamma(T)#+rho_b(a)
-
-def H(T,a):   #Hubble parameter as given by Friedmann eq, ignoring cosmological constant
-    return np.sqrt(8*np.pi/3*G*rho_tot(T,a))
-
-#Derivative from Kavano D.18
-def dTdt(t,T,a):
-    return -3*H(T,a)/((drho_e(T)+drho_gamma(T))/(rho_set(T,a) + P_e(T)+P_gamma(T)))
-
-#Derivative from how H is defined
-def dadt(t,T,a):
-    return a*H(T,a)
-
-
-t_range=[t_ini,5e4*timeunit]            #time range for integration
-#t_space=np.linspace(*t_range,1000)      #time range for approximate temperature
-
-#combining derivatives
-def dbackground(t,y):   #solve h and T, y[0] = T, y[1] = a
-    return [dTdt(t,*y),dadt(t,*y)]
-
-n_bparams=2
-
-
-#Setup isotopes based on Alterbbn
-Y_labels=['n','p','H2','H3','He3','He4','Li6','Li7','Li8','Be7','Be9','B8','B10','B11','B12','C11','C12','C13','C14','N12','N13','N14','N15','O14','O15','O16']
-Alter_Yl=["n","p","H2","H3","He3","He4","Li6","Li7","Be7","Li8","B8","Be9","B10","B11","C11","B12","C12","N12","C13","N13","C14","N14","O14","N15","O15","O16"]
-A=np.array([1,1,2,3,3,4,6,7,8,7,9,8,10,11,12,11,12,13,14,12,13,14,15,14,15,16])
-Z=sorted([0,1,1,1,2,2,3,3,4,3,5,4,5,5,6,5,6,7,6,7,6,7,8,7,8,8.])
-Alter_A=[1.,1.,2.,3.,3.,4.,6.,7.,7.,8.,8.,9.,10.,11.,11.,12.,12.,12.,13.,13.,14.,14.,14.,15.,15.,16.]
-Alter_Z=[0.,1.,1.,1.,2.,2.,3.,3.,4.,3.,5.,4.,5.,5.,6.,5.,6.,7.,6.,7.,6.,7.,8.,7.,8.,8.]
-Alterspin=[0.5,0.5,1.,0.5,0.5,0.,1.,1.5,1.5,2.,2.,1.5,3.,1.5,1.5,1.,0.,1.,0.5,0.5,0.,1.,0.,0.5,0.5,0.]
-Alter_mass_excess=[8.071388,7.289028,13.135825,14.949915,14.931325,2.424931,14.0864,14.9078,15.7696,20.9464,22.9212,11.34758,12.05086,8.6680,10.6506,13.3690,0.,17.3382,3.125036,5.3455,3.019916,2.863440,8.006521,0.101439,2.8554,-4.737036]
-Alter_mass=[Alter_A[i]*M_u+Alter_mass_excess[i] for i in range(fnNucs)]
-
-def Altersort(L):
-    if type(L)==list:
-        return [x for (a,x) in sorted(zip(zip(A,Z),L), key=lambda pair: pair[0])]
-    else:
-        return np.array([x for (a,x) in sorted(zip(zip(A,Z),L), key=lambda pair: pair[0])])
-#print([label for _, label in sorted(zip(A, Y_labels))])
-
-def PNAsort(L):
-    if type(L)==list:
-        return [x for (a,x) in sorted(zip(zip(Alter_Z,Alter_A),L), key=lambda pair: pair[0])]
-    else:
-        return np.array([x for (a,x) in sorted(zip(zip(Alter_Z,Alter_A),L), key=lambda pair: pair[0])])    
-
-
-#Initial conditions for Y
-
-spin=PNAsort(Alterspin)
-A=np.array(PNAsort(Alter_A))
-m_Nucs = np.array(PNAsort(Alter_mass))
-B=[(m_Nucs[1]*Z[i]+m_Nucs[0]*(A[i]-Z[i]))-m_Nucs[i] for i in range(fnNucs)]
-g = 1+2*np.array(spin)
-
-#Determine baryon density in cgs, for use in network
-def rho_bY_cgs(y):
-    return sum(m_Nucs[:len(y[n_bparams:])]*y[n_bparams:])*eta_ini*n_gamma_ini/y[1]**3*gcm3
-
-#Guess initial conditions from thermal equilibrium
-
-def get_Y_ini(Xn_ini):
-    Y_ini2 = np.zeros(nNucs)+1e-50
-        
-    for iter1 in range(30):
-        Xp_ini = np.exp(Q/T_ini)*Xn_ini
-        Y_ini2[0] = Xn_ini        #Set initial neutron mass fraction
-        Y_ini2[1] = Xp_ini
-        #Set initial proton mass fraction
-        X_sum = Y_ini2[0] + Y_ini2[1]
-        for i in range(2,nNucs):
-            tmp = special.zeta(3)**(A[i] - 1)*np.pi**((1 - A[i])/2)*2**((3*A[i] - 5)/2)*A[i]**(5/2)
-
-            Y_ini2[i] = g[i]*tmp*(T_ini/m_Nucs[0])**(3*(A[i] - 1)/2)*eta_ini**(A[i] - 1)*Xp_ini**Z[i]*Xn_ini**(A[i] - Z[i])*np.exp(B[i]/T_ini)/A[i]
-            X_sum += Y_ini2[i]*A[i]
-        #print(X_sum)
-        Xn_ini += (1 - X_sum)/nNucs
-        
-    return Y_ini2
-Xn_ini = 1/(np.exp(Q/T_ini)+1)
-Y_ini2 = get_Y_ini(Xn_ini)
-
-
-#Refine initial conditions from Jacobian
-AdYdt_ini=lambda Y : Altersort(bbn_n.rhs(t_ini/timeunit, PNAsort(Y) ,rho_bY_cgs([T_ini,1]+list(PNAsort(Y))), T_ini*TMeV2T9*1e9))
-AdYdt_jac=lambda Y : bbn_n.jacobian(t_ini/timeunit, PNAsort(Y) ,rho_bY_cgs([T_ini,1]+list(PNAsort(Y))), T_ini*TMeV2T9*1e9)[:, Altersort(range(nNucs))][Altersort(range(nNucs))]
-
-aY_ini=Altersort(Y_ini2)
-def solve_using_svd(U, s, Vh, b):
-    bb = U.T @ b
-    y = bb/s
-    x = Vh.T @ y
-    return x
-Yj = np.array([YY for YY in aY_ini])
-cut_start = 0
-for cut in range(cut_start, len(Yj) - 2, 1):
-    for j in range(10):
-        fyj = -AdYdt_ini(Yj)
-        jac = AdYdt_jac(Yj)
-        if np.any(np.isnan(Yj)) or np.any(np.isinf(Yj)):
-            print('Yj:', Yj)
-            raise ValueError
-        if np.any(np.isnan(fyj)) or np.any(np.isinf(fyj)):
-            print('Yj:', Yj)
-            print('fyj:', fyj)
-            raise ValueError
-        # Implement cut:
-        fyj = fyj[cut:]
-        jac = jac[cut:, cut:]
-        
-        # Solution using SVD
-        U, s, Vh = la.svd(jac)    
-        x = solve_using_svd(U, s, Vh, fyj)
-        for k in range(1):
-            #A · δx = A · (x + δx) − b
-            residuals = jac @ x - fyj
-            dx = solve_using_svd(U, s, Vh, residuals)
-            x -= dx
-        Yj[cut:] += x
-
-
-#Combining background and network
-
-initial_param=[T_ini,1]+list(PNAsort(Yj))
-n_params=nNucs+n_bparams
-
-def ndall(t,y):             
-    return dbackground(t,y[:n_bparams])+list( bbn_n.rhs(t/timeunit, y[n_bparams:],rho_bY_cgs(y), y[0]*TMeV2T9*1e9)/timeunit)
-
-
-
-#solving for early times and high temperature
-
-def jacY_anal(t,y):
-    return bbn_n.jacobian(t/timeunit, y[n_bparams:],rho_bY_cgs(y), y[0]*TMeV2T9*1e9)/timeunit
-
-def jacfun(t,x):
-    return np.array([ndall(t,row)  for row in x.T]).T
-
-def jacobian(t,y):
-    jac=np.append(np.zeros((nNucs,n_bparams)),jacY_anal(t,y),axis=1)
-    return np.append(np.zeros((n_bparams,n_params)),jac,axis=0)
-
-jacsolY = integrate.solve_ivp(ndall, [0,t_cut-t_ini], initial_param,method='Radau',atol=1e-80,rtol=1e-6,jac=jacobian)#,t_eval=t_space)
-
-
-#guess initial conditons for heavy nuclei from thermal equilibrium
-abun=[abun[-1] for abun in jacsolY.y[n_bparams:]]
-
-T_cut=jacsolY.y[0][-1]
-
-dYdt_cut=lambda Y : bbn_full.rhs(t_cut/timeunit, Y ,rho_bY_cgs([param[-1] for param in jacsolY.y]), T_cut*TMeV2T9*1e9)
-
-Y_cut=np.zeros(fnNucs)+1e-80
-Y_cut[:nNucs] = abun
-
-def get_Y_cut(abun_cut):
-    Y_ini3 = np.zeros(fnNucs)+1e-80
-        
-    for iter1 in range(30):
-        
-        Xn_cut = abun_cut[0]
-        Xp_cut = abun_cut[1]
-        Y_ini3[:nNucs] = abun_cut
-        for i in range(nNucs,fnNucs):
-            tmp = special.zeta(3)**(A[i] - 1)*np.pi**((1 - A[i])/2)*2**((3*A[i] - 5)/2)*A[i]**(5/2)
-
-            Y_ini3[i] = g[i]*tmp*(T_ini/m_Nucs[0])**(3*(A[i] - 1)/2)*eta_ini**(A[i] - 1)*Xp_cut**Z[i]*Xn_cut**(A[i] - Z[i])*np.exp(B[i]/T_cut)/A[i]
-
-    return Y_ini3
-
-Y_cut2 = get_Y_cut(abun)
-
-#refine initial conditons for heavy nuclei from Jacobian
-AdYdt_cut=lambda Y : Altersort(bbn_full.rhs(t_cut/timeunit, PNAsort(Y) ,rho_bY_cgs([param[-1] for param in jacsolY.y]), T_cut*TMeV2T9*1e9))
-AdYdt_jac_cut=lambda Y : bbn_full.jacobian(t_cut/timeunit, PNAsort(Y) ,rho_bY_cgs([param[-1] for param in jacsolY.y]), T_cut*TMeV2T9*1e9)[:, Altersort(range(fnNucs))][Altersort(range(fnNucs))]
-import scipy.linalg as la
-aY_cut=Altersort(Y_cut2)
-Yj = np.array([YY for YY in aY_cut])
-cut_start = nNucs
-for cut in range(cut_start, len(Yj) - 2, 1):
-    for j in range(10):
-
-        fyj = -AdYdt_cut(Yj)
-        jac = AdYdt_jac_cut(Yj)
-        if np.any(np.isnan(Yj)) or np.any(np.isinf(Yj)):
-            print('Yj:', Yj)
-            raise ValueError
-        if np.any(np.isnan(fyj)) or np.any(np.isinf(fyj)):
-            print('Yj:', Yj)
-            print('fyj:', fyj)
-            raise ValueError
-        # Implement cut:
-        fyj = fyj[cut:]
-        jac = jac[cut:, cut:]
-        
-        # Solution using SVD
-        U, s, Vh = la.svd(jac)    
-        x = solve_using_svd(U, s, Vh, fyj)
-        for k in range(1):
-            #A · δx = A · (x + δx) − b
-            residuals = jac @ x - fyj
-            dx = solve_using_svd(U, s, Vh, residuals)
-            x -= dx
-        Yj[cut:] += x
-
-#Combining background and full network
-
-cut_param=[param[-1] for param in jacsolY.y[:n_bparams]]+list(PNAsort(Yj))
-t_range_cut=[0,1e5*timeunit-t_cut+t_ini]
-full_n_params=fnNucs+n_bparams
-
-def ndfull(t,y):                
-    return dbackground(t,y[:n_bparams])+list( bbn_full.rhs(t/timeunit, y[n_bparams:],rho_bY_cgs(y), y[0]*TMeV2T9*1e9)/timeunit)
-
-#solving with full network
-def full_jac(t,y):
-    return bbn_full.jacobian(t/timeunit, y[n_bparams:],rho_bY_cgs(y), y[0]*TMeV2T9*1e9)/timeunit
-
-def full_jacobian(t,y):
-    jac=np.append(np.zeros((fnNucs,n_bparams)),full_jac(t,y),axis=1)
-    return np.append(np.zeros((n_bparams,full_n_params)),jac,axis=0)
-
-fullsolY = integrate.solve_ivp(ndfull, t_range_cut, cut_param,method='Radau',atol=1e-80,rtol=1e-6,jac=full_jacobian)#,t_eval=t_space)
-
-#combine early and late solutions
-solY=np.concatenate((np.concatenate((jacsolY.y,np.multiply(np.ones((len(jacsolY.y[0]),fnNucs-nNucs)),cut_param[n_params:]).T)),fullsolY.y),axis=1)
-soltime=np.concatenate((jacsolY.t+t_ini,fullsolY.t+t_cut))/timeunit
-
-# Plot the results    
-plt.figure('abundance',figsize=(6.4, 8))
-prop_cycle = plt.rcParams['axes.prop_cycle']
-colors = prop_cycle.by_key()['color']
-colors*=3
-line=['-']*10+['--']*10+[':']*10
-for i in range(fnNucs):
-    plt.plot(soltime, A[i]*solY[n_bparams+i],line[i], color=colors[i], label=Y_labels[i])
-
-plt.xlabel('Time in seconds')
-plt.ylabel('Mass fraction')
-plt.ylim(1e-20,3)
-plt.xlim(t_ini/timeunit,1e5)
-plt.xscale('log')
-plt.yscale('log')
-plt.legend()
-plt.savefig('abundance.png')
-plt.show()
-
-#Print final abundances
-abun=[fabun[-1] for fabun in fullsolY.y[n_bparams:]]
-print('\t Yp  '+'\t\t H2/H '+'\t\t H3/H '+'\t\t Li7/H '+'\t\t Li6/H '+'\t\t Be7/H ')
-print('value:\t '"{:.3e}".format(4*abun[5])+'\t '+"{:.3e}".format(abun[2]/abun[1])+'\t '+"{:.3e}".format((abun[3]+abun[4])/abun[1])+'\t '+"{:.3e}".format((abun[7]+abun[9])/abun[1])+'\t '+"{:.3e}".format((abun[6])/abun[1])+'\t '+"{:.3e}".format((abun[9])/abun[1]))
+import numpy as np
+from scipy import integrate, special
+from scipy.sparse import csr_matrix
+
+from APODORA.background import Background, TMeV2T9, background_eq, cached_background, timeunit
+from APODORA.equilibrium import abundance_floor, equilibrium_initial_state
+from APODORA.networks import FluxPruning, SparseNetwork, sparse_network
+from APODORA.networks.sparse import log_jacobian
+from APODORA.nuclear import lifetime_scale, masses, observables, spins, tau_n_rates, thermal_abundances
+from APODORA.ordering import label, nuclide_index
+from APODORA.sensitivity import (Checkpoints, equilibrium_adjoint, equilibrium_sensitivities, integrate_adjoint,
+                                  integrate_sensitivities, total_jacobian)
+
+n_bparams=2     #T and a in front of the abundances in the state
+log_rtol=1e-13  #relative tolerance of ln(Y), close to the least Radau takes
+dn_nu=0.01      #step of the central difference of the background by n_nu
+#largest rate (in the units of the network) of the first network at T_ini:
+#the ReacLib fits of the heavier nuclides (n_n15__d_c14, t_li7__n_be9, ...)
+#grow without bound above their range and full_size_net fails from T9 = 17
+#(1e32) up, but runs from T9 = 16 (4e27)
+max_initial_rate=1e30
+
+
+class BBNResult:
+    '''solution of run_bbn
+
+    t holds the times in s, T the temperatures in MeV, a the scale factor and
+    Y[nnuc, len(t)] the abundances of the nuclides names.  The nuclides that
+    are not in the network of a stage are held at the abundances they start
+    with in the next stage.  stages lists the name of the network and the
+    start time (in s) of every stage, and reduction the FluxPruning.report of
+    every stage if the reactions were pruned.  sensitivities[nnuc, nrates]
+    holds dY/d ln(rate) at the end for the rates rate_names of all stages, if
+    they were integrated.  gradients maps the observables of the adjoint to
+    their gradients d ln(observable)/d ln(rate) of rate_names ('rates'),
+    d ln(observable)/d ln(eta) ('eta'), d ln(observable)/d n_nu ('n_nu')
+    and d ln(observable)/d ln(tau_n) ('tau_n').'''
+
+    def __init__(self, names, A, eta, n_nu, tau_n, t, T, a, Y, stages=None, reduction=None,
+                 sensitivities=None, rate_names=None, gradients=None):
+        self.names=names
+        self.A=A
+        self.eta=eta
+        self.n_nu=n_nu
+        self.tau_n=tau_n
+        self.t=t
+        self.T=T
+        self.a=a
+        self.Y=Y
+        self.stages=stages
+        self.reduction=reduction
+        self.sensitivities=sensitivities
+        self.rate_names=rate_names
+        self.gradients=gradients
+
+    @property
+    def final(self):
+        '''abundances at the end of the integration'''
+        return self.Y[:, -1]
+
+    def abundances(self, order='alterbbn'):
+        '''names and abundances Y[nnuc, len(t)] in the ordering order of
+        APODORA.ordering, e.g. for comparison with AlterBBN'''
+        index=nuclide_index(self.names, order)
+        return list(np.array(self.names)[index]), self.Y[index]
+
+    def observables(self):
+        '''Yp, H2/H, ... at the end of the integration, see nuclear.observables'''
+        return {key: float(value) for key, value in observables(self.names, self.final).items()}
+
+    def log_sensitivities(self):
+        '''d ln(Y)/d ln(rate) at the end, with shape (nnuc, nrates)'''
+        return self.sensitivities/self.final[:, None]
+
+    def observable_sensitivities(self):
+        '''d ln(observable)/d ln(rate) of every observable at the end, by the
+        complex step through nuclear.observables, which is exact'''
+        h=1e-30
+        values=observables(self.names, self.final)
+        steps=observables(self.names, self.final+1j*h*self.sensitivities.T)
+        return {key: steps[key].imag/h/values[key] for key in values}
+
+    def plot(self, filename=None, show=False):
+        '''mass fractions against time, saved to filename and/or shown'''
+        import matplotlib.pyplot as plt
+
+        plt.figure('abundance',figsize=(6.4, 8))
+        prop_cycle = plt.rcParams['axes.prop_cycle']
+        colors = prop_cycle.by_key()['color']
+        colors*=3
+        line=['-']*10+['--']*10+[':']*10
+        for i, name in enumerate(self.names):
+            plt.plot(self.t, self.A[i]*self.Y[i],line[i], color=colors[i], label=label(name))
+
+        plt.xlabel('Time in seconds')
+        plt.ylabel('Mass fraction')
+        plt.ylim(1e-20,3)
+        plt.xlim(self.t[0],self.t[-1])
+        plt.xscale('log')
+        plt.yscale('log')
+        plt.legend()
+        if filename is not None:
+            plt.savefig(filename)
+        if show:
+            plt.show()
+
+    def print_abundances(self):
+        '''print the final abundances like AlterBBN'''
+        values=self.observables()
+        print('\t Yp  '+'\t\t H2/H '+'\t\t H3/H '+'\t\t Li7/H '+'\t\t Li6/H '+'\t\t Be7/H ')
+        print('value:\t'+''.join(' {:.3e}\t'.format(values[key]) for key in
+                                  ('Yp','H2/H','(H3+He3)/H','(Li7+Be7)/H','Li6/H','Be7/H')).rstrip('\t'))
+
+
+#the SparseNetworks of run_bbn with tabulated rates, by module and rtol of
+#the table, apart from those of sparse_network, which stay exact
+_tabulated_networks={}
+
+
+def _network(network, table_rtol=None):
+    if isinstance(network, str):
+        network=importlib.import_module(network)
+    if not isinstance(network, SparseNetwork) and not hasattr(network, 'RateEval'):
+        #AoT builds and C kernels evaluate their rates inside, which would
+        #leave out the overrides and the lifetime scale
+        raise ValueError(f'{network!r} is not a generated network module, compiled networks cannot be stages')
+    network=sparse_network(network)
+    if table_rtol is None:
+        return network
+    key=(network.module, table_rtol)
+    if key not in _tabulated_networks:
+        _tabulated_networks[key]=SparseNetwork(network.module).tabulate_rates(rtol=table_rtol)
+    return _tabulated_networks[key]
+
+
+def _heavy_abundances(names, A, Z, Y, index, T_ini, T_cut, eta):
+    #thermal equilibrium guess for the nuclides names, with the abundances Y
+    #at index, which start with n and p
+    m_Nucs=masses(names, A)
+    g=1+2*spins(names)
+    B=(m_Nucs[1]*Z+m_Nucs[0]*(A-Z))-m_Nucs
+    tmp=special.zeta(3)**(A - 1)*np.pi**((1 - A)/2)*2**((3*A - 5)/2)*A**(5/2)
+    #far below 1 MeV the guess overflows, it is capped at 1 and left to
+    #equilibrium_initial_state
+    with np.errstate(over='ignore'):
+        Y_cut=g*tmp*(T_ini/m_Nucs[0])**(3*(A - 1)/2)*eta**(A - 1)*Y[1]**Z*Y[0]**(A - Z)*np.exp(B/T_cut)/A
+    Y_cut=np.minimum(Y_cut, 1.0)
+    Y_cut[index]=Y
+    return Y_cut
+
+
+def _system(network, background, scale, table, t_start, reduction=None, log=False, tabulated=None,
+            sparse=False):
+    #derivatives and jacobian of the state in units of hbar/MeV, with t
+    #counted from t_start (in s).  The state is [T, a, Y], with the background
+    #rows and columns of the jacobian left at 0, or only Y if T and a are
+    #interpolated in the BackgroundTable table, and ln(Y) instead of Y with
+    #log.  With a FluxPruning reduction only its active reactions are
+    #evaluated.  The TabulatedRates tabulated replace their rates before they
+    #are multiplied by scale.  With sparse the jacobian is a csr_matrix on the
+    #pattern of network.csr_pattern.  Also returns state(t,y), which gives T,
+    #a and Y, and linearization(t,y), which gives d(dY/dt)/dY and
+    #d(dY/dt)/d ln(rate), and with temperature also d(dY/dt)/d ln(T) by a
+    #central difference
+    m_Nucs=masses(network.names, network.A)
+    kernels=network if reduction is None else reduction
+    nb=0 if table is not None else n_bparams
+    arrays=None if table is None else table.arrays()
+
+    def state(t,y):     #T, a and Y
+        if table is None:
+            return y[0], y[1], y[n_bparams:]
+        T, a = background_eq(t_start+t/timeunit, *arrays)
+        return T, a, np.exp(y) if log else y
+
+    def rates(T):
+        if reduction is not None:
+            return reduction.rates(T*TMeV2T9*1e9)
+        if tabulated is not None:
+            return tabulated(T*TMeV2T9*1e9, network.rates(T*TMeV2T9*1e9))*scale
+        return network.rates(T*TMeV2T9*1e9)*scale
+
+    def ndall(t,y):
+        T, a, Y = state(t,y)
+        rho=background.rho_b_cgs(Y, a, m_Nucs)
+        if reduction is not None:
+            reduction.update(t_start+t/timeunit, Y, rho, T*TMeV2T9*1e9)
+        dYdt = kernels.rhs_rates_eq(Y, rho, rates(T))/timeunit
+        if log:
+            return dYdt/Y
+        if table is not None:
+            return dYdt
+        return np.concatenate((background.derivatives(T, a), dYdt))
+
+    def jacobian(t,y):
+        T, a, Y = state(t,y)
+        if sparse:
+            rho=background.rho_b_cgs(Y, a, m_Nucs)
+            if reduction is None:
+                values=network.jacobian_values_rates_eq(Y, rho, rates(T))
+            else:
+                values=reduction.jacobian_rates_eq(Y, rho, rates(T))[network.jac_row, network.jac_indices]
+            indices, indptr = network.csr_pattern(nb)
+            return csr_matrix((values/timeunit, indices, indptr), shape=(nb+network.nnuc, nb+network.nnuc))
+        jac=np.zeros((nb+network.nnuc,nb+network.nnuc))
+        rho=background.rho_b_cgs(Y, a, m_Nucs)
+        jac[nb:,nb:]=kernels.jacobian_rates_eq(Y, rho, rates(T))/timeunit
+        if log:
+            return log_jacobian(Y, kernels.rhs_rates_eq(Y, rho, rates(T))/timeunit, jac)
+        return jac
+
+    def linearization(t,y,temperature=False):
+        T, a, Y = state(t,y)
+        rho=background.rho_b_cgs(Y, a, m_Nucs)
+        rates_T=rates(T)
+        D=network.rate_derivatives_rates_eq(Y, rho, rates_T)
+        J=total_jacobian(network.jacobian_rates_eq(Y, rho, rates_T), D, Y, m_Nucs, network.rho_power,
+                         network.ye_power, network.A, network.Z)
+        if not temperature:
+            return J/timeunit, D/timeunit
+        #dY/dt is linear in the rates
+        h=1e-5
+        difference=rates(T*np.exp(h))-rates(T*np.exp(-h))
+        return J/timeunit, D/timeunit, network.rhs_rates_eq(Y, rho, difference)/(2*h*timeunit)
+
+    return ndall, jacobian, state, linearization
+
+
+class Stage:
+    '''a network of run_bbn and when to go on to the next one
+
+    network is a generated network module, its name or a SparseNetwork.  The
+    stage ends at t_end (in s), when the temperature falls below T_end (in
+    MeV) or when the abundance of the heaviest nuclide of the network rises
+    above Y_end, whichever comes first.  The last stage of a run ignores
+    them and goes on to the end of the run, every other stage needs one of
+    them.'''
+
+    def __init__(self, network, t_end=None, T_end=None, Y_end=None):
+        self.network=network
+        self.t_end=t_end
+        self.T_end=T_end
+        self.Y_end=Y_end
+
+    def __repr__(self):
+        name=self.network
+        if isinstance(name, SparseNetwork):
+            name=name.module
+        if not isinstance(name, str):
+            name=name.__name__
+        return f'Stage({name!r}, t_end={self.t_end}, T_end={self.T_end}, Y_end={self.Y_end})'
+
+    def events(self, net, state):
+        #terminal events of solve_ivp for T_end and Y_end, with state(t,y)
+        #returning T, a and Y
+        events=[]
+        if self.T_end is not None:
+            events.append(lambda t,y: state(t,y)[0]-self.T_end)
+            events[-1].direction=-1
+        if self.Y_end is not None:
+            heaviest=int(np.argmax(net.A))
+            events.append(lambda t,y: state(t,y)[2][heaviest]-self.Y_end)
+            events[-1].direction=1
+        for event in events:
+            event.terminal=True
+        return events
+
+
+#n and p until T9 = 20, the light nuclei up to Be7 until Li8 builds up, then
+#all 26 nuclides (see benchmarks/bench_staging.py)
+default_stages=(Stage('np_net', T_end=20/TMeV2T9),
+                Stage('bbn_test_integrate', Y_end=1e-35),
+                Stage('full_size_net'))
+
+
+def run_bbn(eta=6.1e-10, n_nu=3.046, tau_n=tau_n_rates, stages=default_stages, rtol=1e-6,
+            atol=1e-80, T_ini=27/TMeV2T9, t_end=1e5, cached=True, prune=None, prune_window=0.1,
+            log_abundances=False, profile=None, overrides=None, sensitivities=False, adjoint=None,
+            checkpoint_every=None, sparse_jacobian=False, rate_table_rtol=None):
+    '''abundances from T_ini (in MeV) to t_end (in s) for baryon-to-photon
+    ratio eta, n_nu neutrino families and neutron lifetime tau_n (in s)
+
+    stages is a sequence of Stages, or a single one, integrated one after the
+    other.  Every network has to contain the nuclides of the one before it.
+    The first network starts from the thermal abundances at T_ini, the
+    nuclides added by the following ones from a thermal guess, and both are
+    brought into equilibrium by equilibrium_initial_state first.  A plain
+    network is taken as a Stage without an end, so it can only be the last
+    one: every other stage needs t_end, T_end or Y_end, a ValueError is
+    raised otherwise.  The first network has to hold at T_ini: the networks
+    with the heavier nuclides, such as full_size_net, have ReacLib fits that
+    blow up above T9 ~ 16 and are only run after a smaller network (as in
+    default_stages), a ValueError is raised for a first network with a rate
+    above max_initial_rate at T_ini.  With cached T and a are taken
+    from the cached_background of n_nu and T_ini, otherwise they are
+    integrated together with the abundances.
+    With prune the reactions are pruned by FluxPruning with threshold prune,
+    updated whenever ln(t) has grown by prune_window.
+    rtol and atol are passed to Radau.  With log_abundances ln(Y) is
+    integrated instead, with rtol as its absolute tolerance, so every
+    abundance is resolved to rtol and atol is not used.  This needs the
+    cached background.  With sparse_jacobian the jacobian is handed to Radau as
+    a csr_matrix on the fixed pattern of the reactions, which Radau factorizes
+    by sparse LU (not with log_abundances).  With rate_table_rtol the rates of
+    every network are interpolated in a RateTable of that rtol (see
+    SparseNetwork.tabulate_rates), built once per network and process.
+    With a SolverProfile profile the
+    calls, time and steps of every stage are recorded in it.  The multipliers and tables of the
+    RateOverrides overrides change the rates of every stage they are in,
+    without compiling the networks again (see APODORA/networks/overrides.py).
+    With sensitivities dY/d ln(rate) of all rates is integrated along, see
+    APODORA/sensitivity.py, which needs prune to be None.
+    adjoint is an observable of nuclear.observables, or a sequence of them,
+    whose gradients by all rates, eta, n_nu and tau_n are found by the
+    adjoint, integrated back from the end, see APODORA/sensitivity.py.  The
+    forward solution is kept whole with its dense output, or for an integer
+    checkpoint_every at every checkpoint_every-th step and solved again
+    between them on the way back, which holds less memory but costs one to
+    two more forward solves (see benchmarks/bench_adjoint.py).  It needs the
+    cached background, whose derivative by n_nu is a central difference of
+    the backgrounds of n_nu +- dn_nu, and prune to be None.
+    The sensitivities and the adjoint hold the times the stages end fixed.
+    Returns a BBNResult.'''
+
+    if log_abundances and not cached:
+        raise ValueError('log_abundances needs the cached background')
+    if log_abundances and sparse_jacobian:
+        raise ValueError('the sparse jacobian is not available with log_abundances')
+    if (sensitivities or adjoint is not None) and prune is not None:
+        raise ValueError('the sensitivities need all reactions, prune must be None')
+    if adjoint is not None and not cached:
+        raise ValueError('the adjoint needs the cached background')
+    background=Background(eta, n_nu, T_ini)
+    table=cached_background(n_nu, T_ini, t_end=max(2e5, t_end)) if cached else None
+    if isinstance(stages, (Stage, str)) or not np.iterable(stages):
+        stages=[stages]
+    stages=[stage if isinstance(stage, Stage) else Stage(stage) for stage in stages]
+    for stage in stages[:-1]:
+        if stage.t_end is None and stage.T_end is None and stage.Y_end is None:
+            raise ValueError(f'{stage} is not the last stage and has no end, give it t_end, T_end or Y_end')
+    networks=[_network(stage.network, rate_table_rtol) for stage in stages]
+    initial_rates=networks[0].rates(T_ini*TMeV2T9*1e9)
+    if not np.all(initial_rates<=max_initial_rate):
+        k=int(np.argmax(np.where(np.isnan(initial_rates), np.inf, initial_rates)))
+        raise ValueError(f'{stages[0]} cannot start at T9={T_ini*TMeV2T9:.3g}: its rate {networks[0].rate_names[k]} '
+                         f'is {initial_rates[k]:.1e}, far beyond its fit, run it after a smaller network '
+                         f'as in default_stages')
+    if overrides is not None:
+        unknown=overrides.names-{name for net in networks for name in net.rate_names}
+        if unknown:
+            raise ValueError(f'no network of the run has the rates {sorted(unknown)}')
+    rate_names=list(dict.fromkeys(name for net in networks for name in net.rate_names))
+    if adjoint is not None:
+        keys=[adjoint] if isinstance(adjoint, str) else list(adjoint)
+        unknown=set(keys)-set(observables(networks[-1].names, np.ones(networks[-1].nnuc)))
+        if unknown:
+            raise ValueError(f'no observables {sorted(unknown)}')
+        #ln T and ln a of the background by n_nu, at t in s
+        tables=[cached_background(n_nu+sign*dn_nu, T_ini, t_end=max(2e5, t_end)).arrays() for sign in (1, -1)]
+        def dbackground(t):
+            (T_up, a_up), (T_down, a_down) = (background_eq(t, *arrays) for arrays in tables)
+            return np.log(T_up/T_down)/(2*dn_nu), np.log(a_up/a_down)/(2*dn_nu)
+
+    def solve(net, stage, T, a, Y, t_start, t_stop, fixed, S=None):
+        #bring the abundances Y of the nuclides not in fixed into equilibrium
+        #and integrate from t_start up to t_stop (in s) or the end of stage
+        #(None for none).  Returns times (in s), T, a and Y of the solution.
+        #With the sensitivities S of Y at the start, those at the end are
+        #appended to sensitivity.  With adjoint what the backward pass needs
+        #is appended to adjoints
+        scale=lifetime_scale(net.rate_names, tau_n)
+        tabulated=None
+        if overrides is not None:
+            scale=scale*overrides.multipliers(net.rate_names)
+            tabulated=overrides.tabulated(net.rate_names)
+        reduction=None if prune is None else FluxPruning(net, prune, prune_window, scale, tabulated)
+        ndall, jacobian, state, linearization = _system(net, background, scale, table, t_start, reduction,
+                                                        log_abundances, tabulated, sparse_jacobian)
+        rho=background.rho_b_cgs(Y, a, masses(net.names, net.A))
+        Y=equilibrium_initial_state(net, T*TMeV2T9*1e9, rho, Y, fixed, scale, tabulated=tabulated)
+        events=None
+        if stage is not None:
+            events=stage.events(net, state)
+            if stage.t_end is not None:
+                t_stop=min(t_stop, stage.t_end)
+        if log_abundances:
+            y0=np.log(np.maximum(Y, abundance_floor))
+            tolerances=dict(atol=rtol, rtol=log_rtol)
+        else:
+            y0=Y if table is not None else np.concatenate(([T, a], Y))
+            tolerances=dict(atol=atol, rtol=rtol)
+        span=[0,(t_stop-t_start)*timeunit]
+        dense_output=S is not None or (adjoint is not None and checkpoint_every is None)
+        if profile is None:
+            solution=integrate.solve_ivp(ndall, span, y0, method='Radau', jac=jacobian, events=events,
+                                         dense_output=dense_output, **tolerances)
+        else:
+            solution=profile.solve_ivp(ndall, span, y0, method='Radau', jac=jacobian, events=events,
+                                       temperature=lambda t,y: state(t,y)[0],
+                                       stage=net.module.__name__, dense_output=dense_output, **tolerances)
+        if not solution.success:
+            raise RuntimeError(f'integration failed at t={solution.t[-1]/timeunit+t_start:.3e} s: {solution.message}')
+        if S is not None:
+            #the rates of the other stages have no derivatives in this one
+            columns=[rate_names.index(name) for name in net.rate_names]
+            def linearization_all(t):
+                J, D = linearization(t, solution.sol(t))
+                D_all=np.zeros((net.nnuc, len(rate_names)))
+                D_all[:, columns]=D
+                return J, D_all
+            free=np.array([name not in fixed for name in net.names])
+            S=equilibrium_sensitivities(*linearization_all(0.0), S, free,
+                                        np.argmax(Y) if np.all(free) else None, net.A)
+            sensitivity.append(integrate_sensitivities(linearization_all, solution.t, S))
+        if adjoint is not None:
+            def resolve(t0, t1, y0, first_step):
+                if checkpoint_every is None:
+                    return solution.sol
+                segment=integrate.solve_ivp(ndall, [t0, t1], y0, method='Radau', jac=jacobian,
+                                            dense_output=True, first_step=first_step, **tolerances)
+                if not segment.success:
+                    raise RuntimeError(f'integration failed again at t={segment.t[-1]/timeunit+t_start:.3e} s: '
+                                       f'{segment.message}')
+                return segment.sol
+            def linearization_inputs(t, y):
+                #J and d(dY/dt) by ln(rate) of the rates of net, ln(eta) and
+                #n_nu, which changes T and a (rho goes with eta/a**3)
+                J, D, dlnT = linearization(t, y, temperature=True)
+                dlnrho=D @ net.rho_power
+                dlnT_dn_nu, dlna_dn_nu = dbackground(t_start+t/timeunit)
+                return J, np.column_stack((D, dlnrho, dlnT*dlnT_dn_nu-3*dlnrho*dlna_dn_nu))
+            free=np.array([name not in fixed for name in net.names])
+            columns=[rate_names.index(name) for name in net.rate_names]+[len(rate_names), len(rate_names)+1]
+            checkpoints=Checkpoints(solution.t, solution.y, checkpoint_every or len(solution.t), resolve)
+            adjoints.append((net, linearization_inputs, checkpoints, free, np.argmax(Y) if np.all(free) else None,
+                             columns))
+        t=solution.t/timeunit+t_start
+        reductions.append(None if reduction is None else reduction.report())
+        if table is not None:
+            return (t, *table(t), np.exp(solution.y) if log_abundances else solution.y)
+        return t, solution.y[0], solution.y[1], solution.y[n_bparams:]
+
+    #every stage starts where the one before it ended, with the nuclides it
+    #adds guessed from thermal equilibrium
+    first=networks[0]
+    t, T, a = background.t_ini/timeunit, T_ini, 1.0
+    Y=thermal_abundances(first.names, first.A, first.Z, T_ini, background.eta_ini)
+    fixed=()
+    segments=[]
+    reductions=[]
+    sensitivity=[]
+    adjoints=[]
+    for k, (stage, net) in enumerate(zip(stages, networks)):
+        if k>0:
+            index=nuclide_index(net.names, networks[k-1].names)
+            Y=_heavy_abundances(net.names, net.A, net.Z, Y, index, T_ini, T, background.eta_ini)
+        S=None
+        if sensitivities:
+            S=np.zeros((net.nnuc, len(rate_names)))
+            if k>0:
+                S[index]=sensitivity[-1]
+        last=k==len(stages)-1
+        segment=solve(net, None if last else stage, T, a, Y, t, t_end, fixed, S)
+        segments.append((net, segment))
+        t, T, a, Y = (x[..., -1] for x in segment)
+        fixed=net.names
+        if t>=t_end:
+            break
+
+    gradients=None
+    if adjoint is not None:
+        #d ln(observable)/dY at the end by the complex step, back through
+        #the stages to the inputs: the rates, ln(eta) and n_nu
+        h=1e-30
+        names=segments[-1][0].names
+        values=observables(names, Y)
+        steps=observables(names, Y+1j*h*np.eye(len(names)))
+        lam=np.column_stack([steps[key].imag/h/values[key] for key in keys])
+        gradient=np.zeros((len(rate_names)+2, len(keys)))
+        for k in range(len(adjoints)-1, -1, -1):
+            net, linearization_inputs, checkpoints, free, conserved, columns = adjoints[k]
+            lam, inputs = integrate_adjoint(linearization_inputs, checkpoints, lam)
+            gradient[columns]+=inputs
+            lam, inputs = equilibrium_adjoint(*linearization_inputs(checkpoints.t[0], checkpoints.y[:, 0]),
+                                              lam, free, conserved, net.A)
+            gradient[columns]+=inputs
+            if k>0:
+                lam=lam[nuclide_index(net.names, adjoints[k-1][0].names)]
+        #tau_n scales the n <-> p rates by tau_n_rates/tau_n
+        dlnscale=np.log(lifetime_scale(rate_names, np.e*tau_n_rates))
+        gradients={key: {'rates': gradient[:len(rate_names), o], 'eta': gradient[len(rate_names), o],
+                         'n_nu': gradient[len(rate_names)+1, o], 'tau_n': dlnscale @ gradient[:len(rate_names), o]}
+                   for o, key in enumerate(keys)}
+
+    #the nuclides of the last network, those not in the network of a stage
+    #are held at the abundances they start with in the next stage
+    names=segments[-1][0].names
+    Y_all=[segments[-1][1][3]]
+    for net, segment in segments[-2::-1]:
+        Y_stage=np.repeat(Y_all[0][:, :1], len(segment[0]), axis=1)
+        Y_stage[nuclide_index(names, net.names)]=segment[3]
+        Y_all.insert(0, Y_stage)
+    return BBNResult(names, segments[-1][0].A, eta, n_nu, tau_n,
+                     *(np.concatenate([segment[i] for _, segment in segments]) for i in range(3)),
+                     np.concatenate(Y_all, axis=1),
+                     [(net.module.__name__, segment[0][0]) for net, segment in segments],
+                     reductions if prune is not None else None,
+                     sensitivity[-1] if sensitivities else None,
+                     rate_names if sensitivities or adjoint is not None else None, gradients)
+
+
+if __name__ == '__main__':
+    result=run_bbn()
+    result.plot('abundance.png', show=True)
+    result.print_abundances()
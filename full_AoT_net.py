@@ -1,7 +1,13 @@
-def __bootstrap__():
-   global __bootstrap__, __loader__, __file__
-   import sys, pkg_resources, imp
-   __file__ = pkg_resources.resource_filename(__name__,'full_AoT_net.so')
-   __loader__ = None; del __bootstrap__, __loader__
-   imp.load_dynamic(__name__,__file__)
-__bootstrap__()
\ No newline at end of file
+"""full_size_net compiled ahead of time, or the jit compiled module until
+it is built for the running interpreter:
+
+    python -m APODORA.networks.aot full_size_net
+"""
+
+from APODORA.networks import aot
+
+_network = aot.load('full_size_net')
+nnuc = _network.nnuc
+rhs = _network.rhs
+jacobian = _network.jacobian
+rhs_and_jacobian = _network.rhs_and_jacobian
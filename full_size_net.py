@@ -3441,71 +3441,25 @@ def p_p_he4_he4__he3_be7(rate_eval, tf):
     rate_eval.p_p_he4_he4__he3_be7 = rate
 
 
-b0 = -0.62173 
-b1 = 0.22211e2
-b2 = -0.72798e2
-b3 = 0.11571e3
-b4 = -0.11763e2
-b5 = 0.45521e2
-b6 = -3.7973 
-b7 = 0.41266 
-b8 = -0.026210
-b9 = 0.87934e-3
-b10 = -0.12016e-4
-qpn = 2.8602
-
-@numba.njit() 
-def p__n(rate_eval, tf):  
-    # p --> n
-    z=5.92989658*tf.T9i
-    rate=0
-    #rate from https://arxiv.org/pdf/astro-ph/0408076.pdf appendix C
-    b=[b0,b1,b2,b3,b4,b5,b6,b7,b8,b9,b10]
-    if tf.T9>1.160451812:
-      for i in range(11):
-         rate+=1/880.2*np.exp(-qpn*z)*b[i]*z**-i 
-        
-    #Kawano rate
-    #rate=1/879.6*(5.252/z - 16.229/z**2 + 18.059/z**3 + 34.181/z**4 + 27.617/z**5)*np.exp(-2.530988*z)
-    rate_eval.p__n = rate
-
-
-a0 = 1
-a1 = 0.15735 
-a2 = 4.6172
-a3 = -0.40520e2 
-a4 = 0.13875e3 
-a5 = -0.59898e2
-a6 = 0.66752e2 
-a7 = -0.16705e2 
-a8 = 3.8071
-a9 = -0.39140 
-a10 = 0.023590 
-a11 = -0.83696e-4
-a12 = -0.42095e-4 
-a13 = 0.17675e-5
-qnp = 0.33979 
+from APODORA.networks.weak_rates import p__n_rate
 
 @numba.njit()
-def n__p(rate_eval, tf):
-    # n --> p
-    z=5.92989658*tf.T9i
-    #rate from https://arxiv.org/pdf/astro-ph/0408076.pdf appendix C
-    rate=0
-    a=[a0,a1,a2,a3,a4,a5,a6,a7,a8,a9,a10,a11,a12,a13]
-    for i in range(14):
-      rate+=1/880.2*np.exp(-qnp/z)*a[i]*z**-i
+def p__n(rate_eval, tf):
+    # p --> n
+    #rate from https://arxiv.org/pdf/astro-ph/0408076.pdf appendix C, see APODORA/networks/weak_rates.py
+    rate_eval.p__n = p__n_rate(tf.T9)
 
-    #Kawano rate
-    #rate = 1/879.6*(0.565/z - 6.382/z**2 + 11.108/z**3 + 36.492/z**4 + 27.512/z**5)
 
-    rate_eval.n__p = rate
+from APODORA.networks.weak_rates import n__p_rate
 
-def rhs(t, Y, rho, T, screen_func=None):
-    return rhs_eq(t, Y, rho, T, screen_func)
+@numba.njit()
+def n__p(rate_eval, tf):
+    # n --> p
+    #rate from https://arxiv.org/pdf/astro-ph/0408076.pdf appendix C, see APODORA/networks/weak_rates.py
+    rate_eval.n__p = n__p_rate(tf.T9)
 
 @numba.njit()
-def rhs_eq(t, Y, rho, T, screen_func):
+def rates_eq(T):
 
     tf = Tfactors(T)
     rate_eval = RateEval()
@@ -3733,6 +3687,10 @@ def rhs_eq(t, Y, rho, T, screen_func):
     p__n(rate_eval, tf)
     n__p(rate_eval, tf)
 
+    return rate_eval
+
+@numba.njit()
+def screen_rates(rate_eval, Y, rho, T, screen_func):
     if screen_func is not None:
         plasma_state = PlasmaState(T, rho, Y, Z)
 
@@ -4042,6 +4000,10 @@ def rhs_eq(t, Y, rho, T, screen_func):
         scor = screen_func(plasma_state, scn_fac)
         rate_eval.d_he4_he4__p_be9 *= scor
 
+
+@numba.njit()
+def rhs_rates_eq(Y, rho, rate_eval):
+
     dYdt = np.zeros((nnuc), dtype=np.float64)
 
     dYdt[jn] = (
@@ -4688,735 +4650,197 @@ def rhs_eq(t, Y, rho, T, screen_func):
        +rho*Y[jhe4]*Y[jbe9]*rate_eval.he4_be9__p_b12
        +rho*Y[jn]*Y[jc12]*rate_eval.n_c12__p_b12
        +rho*Y[jn]*Y[jn15]*rate_eval.n_n15__he4_b12
-       )
-
-    dYdt[jc11] = (
-       -Y[jc11]*rate_eval.c11__b11__weak__wc12
-       -Y[jc11]*rate_eval.c11__p_b10
-       -Y[jc11]*rate_eval.c11__he4_be7
-       -rho*Y[jn]*Y[jc11]*rate_eval.n_c11__c12
-       -rho*Y[jp]*Y[jc11]*rate_eval.p_c11__n12
-       -rho*Y[jn]*Y[jc11]*rate_eval.n_c11__p_b11
-       -rho*Y[jp]*Y[jc11]*rate_eval.p_c11__he4_b8
-       -rho*Y[jhe4]*Y[jc11]*rate_eval.he4_c11__n_o14
-       -rho*Y[jhe4]*Y[jc11]*rate_eval.he4_c11__p_n14
-       -rho*Y[jn]*Y[jc11]*rate_eval.n_c11__he4_he4_he4
-       +Y[jc12]*rate_eval.c12__n_c11
-       +Y[jn12]*rate_eval.n12__p_c11
-       +rho*Y[jhe4]*Y[jbe7]*rate_eval.he4_be7__c11
-       +rho*Y[jp]*Y[jb10]*rate_eval.p_b10__c11
-       +rho*Y[jhe4]*Y[jb8]*rate_eval.he4_b8__p_c11
-       +rho*Y[jp]*Y[jb11]*rate_eval.p_b11__n_c11
-       +rho*Y[jp]*Y[jn14]*rate_eval.p_n14__he4_c11
-       +rho*Y[jn]*Y[jo14]*rate_eval.n_o14__he4_c11
-       +1.66666666666667e-01*rho**2*Y[jhe4]**3*rate_eval.he4_he4_he4__n_c11
-       )
-
-    dYdt[jc12] = (
-       -Y[jc12]*rate_eval.c12__n_c11
-       -Y[jc12]*rate_eval.c12__p_b11
-       -Y[jc12]*rate_eval.c12__he4_he4_he4
-       -rho*Y[jn]*Y[jc12]*rate_eval.n_c12__c13
-       -rho*Y[jp]*Y[jc12]*rate_eval.p_c12__n13
-       -rho*Y[jhe4]*Y[jc12]*rate_eval.he4_c12__o16
-       -rho*Y[jn]*Y[jc12]*rate_eval.n_c12__p_b12
-       -rho*Y[jn]*Y[jc12]*rate_eval.n_c12__he4_be9
-       -rho*Y[jhe4]*Y[jc12]*rate_eval.he4_c12__n_o15
-       -rho*Y[jhe4]*Y[jc12]*rate_eval.he4_c12__p_n15
-       +Y[jb12]*rate_eval.b12__c12__weak__wc17
-       +Y[jn12]*rate_eval.n12__c12__weak__wc12
-       +Y[jc13]*rate_eval.c13__n_c12
-       +Y[jn13]*rate_eval.n13__p_c12
-       +Y[jo16]*rate_eval.o16__he4_c12
-       +rho*Y[jp]*Y[jb11]*rate_eval.p_b11__c12
-       +rho*Y[jn]*Y[jc11]*rate_eval.n_c11__c12
-       +rho*Y[jhe4]*Y[jbe9]*rate_eval.he4_be9__n_c12
-       +rho*Y[jp]*Y[jb12]*rate_eval.p_b12__n_c12
-       +rho*Y[jp]*Y[jn15]*rate_eval.p_n15__he4_c12
-       +rho*Y[jn]*Y[jo15]*rate_eval.n_o15__he4_c12
-       +1.66666666666667e-01*rho**2*Y[jhe4]**3*rate_eval.he4_he4_he4__c12
-       )
-
-    dYdt[jc13] = (
-       -Y[jc13]*rate_eval.c13__n_c12
-       -rho*Y[jn]*Y[jc13]*rate_eval.n_c13__c14
-       -rho*Y[jp]*Y[jc13]*rate_eval.p_c13__n14
-       -rho*Y[jp]*Y[jc13]*rate_eval.p_c13__n_n13
-       -rho*Y[jp]*Y[jc13]*rate_eval.p_c13__he4_b10
-       -rho*Y[jd]*Y[jc13]*rate_eval.d_c13__n_n14
-       -rho*Y[jhe4]*Y[jc13]*rate_eval.he4_c13__n_o16
-       +Y[jn13]*rate_eval.n13__c13__weak__wc12
-       +Y[jc14]*rate_eval.c14__n_c13
-       +Y[jn14]*rate_eval.n14__p_c13
-       +rho*Y[jn]*Y[jc12]*rate_eval.n_c12__c13
-       +rho*Y[jhe4]*Y[jb10]*rate_eval.he4_b10__p_c13
-       +rho*Y[jn]*Y[jn13]*rate_eval.n_n13__p_c13
-       +rho*Y[jn]*Y[jn14]*rate_eval.n_n14__d_c13
-       +rho*Y[jn]*Y[jo16]*rate_eval.n_o16__he4_c13
-       )
-
-    dYdt[jc14] = (
-       -Y[jc14]*rate_eval.c14__n14__weak__wc12
-       -Y[jc14]*rate_eval.c14__n_c13
-       -rho*Y[jp]*Y[jc14]*rate_eval.p_c14__n15
-       -rho*Y[jp]*Y[jc14]*rate_eval.p_c14__n_n14
-       -rho*Y[jp]*Y[jc14]*rate_eval.p_c14__he4_b11
-       -rho*Y[jd]*Y[jc14]*rate_eval.d_c14__n_n15
-       +Y[jn15]*rate_eval.n15__p_c14
-       +rho*Y[jn]*Y[jc13]*rate_eval.n_c13__c14
-       +rho*Y[jhe4]*Y[jb11]*rate_eval.he4_b11__p_c14
-       +rho*Y[jn]*Y[jn14]*rate_eval.n_n14__p_c14
-       +rho*Y[jn]*Y[jn15]*rate_eval.n_n15__d_c14
-       )
-
-    dYdt[jn12] = (
-       -Y[jn12]*rate_eval.n12__c12__weak__wc12
-       -Y[jn12]*rate_eval.n12__p_c11
-       -rho*Y[jhe4]*Y[jn12]*rate_eval.he4_n12__p_o15
-       +rho*Y[jp]*Y[jc11]*rate_eval.p_c11__n12
-       +rho*Y[jp]*Y[jo15]*rate_eval.p_o15__he4_n12
-       )
-
-    dYdt[jn13] = (
-       -Y[jn13]*rate_eval.n13__c13__weak__wc12
-       -Y[jn13]*rate_eval.n13__p_c12
-       -rho*Y[jn]*Y[jn13]*rate_eval.n_n13__n14
-       -rho*Y[jp]*Y[jn13]*rate_eval.p_n13__o14
-       -rho*Y[jn]*Y[jn13]*rate_eval.n_n13__p_c13
-       -rho*Y[jn]*Y[jn13]*rate_eval.n_n13__he4_b10
-       -rho*Y[jhe4]*Y[jn13]*rate_eval.he4_n13__p_o16
-       +Y[jn14]*rate_eval.n14__n_n13
-       +Y[jo14]*rate_eval.o14__p_n13
-       +rho*Y[jp]*Y[jc12]*rate_eval.p_c12__n13
-       +rho*Y[jhe4]*Y[jb10]*rate_eval.he4_b10__n_n13
-       +rho*Y[jp]*Y[jc13]*rate_eval.p_c13__n_n13
-       +rho*Y[jp]*Y[jo16]*rate_eval.p_o16__he4_n13
-       )
-
-    dYdt[jn14] = (
-       -Y[jn14]*rate_eval.n14__n_n13
-       -Y[jn14]*rate_eval.n14__p_c13
-       -rho*Y[jn]*Y[jn14]*rate_eval.n_n14__n15
-       -rho*Y[jp]*Y[jn14]*rate_eval.p_n14__o15
-       -rho*Y[jn]*Y[jn14]*rate_eval.n_n14__p_c14
-       -rho*Y[jn]*Y[jn14]*rate_eval.n_n14__d_c13
-       -rho*Y[jn]*Y[jn14]*rate_eval.n_n14__he4_b11
-       -rho*Y[jp]*Y[jn14]*rate_eval.p_n14__n_o14
-       -rho*Y[jp]*Y[jn14]*rate_eval.p_n14__he4_c11
-       +Y[jc14]*rate_eval.c14__n14__weak__wc12
-       +Y[jo14]*rate_eval.o14__n14__weak__wc12
-       +Y[jn15]*rate_eval.n15__n_n14
-       +Y[jo15]*rate_eval.o15__p_n14
-       +rho*Y[jp]*Y[jc13]*rate_eval.p_c13__n14
-       +rho*Y[jn]*Y[jn13]*rate_eval.n_n13__n14
-       +rho*Y[jhe4]*Y[jb11]*rate_eval.he4_b11__n_n14
-       +rho*Y[jhe4]*Y[jc11]*rate_eval.he4_c11__p_n14
-       +rho*Y[jd]*Y[jc13]*rate_eval.d_c13__n_n14
-       +rho*Y[jp]*Y[jc14]*rate_eval.p_c14__n_n14
-       +rho*Y[jn]*Y[jo14]*rate_eval.n_o14__p_n14
-       )
-
-    dYdt[jn15] = (
-       -Y[jn15]*rate_eval.n15__n_n14
-       -Y[jn15]*rate_eval.n15__p_c14
-       -rho*Y[jp]*Y[jn15]*rate_eval.p_n15__o16
-       -rho*Y[jn]*Y[jn15]*rate_eval.n_n15__d_c14
-       -rho*Y[jn]*Y[jn15]*rate_eval.n_n15__he4_b12
-       -rho*Y[jp]*Y[jn15]*rate_eval.p_n15__n_o15
-       -rho*Y[jp]*Y[jn15]*rate_eval.p_n15__he4_c12
-       +Y[jo15]*rate_eval.o15__n15__weak__wc12
-       +Y[jo16]*rate_eval.o16__p_n15
-       +rho*Y[jp]*Y[jc14]*rate_eval.p_c14__n15
-       +rho*Y[jn]*Y[jn14]*rate_eval.n_n14__n15
-       +rho*Y[jhe4]*Y[jb12]*rate_eval.he4_b12__n_n15
-       +rho*Y[jhe4]*Y[jc12]*rate_eval.he4_c12__p_n15
-       +rho*Y[jd]*Y[jc14]*rate_eval.d_c14__n_n15
-       +rho*Y[jn]*Y[jo15]*rate_eval.n_o15__p_n15
-       )
-
-    dYdt[jo14] = (
-       -Y[jo14]*rate_eval.o14__n14__weak__wc12
-       -Y[jo14]*rate_eval.o14__p_n13
-       -rho*Y[jn]*Y[jo14]*rate_eval.n_o14__o15
-       -rho*Y[jn]*Y[jo14]*rate_eval.n_o14__p_n14
-       -rho*Y[jn]*Y[jo14]*rate_eval.n_o14__he4_c11
-       +Y[jo15]*rate_eval.o15__n_o14
-       +rho*Y[jp]*Y[jn13]*rate_eval.p_n13__o14
-       +rho*Y[jhe4]*Y[jc11]*rate_eval.he4_c11__n_o14
-       +rho*Y[jp]*Y[jn14]*rate_eval.p_n14__n_o14
-       )
-
-    dYdt[jo15] = (
-       -Y[jo15]*rate_eval.o15__n15__weak__wc12
-       -Y[jo15]*rate_eval.o15__n_o14
-       -Y[jo15]*rate_eval.o15__p_n14
-       -rho*Y[jn]*Y[jo15]*rate_eval.n_o15__o16
-       -rho*Y[jn]*Y[jo15]*rate_eval.n_o15__p_n15
-       -rho*Y[jn]*Y[jo15]*rate_eval.n_o15__he4_c12
-       -rho*Y[jp]*Y[jo15]*rate_eval.p_o15__he4_n12
-       +Y[jo16]*rate_eval.o16__n_o15
-       +rho*Y[jp]*Y[jn14]*rate_eval.p_n14__o15
-       +rho*Y[jn]*Y[jo14]*rate_eval.n_o14__o15
-       +rho*Y[jhe4]*Y[jc12]*rate_eval.he4_c12__n_o15
-       +rho*Y[jhe4]*Y[jn12]*rate_eval.he4_n12__p_o15
-       +rho*Y[jp]*Y[jn15]*rate_eval.p_n15__n_o15
-       )
-
-    dYdt[jo16] = (
-       -Y[jo16]*rate_eval.o16__n_o15
-       -Y[jo16]*rate_eval.o16__p_n15
-       -Y[jo16]*rate_eval.o16__he4_c12
-       -rho*Y[jn]*Y[jo16]*rate_eval.n_o16__he4_c13
-       -rho*Y[jp]*Y[jo16]*rate_eval.p_o16__he4_n13
-       +rho*Y[jhe4]*Y[jc12]*rate_eval.he4_c12__o16
-       +rho*Y[jp]*Y[jn15]*rate_eval.p_n15__o16
-       +rho*Y[jn]*Y[jo15]*rate_eval.n_o15__o16
-       +rho*Y[jhe4]*Y[jc13]*rate_eval.he4_c13__n_o16
-       +rho*Y[jhe4]*Y[jn13]*rate_eval.he4_n13__p_o16
-       )
-
-    return dYdt
-
-def jacobian(t, Y, rho, T, screen_func=None):
-    return jacobian_eq(t, Y, rho, T, screen_func)
-
-@numba.njit()
-def jacobian_eq(t, Y, rho, T, screen_func):
-
-    tf = Tfactors(T)
-    rate_eval = RateEval()
-
-    # reaclib rates
-    t__he3__weak__wc12(rate_eval, tf)
-    he3__t__weak__electron_capture(rate_eval, tf)
-    be7__li7__weak__electron_capture(rate_eval, tf)
-    b12__c12__weak__wc17(rate_eval, tf)
-    c11__b11__weak__wc12(rate_eval, tf)
-    c14__n14__weak__wc12(rate_eval, tf)
-    n12__c12__weak__wc12(rate_eval, tf)
-    n13__c13__weak__wc12(rate_eval, tf)
-    o14__n14__weak__wc12(rate_eval, tf)
-    o15__n15__weak__wc12(rate_eval, tf)
-    d__n_p(rate_eval, tf)
-    t__n_d(rate_eval, tf)
-    he3__p_d(rate_eval, tf)
-    he4__n_he3(rate_eval, tf)
-    he4__p_t(rate_eval, tf)
-    he4__d_d(rate_eval, tf)
-    li6__he4_d(rate_eval, tf)
-    li7__n_li6(rate_eval, tf)
-    li7__he4_t(rate_eval, tf)
-    li8__n_li7(rate_eval, tf)
-    li8__he4_he4__weak__wc12(rate_eval, tf)
-    be7__p_li6(rate_eval, tf)
-    be7__he4_he3(rate_eval, tf)
-    b8__p_be7(rate_eval, tf)
-    b8__he4_he4__weak__wc12(rate_eval, tf)
-    b10__p_be9(rate_eval, tf)
-    b10__he4_li6(rate_eval, tf)
-    b11__n_b10(rate_eval, tf)
-    b11__he4_li7(rate_eval, tf)
-    b12__n_b11(rate_eval, tf)
-    b12__he4_li8(rate_eval, tf)
-    c11__p_b10(rate_eval, tf)
-    c11__he4_be7(rate_eval, tf)
-    c12__n_c11(rate_eval, tf)
-    c12__p_b11(rate_eval, tf)
-    c13__n_c12(rate_eval, tf)
-    c14__n_c13(rate_eval, tf)
-    n12__p_c11(rate_eval, tf)
-    n13__p_c12(rate_eval, tf)
-    n14__n_n13(rate_eval, tf)
-    n14__p_c13(rate_eval, tf)
-    n15__n_n14(rate_eval, tf)
-    n15__p_c14(rate_eval, tf)
-    o14__p_n13(rate_eval, tf)
-    o15__n_o14(rate_eval, tf)
-    o15__p_n14(rate_eval, tf)
-    o16__n_o15(rate_eval, tf)
-    o16__p_n15(rate_eval, tf)
-    o16__he4_c12(rate_eval, tf)
-    li6__n_p_he4(rate_eval, tf)
-    be9__n_he4_he4(rate_eval, tf)
-    c12__he4_he4_he4(rate_eval, tf)
-    n_p__d(rate_eval, tf)
-    p_p__d__weak__bet_pos_(rate_eval, tf)
-    p_p__d__weak__electron_capture(rate_eval, tf)
-    n_d__t(rate_eval, tf)
-    p_d__he3(rate_eval, tf)
-    d_d__he4(rate_eval, tf)
-    he4_d__li6(rate_eval, tf)
-    p_t__he4(rate_eval, tf)
-    he4_t__li7(rate_eval, tf)
-    n_he3__he4(rate_eval, tf)
-    p_he3__he4__weak__bet_pos_(rate_eval, tf)
-    he4_he3__be7(rate_eval, tf)
-    n_li6__li7(rate_eval, tf)
-    p_li6__be7(rate_eval, tf)
-    he4_li6__b10(rate_eval, tf)
-    n_li7__li8(rate_eval, tf)
-    he4_li7__b11(rate_eval, tf)
-    he4_li8__b12(rate_eval, tf)
-    p_be7__b8(rate_eval, tf)
-    he4_be7__c11(rate_eval, tf)
-    p_be9__b10(rate_eval, tf)
-    n_b10__b11(rate_eval, tf)
-    p_b10__c11(rate_eval, tf)
-    n_b11__b12(rate_eval, tf)
-    p_b11__c12(rate_eval, tf)
-    n_c11__c12(rate_eval, tf)
-    p_c11__n12(rate_eval, tf)
-    n_c12__c13(rate_eval, tf)
-    p_c12__n13(rate_eval, tf)
-    he4_c12__o16(rate_eval, tf)
-    n_c13__c14(rate_eval, tf)
-    p_c13__n14(rate_eval, tf)
-    p_c14__n15(rate_eval, tf)
-    n_n13__n14(rate_eval, tf)
-    p_n13__o14(rate_eval, tf)
-    n_n14__n15(rate_eval, tf)
-    p_n14__o15(rate_eval, tf)
-    p_n15__o16(rate_eval, tf)
-    n_o14__o15(rate_eval, tf)
-    n_o15__o16(rate_eval, tf)
-    d_d__n_he3(rate_eval, tf)
-    d_d__p_t(rate_eval, tf)
-    p_t__n_he3(rate_eval, tf)
-    p_t__d_d(rate_eval, tf)
-    d_t__n_he4(rate_eval, tf)
-    he4_t__n_li6(rate_eval, tf)
-    n_he3__p_t(rate_eval, tf)
-    n_he3__d_d(rate_eval, tf)
-    d_he3__p_he4(rate_eval, tf)
-    t_he3__d_he4(rate_eval, tf)
-    he4_he3__p_li6(rate_eval, tf)
-    n_he4__d_t(rate_eval, tf)
-    p_he4__d_he3(rate_eval, tf)
-    d_he4__t_he3(rate_eval, tf)
-    he4_he4__n_be7(rate_eval, tf)
-    he4_he4__p_li7(rate_eval, tf)
-    n_li6__he4_t(rate_eval, tf)
-    p_li6__he4_he3(rate_eval, tf)
-    d_li6__n_be7(rate_eval, tf)
-    d_li6__p_li7(rate_eval, tf)
-    he4_li6__p_be9(rate_eval, tf)
-    p_li7__n_be7(rate_eval, tf)
-    p_li7__d_li6(rate_eval, tf)
-    p_li7__he4_he4(rate_eval, tf)
-    d_li7__p_li8(rate_eval, tf)
-    t_li7__n_be9(rate_eval, tf)
-    t_li7__d_li8(rate_eval, tf)
-    he4_li7__n_b10(rate_eval, tf)
-    p_li8__d_li7(rate_eval, tf)
-    d_li8__n_be9(rate_eval, tf)
-    d_li8__t_li7(rate_eval, tf)
-    he4_li8__n_b11(rate_eval, tf)
-    n_be7__p_li7(rate_eval, tf)
-    n_be7__d_li6(rate_eval, tf)
-    n_be7__he4_he4(rate_eval, tf)
-    he4_be7__p_b10(rate_eval, tf)
-    n_be9__d_li8(rate_eval, tf)
-    n_be9__t_li7(rate_eval, tf)
-    p_be9__he4_li6(rate_eval, tf)
-    t_be9__n_b11(rate_eval, tf)
-    he4_be9__n_c12(rate_eval, tf)
-    he4_be9__p_b12(rate_eval, tf)
-    he4_b8__p_c11(rate_eval, tf)
-    n_b10__he4_li7(rate_eval, tf)
-    p_b10__he4_be7(rate_eval, tf)
-    he4_b10__n_n13(rate_eval, tf)
-    he4_b10__p_c13(rate_eval, tf)
-    n_b11__t_be9(rate_eval, tf)
-    n_b11__he4_li8(rate_eval, tf)
-    p_b11__n_c11(rate_eval, tf)
-    he4_b11__n_n14(rate_eval, tf)
-    he4_b11__p_c14(rate_eval, tf)
-    p_b12__n_c12(rate_eval, tf)
-    p_b12__he4_be9(rate_eval, tf)
-    he4_b12__n_n15(rate_eval, tf)
-    n_c11__p_b11(rate_eval, tf)
-    p_c11__he4_b8(rate_eval, tf)
-    he4_c11__n_o14(rate_eval, tf)
-    he4_c11__p_n14(rate_eval, tf)
-    n_c12__p_b12(rate_eval, tf)
-    n_c12__he4_be9(rate_eval, tf)
-    he4_c12__n_o15(rate_eval, tf)
-    he4_c12__p_n15(rate_eval, tf)
-    p_c13__n_n13(rate_eval, tf)
-    p_c13__he4_b10(rate_eval, tf)
-    d_c13__n_n14(rate_eval, tf)
-    he4_c13__n_o16(rate_eval, tf)
-    p_c14__n_n14(rate_eval, tf)
-    p_c14__he4_b11(rate_eval, tf)
-    d_c14__n_n15(rate_eval, tf)
-    he4_n12__p_o15(rate_eval, tf)
-    n_n13__p_c13(rate_eval, tf)
-    n_n13__he4_b10(rate_eval, tf)
-    he4_n13__p_o16(rate_eval, tf)
-    n_n14__p_c14(rate_eval, tf)
-    n_n14__d_c13(rate_eval, tf)
-    n_n14__he4_b11(rate_eval, tf)
-    p_n14__n_o14(rate_eval, tf)
-    p_n14__he4_c11(rate_eval, tf)
-    n_n15__d_c14(rate_eval, tf)
-    n_n15__he4_b12(rate_eval, tf)
-    p_n15__n_o15(rate_eval, tf)
-    p_n15__he4_c12(rate_eval, tf)
-    n_o14__p_n14(rate_eval, tf)
-    n_o14__he4_c11(rate_eval, tf)
-    n_o15__p_n15(rate_eval, tf)
-    n_o15__he4_c12(rate_eval, tf)
-    p_o15__he4_n12(rate_eval, tf)
-    n_o16__he4_c13(rate_eval, tf)
-    p_o16__he4_n13(rate_eval, tf)
-    p_d__n_p_p(rate_eval, tf)
-    t_t__n_n_he4(rate_eval, tf)
-    t_he3__n_p_he4(rate_eval, tf)
-    he3_he3__p_p_he4(rate_eval, tf)
-    d_li7__n_he4_he4(rate_eval, tf)
-    p_li8__n_he4_he4(rate_eval, tf)
-    d_be7__p_he4_he4(rate_eval, tf)
-    p_be9__d_he4_he4(rate_eval, tf)
-    n_b8__p_he4_he4(rate_eval, tf)
-    p_b11__he4_he4_he4(rate_eval, tf)
-    n_c11__he4_he4_he4(rate_eval, tf)
-    t_li7__n_n_he4_he4(rate_eval, tf)
-    he3_li7__n_p_he4_he4(rate_eval, tf)
-    t_be7__n_p_he4_he4(rate_eval, tf)
-    he3_be7__p_p_he4_he4(rate_eval, tf)
-    p_be9__n_p_he4_he4(rate_eval, tf)
-    n_p_he4__li6(rate_eval, tf)
-    n_he4_he4__be9(rate_eval, tf)
-    he4_he4_he4__c12(rate_eval, tf)
-    n_p_p__p_d(rate_eval, tf)
-    n_n_he4__t_t(rate_eval, tf)
-    n_p_he4__t_he3(rate_eval, tf)
-    p_p_he4__he3_he3(rate_eval, tf)
-    n_he4_he4__p_li8(rate_eval, tf)
-    n_he4_he4__d_li7(rate_eval, tf)
-    p_he4_he4__n_b8(rate_eval, tf)
-    p_he4_he4__d_be7(rate_eval, tf)
-    d_he4_he4__p_be9(rate_eval, tf)
-    he4_he4_he4__n_c11(rate_eval, tf)
-    he4_he4_he4__p_b11(rate_eval, tf)
-    n_n_he4_he4__t_li7(rate_eval, tf)
-    n_p_he4_he4__he3_li7(rate_eval, tf)
-    n_p_he4_he4__t_be7(rate_eval, tf)
-    n_p_he4_he4__p_be9(rate_eval, tf)
-    p_p_he4_he4__he3_be7(rate_eval, tf)
-
-    # custom rates
-    p__n(rate_eval, tf)
-    n__p(rate_eval, tf)
-
-    if screen_func is not None:
-        plasma_state = PlasmaState(T, rho, Y, Z)
-
-        scn_fac = ScreenFactors(1, 1, 1, 1)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_p__d__weak__bet_pos_ *= scor
-        rate_eval.p_p__d__weak__electron_capture *= scor
-        rate_eval.n_p_p__p_d *= scor
-        rate_eval.p_p_he4_he4__he3_be7 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 1, 2)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_d__he3 *= scor
-        rate_eval.p_d__n_p_p *= scor
-
-        scn_fac = ScreenFactors(1, 2, 1, 2)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_d__he4 *= scor
-        rate_eval.d_d__n_he3 *= scor
-        rate_eval.d_d__p_t *= scor
-
-        scn_fac = ScreenFactors(1, 2, 2, 4)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_d__li6 *= scor
-        rate_eval.d_he4__t_he3 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 1, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_t__he4 *= scor
-        rate_eval.p_t__n_he3 *= scor
-        rate_eval.p_t__d_d *= scor
-
-        scn_fac = ScreenFactors(1, 3, 2, 4)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_t__li7 *= scor
-        rate_eval.he4_t__n_li6 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 2, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_he3__he4__weak__bet_pos_ *= scor
-
-        scn_fac = ScreenFactors(2, 4, 2, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_he3__be7 *= scor
-        rate_eval.he4_he3__p_li6 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 3, 6)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_li6__be7 *= scor
-        rate_eval.p_li6__he4_he3 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 3, 6)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_li6__b10 *= scor
-        rate_eval.he4_li6__p_be9 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 3, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_li7__b11 *= scor
-        rate_eval.he4_li7__n_b10 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 3, 8)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_li8__b12 *= scor
-        rate_eval.he4_li8__n_b11 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 4, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_be7__b8 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 4, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_be7__c11 *= scor
-        rate_eval.he4_be7__p_b10 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 4, 9)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_be9__b10 *= scor
-        rate_eval.p_be9__he4_li6 *= scor
-        rate_eval.p_be9__d_he4_he4 *= scor
-        rate_eval.p_be9__n_p_he4_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 5, 10)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_b10__c11 *= scor
-        rate_eval.p_b10__he4_be7 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 5, 11)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_b11__c12 *= scor
-        rate_eval.p_b11__n_c11 *= scor
-        rate_eval.p_b11__he4_he4_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 6, 11)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_c11__n12 *= scor
-        rate_eval.p_c11__he4_b8 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 6, 12)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_c12__n13 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 6, 12)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_c12__o16 *= scor
-        rate_eval.he4_c12__n_o15 *= scor
-        rate_eval.he4_c12__p_n15 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 6, 13)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_c13__n14 *= scor
-        rate_eval.p_c13__n_n13 *= scor
-        rate_eval.p_c13__he4_b10 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 6, 14)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_c14__n15 *= scor
-        rate_eval.p_c14__n_n14 *= scor
-        rate_eval.p_c14__he4_b11 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 7, 13)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_n13__o14 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 7, 14)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_n14__o15 *= scor
-        rate_eval.p_n14__n_o14 *= scor
-        rate_eval.p_n14__he4_c11 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 7, 15)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_n15__o16 *= scor
-        rate_eval.p_n15__n_o15 *= scor
-        rate_eval.p_n15__he4_c12 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 1, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_t__n_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 2, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_he3__p_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 3, 2, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.t_he3__d_he4 *= scor
-        rate_eval.t_he3__n_p_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 2, 4)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_he4__d_he3 *= scor
-        rate_eval.n_p_he4__li6 *= scor
-        rate_eval.n_p_he4__t_he3 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 2, 4)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_he4__n_be7 *= scor
-        rate_eval.he4_he4__p_li7 *= scor
-        rate_eval.n_he4_he4__be9 *= scor
-        rate_eval.n_he4_he4__p_li8 *= scor
-        rate_eval.n_he4_he4__d_li7 *= scor
-        rate_eval.n_n_he4_he4__t_li7 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 3, 6)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_li6__n_be7 *= scor
-        rate_eval.d_li6__p_li7 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 3, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_li7__n_be7 *= scor
-        rate_eval.p_li7__d_li6 *= scor
-        rate_eval.p_li7__he4_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 3, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_li7__p_li8 *= scor
-        rate_eval.d_li7__n_he4_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 3, 3, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.t_li7__n_be9 *= scor
-        rate_eval.t_li7__d_li8 *= scor
-        rate_eval.t_li7__n_n_he4_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 3, 8)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_li8__d_li7 *= scor
-        rate_eval.p_li8__n_he4_he4 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 3, 8)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_li8__n_be9 *= scor
-        rate_eval.d_li8__t_li7 *= scor
-
-        scn_fac = ScreenFactors(1, 3, 4, 9)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.t_be9__n_b11 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 4, 9)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_be9__n_c12 *= scor
-        rate_eval.he4_be9__p_b12 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 5, 8)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_b8__p_c11 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 5, 10)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_b10__n_n13 *= scor
-        rate_eval.he4_b10__p_c13 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 5, 11)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_b11__n_n14 *= scor
-        rate_eval.he4_b11__p_c14 *= scor
-
-        scn_fac = ScreenFactors(1, 1, 5, 12)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_b12__n_c12 *= scor
-        rate_eval.p_b12__he4_be9 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 5, 12)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_b12__n_n15 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 6, 11)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_c11__n_o14 *= scor
-        rate_eval.he4_c11__p_n14 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 6, 13)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_c13__n_n14 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 6, 13)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_c13__n_o16 *= scor
-
-        scn_fac = ScreenFactors(1, 2, 6, 14)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_c14__n_n15 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 7, 12)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_n12__p_o15 *= scor
-
-        scn_fac = ScreenFactors(2, 4, 7, 13)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he4_n13__p_o16 *= scor
+       )
 
-        scn_fac = ScreenFactors(1, 1, 8, 15)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_o15__he4_n12 *= scor
+    dYdt[jc11] = (
+       -Y[jc11]*rate_eval.c11__b11__weak__wc12
+       -Y[jc11]*rate_eval.c11__p_b10
+       -Y[jc11]*rate_eval.c11__he4_be7
+       -rho*Y[jn]*Y[jc11]*rate_eval.n_c11__c12
+       -rho*Y[jp]*Y[jc11]*rate_eval.p_c11__n12
+       -rho*Y[jn]*Y[jc11]*rate_eval.n_c11__p_b11
+       -rho*Y[jp]*Y[jc11]*rate_eval.p_c11__he4_b8
+       -rho*Y[jhe4]*Y[jc11]*rate_eval.he4_c11__n_o14
+       -rho*Y[jhe4]*Y[jc11]*rate_eval.he4_c11__p_n14
+       -rho*Y[jn]*Y[jc11]*rate_eval.n_c11__he4_he4_he4
+       +Y[jc12]*rate_eval.c12__n_c11
+       +Y[jn12]*rate_eval.n12__p_c11
+       +rho*Y[jhe4]*Y[jbe7]*rate_eval.he4_be7__c11
+       +rho*Y[jp]*Y[jb10]*rate_eval.p_b10__c11
+       +rho*Y[jhe4]*Y[jb8]*rate_eval.he4_b8__p_c11
+       +rho*Y[jp]*Y[jb11]*rate_eval.p_b11__n_c11
+       +rho*Y[jp]*Y[jn14]*rate_eval.p_n14__he4_c11
+       +rho*Y[jn]*Y[jo14]*rate_eval.n_o14__he4_c11
+       +1.66666666666667e-01*rho**2*Y[jhe4]**3*rate_eval.he4_he4_he4__n_c11
+       )
 
-        scn_fac = ScreenFactors(1, 1, 8, 16)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_o16__he4_n13 *= scor
+    dYdt[jc12] = (
+       -Y[jc12]*rate_eval.c12__n_c11
+       -Y[jc12]*rate_eval.c12__p_b11
+       -Y[jc12]*rate_eval.c12__he4_he4_he4
+       -rho*Y[jn]*Y[jc12]*rate_eval.n_c12__c13
+       -rho*Y[jp]*Y[jc12]*rate_eval.p_c12__n13
+       -rho*Y[jhe4]*Y[jc12]*rate_eval.he4_c12__o16
+       -rho*Y[jn]*Y[jc12]*rate_eval.n_c12__p_b12
+       -rho*Y[jn]*Y[jc12]*rate_eval.n_c12__he4_be9
+       -rho*Y[jhe4]*Y[jc12]*rate_eval.he4_c12__n_o15
+       -rho*Y[jhe4]*Y[jc12]*rate_eval.he4_c12__p_n15
+       +Y[jb12]*rate_eval.b12__c12__weak__wc17
+       +Y[jn12]*rate_eval.n12__c12__weak__wc12
+       +Y[jc13]*rate_eval.c13__n_c12
+       +Y[jn13]*rate_eval.n13__p_c12
+       +Y[jo16]*rate_eval.o16__he4_c12
+       +rho*Y[jp]*Y[jb11]*rate_eval.p_b11__c12
+       +rho*Y[jn]*Y[jc11]*rate_eval.n_c11__c12
+       +rho*Y[jhe4]*Y[jbe9]*rate_eval.he4_be9__n_c12
+       +rho*Y[jp]*Y[jb12]*rate_eval.p_b12__n_c12
+       +rho*Y[jp]*Y[jn15]*rate_eval.p_n15__he4_c12
+       +rho*Y[jn]*Y[jo15]*rate_eval.n_o15__he4_c12
+       +1.66666666666667e-01*rho**2*Y[jhe4]**3*rate_eval.he4_he4_he4__c12
+       )
 
-        scn_fac = ScreenFactors(1, 3, 1, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.t_t__n_n_he4 *= scor
+    dYdt[jc13] = (
+       -Y[jc13]*rate_eval.c13__n_c12
+       -rho*Y[jn]*Y[jc13]*rate_eval.n_c13__c14
+       -rho*Y[jp]*Y[jc13]*rate_eval.p_c13__n14
+       -rho*Y[jp]*Y[jc13]*rate_eval.p_c13__n_n13
+       -rho*Y[jp]*Y[jc13]*rate_eval.p_c13__he4_b10
+       -rho*Y[jd]*Y[jc13]*rate_eval.d_c13__n_n14
+       -rho*Y[jhe4]*Y[jc13]*rate_eval.he4_c13__n_o16
+       +Y[jn13]*rate_eval.n13__c13__weak__wc12
+       +Y[jc14]*rate_eval.c14__n_c13
+       +Y[jn14]*rate_eval.n14__p_c13
+       +rho*Y[jn]*Y[jc12]*rate_eval.n_c12__c13
+       +rho*Y[jhe4]*Y[jb10]*rate_eval.he4_b10__p_c13
+       +rho*Y[jn]*Y[jn13]*rate_eval.n_n13__p_c13
+       +rho*Y[jn]*Y[jn14]*rate_eval.n_n14__d_c13
+       +rho*Y[jn]*Y[jo16]*rate_eval.n_o16__he4_c13
+       )
 
-        scn_fac = ScreenFactors(2, 3, 2, 3)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he3_he3__p_p_he4 *= scor
+    dYdt[jc14] = (
+       -Y[jc14]*rate_eval.c14__n14__weak__wc12
+       -Y[jc14]*rate_eval.c14__n_c13
+       -rho*Y[jp]*Y[jc14]*rate_eval.p_c14__n15
+       -rho*Y[jp]*Y[jc14]*rate_eval.p_c14__n_n14
+       -rho*Y[jp]*Y[jc14]*rate_eval.p_c14__he4_b11
+       -rho*Y[jd]*Y[jc14]*rate_eval.d_c14__n_n15
+       +Y[jn15]*rate_eval.n15__p_c14
+       +rho*Y[jn]*Y[jc13]*rate_eval.n_c13__c14
+       +rho*Y[jhe4]*Y[jb11]*rate_eval.he4_b11__p_c14
+       +rho*Y[jn]*Y[jn14]*rate_eval.n_n14__p_c14
+       +rho*Y[jn]*Y[jn15]*rate_eval.n_n15__d_c14
+       )
 
-        scn_fac = ScreenFactors(1, 2, 4, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_be7__p_he4_he4 *= scor
+    dYdt[jn12] = (
+       -Y[jn12]*rate_eval.n12__c12__weak__wc12
+       -Y[jn12]*rate_eval.n12__p_c11
+       -rho*Y[jhe4]*Y[jn12]*rate_eval.he4_n12__p_o15
+       +rho*Y[jp]*Y[jc11]*rate_eval.p_c11__n12
+       +rho*Y[jp]*Y[jo15]*rate_eval.p_o15__he4_n12
+       )
 
-        scn_fac = ScreenFactors(2, 3, 3, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he3_li7__n_p_he4_he4 *= scor
+    dYdt[jn13] = (
+       -Y[jn13]*rate_eval.n13__c13__weak__wc12
+       -Y[jn13]*rate_eval.n13__p_c12
+       -rho*Y[jn]*Y[jn13]*rate_eval.n_n13__n14
+       -rho*Y[jp]*Y[jn13]*rate_eval.p_n13__o14
+       -rho*Y[jn]*Y[jn13]*rate_eval.n_n13__p_c13
+       -rho*Y[jn]*Y[jn13]*rate_eval.n_n13__he4_b10
+       -rho*Y[jhe4]*Y[jn13]*rate_eval.he4_n13__p_o16
+       +Y[jn14]*rate_eval.n14__n_n13
+       +Y[jo14]*rate_eval.o14__p_n13
+       +rho*Y[jp]*Y[jc12]*rate_eval.p_c12__n13
+       +rho*Y[jhe4]*Y[jb10]*rate_eval.he4_b10__n_n13
+       +rho*Y[jp]*Y[jc13]*rate_eval.p_c13__n_n13
+       +rho*Y[jp]*Y[jo16]*rate_eval.p_o16__he4_n13
+       )
 
-        scn_fac = ScreenFactors(1, 3, 4, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.t_be7__n_p_he4_he4 *= scor
+    dYdt[jn14] = (
+       -Y[jn14]*rate_eval.n14__n_n13
+       -Y[jn14]*rate_eval.n14__p_c13
+       -rho*Y[jn]*Y[jn14]*rate_eval.n_n14__n15
+       -rho*Y[jp]*Y[jn14]*rate_eval.p_n14__o15
+       -rho*Y[jn]*Y[jn14]*rate_eval.n_n14__p_c14
+       -rho*Y[jn]*Y[jn14]*rate_eval.n_n14__d_c13
+       -rho*Y[jn]*Y[jn14]*rate_eval.n_n14__he4_b11
+       -rho*Y[jp]*Y[jn14]*rate_eval.p_n14__n_o14
+       -rho*Y[jp]*Y[jn14]*rate_eval.p_n14__he4_c11
+       +Y[jc14]*rate_eval.c14__n14__weak__wc12
+       +Y[jo14]*rate_eval.o14__n14__weak__wc12
+       +Y[jn15]*rate_eval.n15__n_n14
+       +Y[jo15]*rate_eval.o15__p_n14
+       +rho*Y[jp]*Y[jc13]*rate_eval.p_c13__n14
+       +rho*Y[jn]*Y[jn13]*rate_eval.n_n13__n14
+       +rho*Y[jhe4]*Y[jb11]*rate_eval.he4_b11__n_n14
+       +rho*Y[jhe4]*Y[jc11]*rate_eval.he4_c11__p_n14
+       +rho*Y[jd]*Y[jc13]*rate_eval.d_c13__n_n14
+       +rho*Y[jp]*Y[jc14]*rate_eval.p_c14__n_n14
+       +rho*Y[jn]*Y[jo14]*rate_eval.n_o14__p_n14
+       )
 
-        scn_fac = ScreenFactors(2, 3, 4, 7)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.he3_be7__p_p_he4_he4 *= scor
+    dYdt[jn15] = (
+       -Y[jn15]*rate_eval.n15__n_n14
+       -Y[jn15]*rate_eval.n15__p_c14
+       -rho*Y[jp]*Y[jn15]*rate_eval.p_n15__o16
+       -rho*Y[jn]*Y[jn15]*rate_eval.n_n15__d_c14
+       -rho*Y[jn]*Y[jn15]*rate_eval.n_n15__he4_b12
+       -rho*Y[jp]*Y[jn15]*rate_eval.p_n15__n_o15
+       -rho*Y[jp]*Y[jn15]*rate_eval.p_n15__he4_c12
+       +Y[jo15]*rate_eval.o15__n15__weak__wc12
+       +Y[jo16]*rate_eval.o16__p_n15
+       +rho*Y[jp]*Y[jc14]*rate_eval.p_c14__n15
+       +rho*Y[jn]*Y[jn14]*rate_eval.n_n14__n15
+       +rho*Y[jhe4]*Y[jb12]*rate_eval.he4_b12__n_n15
+       +rho*Y[jhe4]*Y[jc12]*rate_eval.he4_c12__p_n15
+       +rho*Y[jd]*Y[jc14]*rate_eval.d_c14__n_n15
+       +rho*Y[jn]*Y[jo15]*rate_eval.n_o15__p_n15
+       )
 
-        scn_fac = ScreenFactors(2, 4, 2, 4)
-        scor = screen_func(plasma_state, scn_fac)
-        scn_fac2 = ScreenFactors(2, 4, 4, 8)
-        scor2 = screen_func(plasma_state, scn_fac2)
-        rate_eval.he4_he4_he4__c12 *= scor * scor2
-        rate_eval.he4_he4_he4__n_c11 *= scor * scor2
-        rate_eval.he4_he4_he4__p_b11 *= scor * scor2
+    dYdt[jo14] = (
+       -Y[jo14]*rate_eval.o14__n14__weak__wc12
+       -Y[jo14]*rate_eval.o14__p_n13
+       -rho*Y[jn]*Y[jo14]*rate_eval.n_o14__o15
+       -rho*Y[jn]*Y[jo14]*rate_eval.n_o14__p_n14
+       -rho*Y[jn]*Y[jo14]*rate_eval.n_o14__he4_c11
+       +Y[jo15]*rate_eval.o15__n_o14
+       +rho*Y[jp]*Y[jn13]*rate_eval.p_n13__o14
+       +rho*Y[jhe4]*Y[jc11]*rate_eval.he4_c11__n_o14
+       +rho*Y[jp]*Y[jn14]*rate_eval.p_n14__n_o14
+       )
 
-        scn_fac = ScreenFactors(1, 1, 1, 1)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_p_he4__he3_he3 *= scor
+    dYdt[jo15] = (
+       -Y[jo15]*rate_eval.o15__n15__weak__wc12
+       -Y[jo15]*rate_eval.o15__n_o14
+       -Y[jo15]*rate_eval.o15__p_n14
+       -rho*Y[jn]*Y[jo15]*rate_eval.n_o15__o16
+       -rho*Y[jn]*Y[jo15]*rate_eval.n_o15__p_n15
+       -rho*Y[jn]*Y[jo15]*rate_eval.n_o15__he4_c12
+       -rho*Y[jp]*Y[jo15]*rate_eval.p_o15__he4_n12
+       +Y[jo16]*rate_eval.o16__n_o15
+       +rho*Y[jp]*Y[jn14]*rate_eval.p_n14__o15
+       +rho*Y[jn]*Y[jo14]*rate_eval.n_o14__o15
+       +rho*Y[jhe4]*Y[jc12]*rate_eval.he4_c12__n_o15
+       +rho*Y[jhe4]*Y[jn12]*rate_eval.he4_n12__p_o15
+       +rho*Y[jp]*Y[jn15]*rate_eval.p_n15__n_o15
+       )
 
-        scn_fac = ScreenFactors(1, 1, 2, 4)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.p_he4_he4__n_b8 *= scor
-        rate_eval.p_he4_he4__d_be7 *= scor
-        rate_eval.n_p_he4_he4__he3_li7 *= scor
-        rate_eval.n_p_he4_he4__t_be7 *= scor
-        rate_eval.n_p_he4_he4__p_be9 *= scor
+    dYdt[jo16] = (
+       -Y[jo16]*rate_eval.o16__n_o15
+       -Y[jo16]*rate_eval.o16__p_n15
+       -Y[jo16]*rate_eval.o16__he4_c12
+       -rho*Y[jn]*Y[jo16]*rate_eval.n_o16__he4_c13
+       -rho*Y[jp]*Y[jo16]*rate_eval.p_o16__he4_n13
+       +rho*Y[jhe4]*Y[jc12]*rate_eval.he4_c12__o16
+       +rho*Y[jp]*Y[jn15]*rate_eval.p_n15__o16
+       +rho*Y[jn]*Y[jo15]*rate_eval.n_o15__o16
+       +rho*Y[jhe4]*Y[jc13]*rate_eval.he4_c13__n_o16
+       +rho*Y[jhe4]*Y[jn13]*rate_eval.he4_n13__p_o16
+       )
 
-        scn_fac = ScreenFactors(1, 2, 2, 4)
-        scor = screen_func(plasma_state, scn_fac)
-        rate_eval.d_he4_he4__p_be9 *= scor
+    return dYdt
+
+@numba.njit()
+def jacobian_rates_eq(Y, rho, rate_eval):
 
     jac = np.zeros((nnuc, nnuc), dtype=np.float64)
 
@@ -7748,27 +7172,601 @@ def jacobian_eq(t, Y, rho, T, screen_func):
 
     return jac
 
-#For AoT compilation of the network
-def AoT(networkname):
-   from numba.pycc import CC
+@numba.njit()
+def rhs_eq(t, Y, rho, T, screen_func):
+    rate_eval = rates_eq(T)
+    screen_rates(rate_eval, Y, rho, T, screen_func)
+    return rhs_rates_eq(Y, rho, rate_eval)
+
+@numba.njit()
+def jacobian_eq(t, Y, rho, T, screen_func):
+    rate_eval = rates_eq(T)
+    screen_rates(rate_eval, Y, rho, T, screen_func)
+    return jacobian_rates_eq(Y, rho, rate_eval)
+
+@numba.njit()
+def rhs_jac_eq(t, Y, rho, T, screen_func):
+    rate_eval = rates_eq(T)
+    screen_rates(rate_eval, Y, rho, T, screen_func)
+    return rhs_rates_eq(Y, rho, rate_eval), jacobian_rates_eq(Y, rho, rate_eval)
+
+# temperature and rates of the last call to rates, rhs and jacobian at the
+# same temperature share them (only without screening, which depends on Y)
+_last_rates = [None, None]
+
+def rates(T):
+    """the rates at temperature T, only evaluated if T changed since the last call"""
+    if T != _last_rates[0]:
+        _last_rates[1] = rates_eq(T)
+        _last_rates[0] = T
+    return _last_rates[1]
+
+def rhs(t, Y, rho, T, screen_func=None):
+    if screen_func is not None:
+        return rhs_eq(t, Y, rho, T, screen_func)
+    return rhs_rates_eq(Y, rho, rates(T))
+
+def jacobian(t, Y, rho, T, screen_func=None):
+    if screen_func is not None:
+        return jacobian_eq(t, Y, rho, T, screen_func)
+    return jacobian_rates_eq(Y, rho, rates(T))
+
+def rhs_and_jacobian(t, Y, rho, T, screen_func=None):
+    """rhs and jacobian from a single evaluation of the rates"""
+    if screen_func is not None:
+        return rhs_jac_eq(t, Y, rho, T, screen_func)
+    rate_eval = rates(T)
+    return rhs_rates_eq(Y, rho, rate_eval), jacobian_rates_eq(Y, rho, rate_eval)
+
+nrates = 219
+
+@numba.njit()
+def rates_to_array(rate_eval):
+    rates = np.empty(nrates, dtype=np.float64)
+    rates[0] = rate_eval.t__he3__weak__wc12
+    rates[1] = rate_eval.he3__t__weak__electron_capture
+    rates[2] = rate_eval.be7__li7__weak__electron_capture
+    rates[3] = rate_eval.b12__c12__weak__wc17
+    rates[4] = rate_eval.c11__b11__weak__wc12
+    rates[5] = rate_eval.c14__n14__weak__wc12
+    rates[6] = rate_eval.n12__c12__weak__wc12
+    rates[7] = rate_eval.n13__c13__weak__wc12
+    rates[8] = rate_eval.o14__n14__weak__wc12
+    rates[9] = rate_eval.o15__n15__weak__wc12
+    rates[10] = rate_eval.d__n_p
+    rates[11] = rate_eval.t__n_d
+    rates[12] = rate_eval.he3__p_d
+    rates[13] = rate_eval.he4__n_he3
+    rates[14] = rate_eval.he4__p_t
+    rates[15] = rate_eval.he4__d_d
+    rates[16] = rate_eval.li6__he4_d
+    rates[17] = rate_eval.li7__n_li6
+    rates[18] = rate_eval.li7__he4_t
+    rates[19] = rate_eval.li8__n_li7
+    rates[20] = rate_eval.li8__he4_he4__weak__wc12
+    rates[21] = rate_eval.be7__p_li6
+    rates[22] = rate_eval.be7__he4_he3
+    rates[23] = rate_eval.b8__p_be7
+    rates[24] = rate_eval.b8__he4_he4__weak__wc12
+    rates[25] = rate_eval.b10__p_be9
+    rates[26] = rate_eval.b10__he4_li6
+    rates[27] = rate_eval.b11__n_b10
+    rates[28] = rate_eval.b11__he4_li7
+    rates[29] = rate_eval.b12__n_b11
+    rates[30] = rate_eval.b12__he4_li8
+    rates[31] = rate_eval.c11__p_b10
+    rates[32] = rate_eval.c11__he4_be7
+    rates[33] = rate_eval.c12__n_c11
+    rates[34] = rate_eval.c12__p_b11
+    rates[35] = rate_eval.c13__n_c12
+    rates[36] = rate_eval.c14__n_c13
+    rates[37] = rate_eval.n12__p_c11
+    rates[38] = rate_eval.n13__p_c12
+    rates[39] = rate_eval.n14__n_n13
+    rates[40] = rate_eval.n14__p_c13
+    rates[41] = rate_eval.n15__n_n14
+    rates[42] = rate_eval.n15__p_c14
+    rates[43] = rate_eval.o14__p_n13
+    rates[44] = rate_eval.o15__n_o14
+    rates[45] = rate_eval.o15__p_n14
+    rates[46] = rate_eval.o16__n_o15
+    rates[47] = rate_eval.o16__p_n15
+    rates[48] = rate_eval.o16__he4_c12
+    rates[49] = rate_eval.li6__n_p_he4
+    rates[50] = rate_eval.be9__n_he4_he4
+    rates[51] = rate_eval.c12__he4_he4_he4
+    rates[52] = rate_eval.n_p__d
+    rates[53] = rate_eval.p_p__d__weak__bet_pos_
+    rates[54] = rate_eval.p_p__d__weak__electron_capture
+    rates[55] = rate_eval.n_d__t
+    rates[56] = rate_eval.p_d__he3
+    rates[57] = rate_eval.d_d__he4
+    rates[58] = rate_eval.he4_d__li6
+    rates[59] = rate_eval.p_t__he4
+    rates[60] = rate_eval.he4_t__li7
+    rates[61] = rate_eval.n_he3__he4
+    rates[62] = rate_eval.p_he3__he4__weak__bet_pos_
+    rates[63] = rate_eval.he4_he3__be7
+    rates[64] = rate_eval.n_li6__li7
+    rates[65] = rate_eval.p_li6__be7
+    rates[66] = rate_eval.he4_li6__b10
+    rates[67] = rate_eval.n_li7__li8
+    rates[68] = rate_eval.he4_li7__b11
+    rates[69] = rate_eval.he4_li8__b12
+    rates[70] = rate_eval.p_be7__b8
+    rates[71] = rate_eval.he4_be7__c11
+    rates[72] = rate_eval.p_be9__b10
+    rates[73] = rate_eval.n_b10__b11
+    rates[74] = rate_eval.p_b10__c11
+    rates[75] = rate_eval.n_b11__b12
+    rates[76] = rate_eval.p_b11__c12
+    rates[77] = rate_eval.n_c11__c12
+    rates[78] = rate_eval.p_c11__n12
+    rates[79] = rate_eval.n_c12__c13
+    rates[80] = rate_eval.p_c12__n13
+    rates[81] = rate_eval.he4_c12__o16
+    rates[82] = rate_eval.n_c13__c14
+    rates[83] = rate_eval.p_c13__n14
+    rates[84] = rate_eval.p_c14__n15
+    rates[85] = rate_eval.n_n13__n14
+    rates[86] = rate_eval.p_n13__o14
+    rates[87] = rate_eval.n_n14__n15
+    rates[88] = rate_eval.p_n14__o15
+    rates[89] = rate_eval.p_n15__o16
+    rates[90] = rate_eval.n_o14__o15
+    rates[91] = rate_eval.n_o15__o16
+    rates[92] = rate_eval.d_d__n_he3
+    rates[93] = rate_eval.d_d__p_t
+    rates[94] = rate_eval.p_t__n_he3
+    rates[95] = rate_eval.p_t__d_d
+    rates[96] = rate_eval.d_t__n_he4
+    rates[97] = rate_eval.he4_t__n_li6
+    rates[98] = rate_eval.n_he3__p_t
+    rates[99] = rate_eval.n_he3__d_d
+    rates[100] = rate_eval.d_he3__p_he4
+    rates[101] = rate_eval.t_he3__d_he4
+    rates[102] = rate_eval.he4_he3__p_li6
+    rates[103] = rate_eval.n_he4__d_t
+    rates[104] = rate_eval.p_he4__d_he3
+    rates[105] = rate_eval.d_he4__t_he3
+    rates[106] = rate_eval.he4_he4__n_be7
+    rates[107] = rate_eval.he4_he4__p_li7
+    rates[108] = rate_eval.n_li6__he4_t
+    rates[109] = rate_eval.p_li6__he4_he3
+    rates[110] = rate_eval.d_li6__n_be7
+    rates[111] = rate_eval.d_li6__p_li7
+    rates[112] = rate_eval.he4_li6__p_be9
+    rates[113] = rate_eval.p_li7__n_be7
+    rates[114] = rate_eval.p_li7__d_li6
+    rates[115] = rate_eval.p_li7__he4_he4
+    rates[116] = rate_eval.d_li7__p_li8
+    rates[117] = rate_eval.t_li7__n_be9
+    rates[118] = rate_eval.t_li7__d_li8
+    rates[119] = rate_eval.he4_li7__n_b10
+    rates[120] = rate_eval.p_li8__d_li7
+    rates[121] = rate_eval.d_li8__n_be9
+    rates[122] = rate_eval.d_li8__t_li7
+    rates[123] = rate_eval.he4_li8__n_b11
+    rates[124] = rate_eval.n_be7__p_li7
+    rates[125] = rate_eval.n_be7__d_li6
+    rates[126] = rate_eval.n_be7__he4_he4
+    rates[127] = rate_eval.he4_be7__p_b10
+    rates[128] = rate_eval.n_be9__d_li8
+    rates[129] = rate_eval.n_be9__t_li7
+    rates[130] = rate_eval.p_be9__he4_li6
+    rates[131] = rate_eval.t_be9__n_b11
+    rates[132] = rate_eval.he4_be9__n_c12
+    rates[133] = rate_eval.he4_be9__p_b12
+    rates[134] = rate_eval.he4_b8__p_c11
+    rates[135] = rate_eval.n_b10__he4_li7
+    rates[136] = rate_eval.p_b10__he4_be7
+    rates[137] = rate_eval.he4_b10__n_n13
+    rates[138] = rate_eval.he4_b10__p_c13
+    rates[139] = rate_eval.n_b11__t_be9
+    rates[140] = rate_eval.n_b11__he4_li8
+    rates[141] = rate_eval.p_b11__n_c11
+    rates[142] = rate_eval.he4_b11__n_n14
+    rates[143] = rate_eval.he4_b11__p_c14
+    rates[144] = rate_eval.p_b12__n_c12
+    rates[145] = rate_eval.p_b12__he4_be9
+    rates[146] = rate_eval.he4_b12__n_n15
+    rates[147] = rate_eval.n_c11__p_b11
+    rates[148] = rate_eval.p_c11__he4_b8
+    rates[149] = rate_eval.he4_c11__n_o14
+    rates[150] = rate_eval.he4_c11__p_n14
+    rates[151] = rate_eval.n_c12__p_b12
+    rates[152] = rate_eval.n_c12__he4_be9
+    rates[153] = rate_eval.he4_c12__n_o15
+    rates[154] = rate_eval.he4_c12__p_n15
+    rates[155] = rate_eval.p_c13__n_n13
+    rates[156] = rate_eval.p_c13__he4_b10
+    rates[157] = rate_eval.d_c13__n_n14
+    rates[158] = rate_eval.he4_c13__n_o16
+    rates[159] = rate_eval.p_c14__n_n14
+    rates[160] = rate_eval.p_c14__he4_b11
+    rates[161] = rate_eval.d_c14__n_n15
+    rates[162] = rate_eval.he4_n12__p_o15
+    rates[163] = rate_eval.n_n13__p_c13
+    rates[164] = rate_eval.n_n13__he4_b10
+    rates[165] = rate_eval.he4_n13__p_o16
+    rates[166] = rate_eval.n_n14__p_c14
+    rates[167] = rate_eval.n_n14__d_c13
+    rates[168] = rate_eval.n_n14__he4_b11
+    rates[169] = rate_eval.p_n14__n_o14
+    rates[170] = rate_eval.p_n14__he4_c11
+    rates[171] = rate_eval.n_n15__d_c14
+    rates[172] = rate_eval.n_n15__he4_b12
+    rates[173] = rate_eval.p_n15__n_o15
+    rates[174] = rate_eval.p_n15__he4_c12
+    rates[175] = rate_eval.n_o14__p_n14
+    rates[176] = rate_eval.n_o14__he4_c11
+    rates[177] = rate_eval.n_o15__p_n15
+    rates[178] = rate_eval.n_o15__he4_c12
+    rates[179] = rate_eval.p_o15__he4_n12
+    rates[180] = rate_eval.n_o16__he4_c13
+    rates[181] = rate_eval.p_o16__he4_n13
+    rates[182] = rate_eval.p_d__n_p_p
+    rates[183] = rate_eval.t_t__n_n_he4
+    rates[184] = rate_eval.t_he3__n_p_he4
+    rates[185] = rate_eval.he3_he3__p_p_he4
+    rates[186] = rate_eval.d_li7__n_he4_he4
+    rates[187] = rate_eval.p_li8__n_he4_he4
+    rates[188] = rate_eval.d_be7__p_he4_he4
+    rates[189] = rate_eval.p_be9__d_he4_he4
+    rates[190] = rate_eval.n_b8__p_he4_he4
+    rates[191] = rate_eval.p_b11__he4_he4_he4
+    rates[192] = rate_eval.n_c11__he4_he4_he4
+    rates[193] = rate_eval.t_li7__n_n_he4_he4
+    rates[194] = rate_eval.he3_li7__n_p_he4_he4
+    rates[195] = rate_eval.t_be7__n_p_he4_he4
+    rates[196] = rate_eval.he3_be7__p_p_he4_he4
+    rates[197] = rate_eval.p_be9__n_p_he4_he4
+    rates[198] = rate_eval.n_p_he4__li6
+    rates[199] = rate_eval.n_he4_he4__be9
+    rates[200] = rate_eval.he4_he4_he4__c12
+    rates[201] = rate_eval.n_p_p__p_d
+    rates[202] = rate_eval.n_n_he4__t_t
+    rates[203] = rate_eval.n_p_he4__t_he3
+    rates[204] = rate_eval.p_p_he4__he3_he3
+    rates[205] = rate_eval.n_he4_he4__p_li8
+    rates[206] = rate_eval.n_he4_he4__d_li7
+    rates[207] = rate_eval.p_he4_he4__n_b8
+    rates[208] = rate_eval.p_he4_he4__d_be7
+    rates[209] = rate_eval.d_he4_he4__p_be9
+    rates[210] = rate_eval.he4_he4_he4__n_c11
+    rates[211] = rate_eval.he4_he4_he4__p_b11
+    rates[212] = rate_eval.n_n_he4_he4__t_li7
+    rates[213] = rate_eval.n_p_he4_he4__he3_li7
+    rates[214] = rate_eval.n_p_he4_he4__t_be7
+    rates[215] = rate_eval.n_p_he4_he4__p_be9
+    rates[216] = rate_eval.p_p_he4_he4__he3_be7
+    rates[217] = rate_eval.p__n
+    rates[218] = rate_eval.n__p
+    return rates
+
+@numba.njit()
+def rates_from_array(rates):
+    rate_eval = RateEval()
+    rate_eval.t__he3__weak__wc12 = rates[0]
+    rate_eval.he3__t__weak__electron_capture = rates[1]
+    rate_eval.be7__li7__weak__electron_capture = rates[2]
+    rate_eval.b12__c12__weak__wc17 = rates[3]
+    rate_eval.c11__b11__weak__wc12 = rates[4]
+    rate_eval.c14__n14__weak__wc12 = rates[5]
+    rate_eval.n12__c12__weak__wc12 = rates[6]
+    rate_eval.n13__c13__weak__wc12 = rates[7]
+    rate_eval.o14__n14__weak__wc12 = rates[8]
+    rate_eval.o15__n15__weak__wc12 = rates[9]
+    rate_eval.d__n_p = rates[10]
+    rate_eval.t__n_d = rates[11]
+    rate_eval.he3__p_d = rates[12]
+    rate_eval.he4__n_he3 = rates[13]
+    rate_eval.he4__p_t = rates[14]
+    rate_eval.he4__d_d = rates[15]
+    rate_eval.li6__he4_d = rates[16]
+    rate_eval.li7__n_li6 = rates[17]
+    rate_eval.li7__he4_t = rates[18]
+    rate_eval.li8__n_li7 = rates[19]
+    rate_eval.li8__he4_he4__weak__wc12 = rates[20]
+    rate_eval.be7__p_li6 = rates[21]
+    rate_eval.be7__he4_he3 = rates[22]
+    rate_eval.b8__p_be7 = rates[23]
+    rate_eval.b8__he4_he4__weak__wc12 = rates[24]
+    rate_eval.b10__p_be9 = rates[25]
+    rate_eval.b10__he4_li6 = rates[26]
+    rate_eval.b11__n_b10 = rates[27]
+    rate_eval.b11__he4_li7 = rates[28]
+    rate_eval.b12__n_b11 = rates[29]
+    rate_eval.b12__he4_li8 = rates[30]
+    rate_eval.c11__p_b10 = rates[31]
+    rate_eval.c11__he4_be7 = rates[32]
+    rate_eval.c12__n_c11 = rates[33]
+    rate_eval.c12__p_b11 = rates[34]
+    rate_eval.c13__n_c12 = rates[35]
+    rate_eval.c14__n_c13 = rates[36]
+    rate_eval.n12__p_c11 = rates[37]
+    rate_eval.n13__p_c12 = rates[38]
+    rate_eval.n14__n_n13 = rates[39]
+    rate_eval.n14__p_c13 = rates[40]
+    rate_eval.n15__n_n14 = rates[41]
+    rate_eval.n15__p_c14 = rates[42]
+    rate_eval.o14__p_n13 = rates[43]
+    rate_eval.o15__n_o14 = rates[44]
+    rate_eval.o15__p_n14 = rates[45]
+    rate_eval.o16__n_o15 = rates[46]
+    rate_eval.o16__p_n15 = rates[47]
+    rate_eval.o16__he4_c12 = rates[48]
+    rate_eval.li6__n_p_he4 = rates[49]
+    rate_eval.be9__n_he4_he4 = rates[50]
+    rate_eval.c12__he4_he4_he4 = rates[51]
+    rate_eval.n_p__d = rates[52]
+    rate_eval.p_p__d__weak__bet_pos_ = rates[53]
+    rate_eval.p_p__d__weak__electron_capture = rates[54]
+    rate_eval.n_d__t = rates[55]
+    rate_eval.p_d__he3 = rates[56]
+    rate_eval.d_d__he4 = rates[57]
+    rate_eval.he4_d__li6 = rates[58]
+    rate_eval.p_t__he4 = rates[59]
+    rate_eval.he4_t__li7 = rates[60]
+    rate_eval.n_he3__he4 = rates[61]
+    rate_eval.p_he3__he4__weak__bet_pos_ = rates[62]
+    rate_eval.he4_he3__be7 = rates[63]
+    rate_eval.n_li6__li7 = rates[64]
+    rate_eval.p_li6__be7 = rates[65]
+    rate_eval.he4_li6__b10 = rates[66]
+    rate_eval.n_li7__li8 = rates[67]
+    rate_eval.he4_li7__b11 = rates[68]
+    rate_eval.he4_li8__b12 = rates[69]
+    rate_eval.p_be7__b8 = rates[70]
+    rate_eval.he4_be7__c11 = rates[71]
+    rate_eval.p_be9__b10 = rates[72]
+    rate_eval.n_b10__b11 = rates[73]
+    rate_eval.p_b10__c11 = rates[74]
+    rate_eval.n_b11__b12 = rates[75]
+    rate_eval.p_b11__c12 = rates[76]
+    rate_eval.n_c11__c12 = rates[77]
+    rate_eval.p_c11__n12 = rates[78]
+    rate_eval.n_c12__c13 = rates[79]
+    rate_eval.p_c12__n13 = rates[80]
+    rate_eval.he4_c12__o16 = rates[81]
+    rate_eval.n_c13__c14 = rates[82]
+    rate_eval.p_c13__n14 = rates[83]
+    rate_eval.p_c14__n15 = rates[84]
+    rate_eval.n_n13__n14 = rates[85]
+    rate_eval.p_n13__o14 = rates[86]
+    rate_eval.n_n14__n15 = rates[87]
+    rate_eval.p_n14__o15 = rates[88]
+    rate_eval.p_n15__o16 = rates[89]
+    rate_eval.n_o14__o15 = rates[90]
+    rate_eval.n_o15__o16 = rates[91]
+    rate_eval.d_d__n_he3 = rates[92]
+    rate_eval.d_d__p_t = rates[93]
+    rate_eval.p_t__n_he3 = rates[94]
+    rate_eval.p_t__d_d = rates[95]
+    rate_eval.d_t__n_he4 = rates[96]
+    rate_eval.he4_t__n_li6 = rates[97]
+    rate_eval.n_he3__p_t = rates[98]
+    rate_eval.n_he3__d_d = rates[99]
+    rate_eval.d_he3__p_he4 = rates[100]
+    rate_eval.t_he3__d_he4 = rates[101]
+    rate_eval.he4_he3__p_li6 = rates[102]
+    rate_eval.n_he4__d_t = rates[103]
+    rate_eval.p_he4__d_he3 = rates[104]
+    rate_eval.d_he4__t_he3 = rates[105]
+    rate_eval.he4_he4__n_be7 = rates[106]
+    rate_eval.he4_he4__p_li7 = rates[107]
+    rate_eval.n_li6__he4_t = rates[108]
+    rate_eval.p_li6__he4_he3 = rates[109]
+    rate_eval.d_li6__n_be7 = rates[110]
+    rate_eval.d_li6__p_li7 = rates[111]
+    rate_eval.he4_li6__p_be9 = rates[112]
+    rate_eval.p_li7__n_be7 = rates[113]
+    rate_eval.p_li7__d_li6 = rates[114]
+    rate_eval.p_li7__he4_he4 = rates[115]
+    rate_eval.d_li7__p_li8 = rates[116]
+    rate_eval.t_li7__n_be9 = rates[117]
+    rate_eval.t_li7__d_li8 = rates[118]
+    rate_eval.he4_li7__n_b10 = rates[119]
+    rate_eval.p_li8__d_li7 = rates[120]
+    rate_eval.d_li8__n_be9 = rates[121]
+    rate_eval.d_li8__t_li7 = rates[122]
+    rate_eval.he4_li8__n_b11 = rates[123]
+    rate_eval.n_be7__p_li7 = rates[124]
+    rate_eval.n_be7__d_li6 = rates[125]
+    rate_eval.n_be7__he4_he4 = rates[126]
+    rate_eval.he4_be7__p_b10 = rates[127]
+    rate_eval.n_be9__d_li8 = rates[128]
+    rate_eval.n_be9__t_li7 = rates[129]
+    rate_eval.p_be9__he4_li6 = rates[130]
+    rate_eval.t_be9__n_b11 = rates[131]
+    rate_eval.he4_be9__n_c12 = rates[132]
+    rate_eval.he4_be9__p_b12 = rates[133]
+    rate_eval.he4_b8__p_c11 = rates[134]
+    rate_eval.n_b10__he4_li7 = rates[135]
+    rate_eval.p_b10__he4_be7 = rates[136]
+    rate_eval.he4_b10__n_n13 = rates[137]
+    rate_eval.he4_b10__p_c13 = rates[138]
+    rate_eval.n_b11__t_be9 = rates[139]
+    rate_eval.n_b11__he4_li8 = rates[140]
+    rate_eval.p_b11__n_c11 = rates[141]
+    rate_eval.he4_b11__n_n14 = rates[142]
+    rate_eval.he4_b11__p_c14 = rates[143]
+    rate_eval.p_b12__n_c12 = rates[144]
+    rate_eval.p_b12__he4_be9 = rates[145]
+    rate_eval.he4_b12__n_n15 = rates[146]
+    rate_eval.n_c11__p_b11 = rates[147]
+    rate_eval.p_c11__he4_b8 = rates[148]
+    rate_eval.he4_c11__n_o14 = rates[149]
+    rate_eval.he4_c11__p_n14 = rates[150]
+    rate_eval.n_c12__p_b12 = rates[151]
+    rate_eval.n_c12__he4_be9 = rates[152]
+    rate_eval.he4_c12__n_o15 = rates[153]
+    rate_eval.he4_c12__p_n15 = rates[154]
+    rate_eval.p_c13__n_n13 = rates[155]
+    rate_eval.p_c13__he4_b10 = rates[156]
+    rate_eval.d_c13__n_n14 = rates[157]
+    rate_eval.he4_c13__n_o16 = rates[158]
+    rate_eval.p_c14__n_n14 = rates[159]
+    rate_eval.p_c14__he4_b11 = rates[160]
+    rate_eval.d_c14__n_n15 = rates[161]
+    rate_eval.he4_n12__p_o15 = rates[162]
+    rate_eval.n_n13__p_c13 = rates[163]
+    rate_eval.n_n13__he4_b10 = rates[164]
+    rate_eval.he4_n13__p_o16 = rates[165]
+    rate_eval.n_n14__p_c14 = rates[166]
+    rate_eval.n_n14__d_c13 = rates[167]
+    rate_eval.n_n14__he4_b11 = rates[168]
+    rate_eval.p_n14__n_o14 = rates[169]
+    rate_eval.p_n14__he4_c11 = rates[170]
+    rate_eval.n_n15__d_c14 = rates[171]
+    rate_eval.n_n15__he4_b12 = rates[172]
+    rate_eval.p_n15__n_o15 = rates[173]
+    rate_eval.p_n15__he4_c12 = rates[174]
+    rate_eval.n_o14__p_n14 = rates[175]
+    rate_eval.n_o14__he4_c11 = rates[176]
+    rate_eval.n_o15__p_n15 = rates[177]
+    rate_eval.n_o15__he4_c12 = rates[178]
+    rate_eval.p_o15__he4_n12 = rates[179]
+    rate_eval.n_o16__he4_c13 = rates[180]
+    rate_eval.p_o16__he4_n13 = rates[181]
+    rate_eval.p_d__n_p_p = rates[182]
+    rate_eval.t_t__n_n_he4 = rates[183]
+    rate_eval.t_he3__n_p_he4 = rates[184]
+    rate_eval.he3_he3__p_p_he4 = rates[185]
+    rate_eval.d_li7__n_he4_he4 = rates[186]
+    rate_eval.p_li8__n_he4_he4 = rates[187]
+    rate_eval.d_be7__p_he4_he4 = rates[188]
+    rate_eval.p_be9__d_he4_he4 = rates[189]
+    rate_eval.n_b8__p_he4_he4 = rates[190]
+    rate_eval.p_b11__he4_he4_he4 = rates[191]
+    rate_eval.n_c11__he4_he4_he4 = rates[192]
+    rate_eval.t_li7__n_n_he4_he4 = rates[193]
+    rate_eval.he3_li7__n_p_he4_he4 = rates[194]
+    rate_eval.t_be7__n_p_he4_he4 = rates[195]
+    rate_eval.he3_be7__p_p_he4_he4 = rates[196]
+    rate_eval.p_be9__n_p_he4_he4 = rates[197]
+    rate_eval.n_p_he4__li6 = rates[198]
+    rate_eval.n_he4_he4__be9 = rates[199]
+    rate_eval.he4_he4_he4__c12 = rates[200]
+    rate_eval.n_p_p__p_d = rates[201]
+    rate_eval.n_n_he4__t_t = rates[202]
+    rate_eval.n_p_he4__t_he3 = rates[203]
+    rate_eval.p_p_he4__he3_he3 = rates[204]
+    rate_eval.n_he4_he4__p_li8 = rates[205]
+    rate_eval.n_he4_he4__d_li7 = rates[206]
+    rate_eval.p_he4_he4__n_b8 = rates[207]
+    rate_eval.p_he4_he4__d_be7 = rates[208]
+    rate_eval.d_he4_he4__p_be9 = rates[209]
+    rate_eval.he4_he4_he4__n_c11 = rates[210]
+    rate_eval.he4_he4_he4__p_b11 = rates[211]
+    rate_eval.n_n_he4_he4__t_li7 = rates[212]
+    rate_eval.n_p_he4_he4__he3_li7 = rates[213]
+    rate_eval.n_p_he4_he4__t_be7 = rates[214]
+    rate_eval.n_p_he4_he4__p_be9 = rates[215]
+    rate_eval.p_p_he4_he4__he3_be7 = rates[216]
+    rate_eval.p__n = rates[217]
+    rate_eval.n__p = rates[218]
+    return rate_eval
+
+@numba.njit()
+def temperature_groups(T):
+    """the distinct values of T, and the index of the value of every T"""
+    order = np.argsort(T)
+    unique = np.empty(T.shape[0], dtype=np.float64)
+    group = np.empty(T.shape[0], dtype=np.int64)
+    n = -1
+    for i in order:
+        if n < 0 or T[i] != unique[n]:
+            n += 1
+            unique[n] = T[i]
+        group[i] = n
+    return unique[:n+1], group
+
+@numba.njit(parallel=True)
+def rates_batch_eq(T):
+    """rates of every distinct temperature in T as rows of a table, and the
+    row belonging to every temperature"""
+    unique, group = temperature_groups(T)
+    table = np.empty((unique.shape[0], nrates), dtype=np.float64)
+    for g in numba.prange(unique.shape[0]):
+        table[g] = rates_to_array(rates_eq(unique[g]))
+    return table, group
+
+@numba.njit(parallel=True)
+def rhs_batch_rates_eq(Y, rho, table, group):
+    dYdt = np.empty((Y.shape[0], nnuc), dtype=np.float64)
+    for i in numba.prange(Y.shape[0]):
+        dYdt[i] = rhs_rates_eq(Y[i], rho[i], rates_from_array(table[group[i]]))
+    return dYdt
+
+@numba.njit(parallel=True)
+def jacobian_batch_rates_eq(Y, rho, table, group):
+    jac = np.empty((Y.shape[0], nnuc, nnuc), dtype=np.float64)
+    for i in numba.prange(Y.shape[0]):
+        jac[i] = jacobian_rates_eq(Y[i], rho[i], rates_from_array(table[group[i]]))
+    return jac
+
+@numba.njit()
+def rhs_batch_eq(t, Y, rho, T):
+    table, group = rates_batch_eq(T)
+    return rhs_batch_rates_eq(Y, rho, table, group)
+
+@numba.njit()
+def jacobian_batch_eq(t, Y, rho, T):
+    table, group = rates_batch_eq(T)
+    return jacobian_batch_rates_eq(Y, rho, table, group)
+
+# temperatures and rate table of the last call to rates_batch
+_last_rates_batch = [None, None, None]
 
-   cc = CC(networkname)
-   # Uncomment the following line to print out the compilation steps
-   #cc.verbose = True
+def rates_batch(T):
+    """rate table and rows for the temperatures T, only evaluated if T changed
+    since the last call"""
+    if _last_rates_batch[0] is None or not np.array_equal(T, _last_rates_batch[0]):
+        _last_rates_batch[1:] = rates_batch_eq(T)
+        _last_rates_batch[0] = np.array(T, dtype=np.float64)
+    return _last_rates_batch[1], _last_rates_batch[2]
 
-   #
-   @cc.export('nnuc','i4()')
-   def nNuc():
-      return nnuc
+def rhs_batch(t, Y, rho, T):
+    """dY/dt of the states Y[N, nnuc] at densities rho[N] and temperatures
+    T[N], evaluated in parallel without screening.  The rates are evaluated
+    once for every distinct temperature"""
+    return rhs_batch_rates_eq(Y, rho, *rates_batch(np.asarray(T, dtype=np.float64)))
 
-   @cc.export('rhs', 'f8[:](f8, f8[:], f8, f8)')
-   def rhsCC(t, Y, rho, T):
-      return rhs_eq(t, Y, rho, T, None)
+def jacobian_batch(t, Y, rho, T):
+    """jacobians [N, nnuc, nnuc] of the states Y[N, nnuc], see rhs_batch"""
+    return jacobian_batch_rates_eq(Y, rho, *rates_batch(np.asarray(T, dtype=np.float64)))
 
-   @cc.export('jacobian', '(f8, f8[:], f8, f8)')
-   def jacobian(t, Y, rho, T):
-      return jacobian_eq(t, Y, rho, T, None)
+@numba.njit()
+def log_jacobian(Y, dYdt, jac):
+    """d(d ln(Y_i)/dt)/d ln(Y_j) from dY/dt and the jacobian at Y"""
+    for i in range(nnuc):
+        for j in range(nnuc):
+            jac[i, j] *= Y[j]/Y[i]
+        jac[i, i] -= dYdt[i]/Y[i]
+    return jac
+
+@numba.njit()
+def rhs_log_rates_eq(lnY, rho, rate_eval):
+    Y = np.exp(lnY)
+    return rhs_rates_eq(Y, rho, rate_eval)/Y
 
+@numba.njit()
+def jacobian_log_rates_eq(lnY, rho, rate_eval):
+    Y = np.exp(lnY)
+    return log_jacobian(Y, rhs_rates_eq(Y, rho, rate_eval), jacobian_rates_eq(Y, rho, rate_eval))
+
+def rhs_log(t, lnY, rho, T, screen_func=None):
+    """d ln(Y)/dt of the state lnY = ln(Y)"""
+    if screen_func is not None:
+        Y = np.exp(lnY)
+        return rhs_eq(t, Y, rho, T, screen_func)/Y
+    return rhs_log_rates_eq(lnY, rho, rates(T))
 
-   if __name__ == "__main__":
-      cc.compile()
+def jacobian_log(t, lnY, rho, T, screen_func=None):
+    """jacobian of rhs_log, the jacobian scaled by Y_j/Y_i with d ln(Y_i)/dt
+    taken off the diagonal"""
+    if screen_func is not None:
+        Y = np.exp(lnY)
+        return log_jacobian(Y, *rhs_jac_eq(t, Y, rho, T, screen_func))
+    return jacobian_log_rates_eq(lnY, rho, rates(T))